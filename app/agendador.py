@@ -0,0 +1,181 @@
+import os
+import time
+import heapq
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Valores padrão (podem ser sobrescritos no .env)
+THREADS_POR_RENDER_PADRAO = 4
+MAX_SESSOES_ENCODER_PADRAO = 2
+# Segundos de áudio renderizados por segundo de relógio, por job
+VELOCIDADE_RENDER_PADRAO = 1.0
+
+
+def ler_inteiro_env(nome, padrao):
+    """Lê uma variável inteira do .env, usando o padrão se vazia ou inválida."""
+    valor = os.getenv(nome, "").strip()
+    if not valor:
+        return padrao
+    try:
+        return int(valor)
+    except ValueError:
+        return padrao
+
+
+def calcular_renders_simultaneos(threads_por_render):
+    """Núcleos disponíveis divididos pelas threads esperadas por render (mínimo 1)."""
+    nucleos = os.cpu_count() or 1
+    return max(1, nucleos // max(1, threads_por_render))
+
+
+def estimar_tempo_lote(duracoes, simultaneos, velocidade=None):
+    """
+    Estima o tempo total (s) do lote simulando a ordem do agendador:
+    o job mais longo vai para o worker que ficar livre primeiro.
+    """
+    if velocidade is None:
+        try:
+            velocidade = float(os.getenv("VELOCIDADE_RENDER", "") or VELOCIDADE_RENDER_PADRAO)
+        except ValueError:
+            velocidade = VELOCIDADE_RENDER_PADRAO
+    workers = [0.0] * max(1, simultaneos)
+    for duracao in sorted(duracoes, reverse=True):
+        livre = heapq.heappop(workers)
+        heapq.heappush(workers, livre + duracao / velocidade)
+    return max(workers)
+
+
+class AgendadorRenderizacao:
+    """
+    Executa renderizações em paralelo.
+
+    - Até `max_simultaneos` jobs rodam ao mesmo tempo.
+    - No máximo `max_sessoes_encoder` jobs usam o encoder de hardware. Com todas
+      as sessões ocupadas, o job roda com encoder de CPU (e isso vai para o
+      log), ou espera uma sessão livre se `esperar_sessao_encoder` (ou
+      ESPERAR_SESSAO_ENCODER=1 no .env) estiver ativo.
+    - Os jobs são iniciados do mais longo para o mais curto (chave 'duracao'),
+      o que reduz o tempo total do lote.
+    - O progresso de cada job e do lote é reportado via `log_callback`.
+
+    `executar_job(job, usar_gpu, progresso_callback)` deve executar o job e
+    retornar qualquer resultado; `progresso_callback(percentual)` recebe 0-100.
+    """
+
+    def __init__(self, executar_job, max_simultaneos=None, max_sessoes_encoder=None,
+                 threads_por_render=None, log_callback=None, intervalo_progresso=10.0,
+                 esperar_sessao_encoder=None):
+        self.executar_job = executar_job
+        self.threads_por_render = threads_por_render or ler_inteiro_env(
+            "THREADS_POR_RENDER", THREADS_POR_RENDER_PADRAO)
+        self.max_simultaneos = max_simultaneos or ler_inteiro_env(
+            "MAX_RENDERS_SIMULTANEOS", calcular_renders_simultaneos(self.threads_por_render))
+        if max_sessoes_encoder is None:
+            max_sessoes_encoder = ler_inteiro_env("MAX_SESSOES_ENCODER", MAX_SESSOES_ENCODER_PADRAO)
+        self.max_sessoes_encoder = max(0, max_sessoes_encoder)
+        if esperar_sessao_encoder is None:
+            esperar_sessao_encoder = ler_inteiro_env("ESPERAR_SESSAO_ENCODER", 0) > 0
+        self.esperar_sessao_encoder = esperar_sessao_encoder
+        self.log_callback = log_callback
+        self.intervalo_progresso = intervalo_progresso
+
+        self._sessoes_encoder = threading.BoundedSemaphore(self.max_sessoes_encoder) if self.max_sessoes_encoder else None
+        self._lock = threading.Lock()
+        self._progresso = {}
+        self._pesos = {}
+        self._concluidos = 0
+        self._em_execucao = 0
+        self._total = 0
+        self._ultimo_relatorio = 0.0
+
+    def log(self, msg):
+        if self.log_callback:
+            self.log_callback(msg)
+
+    @staticmethod
+    def nome_job(job):
+        return job.get('artista_titulo') or job.get('nome') or str(id(job))
+
+    @staticmethod
+    def ordenar_jobs(jobs):
+        """Ordena do mais longo para o mais curto (ordem estável para empates)."""
+        return sorted(jobs, key=lambda job: job.get('duracao') or 0, reverse=True)
+
+    def executar(self, jobs):
+        """Executa todos os jobs e retorna a lista de (job, resultado) na ordem de término."""
+        jobs = self.ordenar_jobs(jobs)
+        self._total = len(jobs)
+        self._concluidos = 0
+        self._em_execucao = 0
+        self._progresso = {id(job): 0.0 for job in jobs}
+        # Jobs sem duração conhecida pesam como a média dos demais
+        duracoes = [job.get('duracao') for job in jobs if job.get('duracao')]
+        peso_padrao = sum(duracoes) / len(duracoes) if duracoes else 1.0
+        self._pesos = {id(job): job.get('duracao') or peso_padrao for job in jobs}
+
+        self.log(f"⚙️  Renders simultâneos: {self.max_simultaneos} | "
+                 f"Sessões de encoder de hardware: {self.max_sessoes_encoder} | "
+                 f"Threads por render: {self.threads_por_render}"
+                 + (" | Aguardando sessão livre do encoder" if self.esperar_sessao_encoder and self.max_sessoes_encoder else ""))
+
+        resultados = []
+        with ThreadPoolExecutor(max_workers=self.max_simultaneos) as pool:
+            futuros = {pool.submit(self._executar_um, job): job for job in jobs}
+            for futuro in as_completed(futuros):
+                resultados.append((futuros[futuro], futuro.result()))
+
+        self._reportar_lote(forcar=True)
+        return resultados
+
+    def _executar_um(self, job):
+        usar_gpu = False
+        if self._sessoes_encoder:
+            usar_gpu = self._sessoes_encoder.acquire(blocking=self.esperar_sessao_encoder)
+            if not usar_gpu:
+                self.log(f"   ⚠️  Sessões do encoder de hardware ocupadas: {self.nome_job(job)} vai usar a CPU")
+        with self._lock:
+            self._em_execucao += 1
+        self.log(f"▶️  Iniciando: {self.nome_job(job)} ({'GPU' if usar_gpu else 'CPU'})")
+
+        try:
+            return self.executar_job(job, usar_gpu, lambda p: self.atualizar_progresso(job, p))
+        except Exception as e:
+            self.log(f"   ❌ Erro inesperado em {self.nome_job(job)}: {e}")
+            return None
+        finally:
+            if usar_gpu:
+                self._sessoes_encoder.release()
+            with self._lock:
+                self._em_execucao -= 1
+                self._concluidos += 1
+                self._progresso[id(job)] = 100.0
+            self._reportar_lote(forcar=True)
+
+    def atualizar_progresso(self, job, percentual):
+        """Atualiza o progresso de um job; reporta a cada 25% e o lote periodicamente."""
+        percentual = max(0.0, min(100.0, percentual))
+        with self._lock:
+            anterior = self._progresso.get(id(job), 0.0)
+            self._progresso[id(job)] = percentual
+        if int(percentual // 25) > int(anterior // 25):
+            self.log(f"   📊 {self.nome_job(job)}: {percentual:.0f}%")
+        self._reportar_lote()
+
+    def progresso_lote(self):
+        """Progresso agregado do lote (0-100), ponderado pela duração de cada job."""
+        with self._lock:
+            peso_total = sum(self._pesos.values())
+            if not peso_total:
+                return 0.0
+            feito = sum(self._pesos[chave] * p for chave, p in self._progresso.items())
+            return feito / peso_total
+
+    def _reportar_lote(self, forcar=False):
+        agora = time.time()
+        with self._lock:
+            if not forcar and agora - self._ultimo_relatorio < self.intervalo_progresso:
+                return
+            self._ultimo_relatorio = agora
+            concluidos, em_execucao = self._concluidos, self._em_execucao
+        self.log(f"📦 Lote: {self.progresso_lote():.1f}% | "
+                 f"{concluidos}/{self._total} concluídos | {em_execucao} em execução")
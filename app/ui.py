@@ -1,12 +1,22 @@
 import os
+import re
 import sys
 import tkinter as tk
 from tkinter import filedialog, messagebox, scrolledtext
 from dotenv import load_dotenv
 import subprocess
 import threading
+import queue
 import shutil
+import importlib
 from datetime import datetime
+from app.utils import get_logger
+from app.agendador import AgendadorRenderizacao, estimar_tempo_lote, ler_inteiro_env
+from scripts.duracao_audio import obter_duracao, salvar_cache
+from scripts.indice_artistas import encontrar_imagem_artista
+from scripts.biblioteca import obter_inventario, invalidar, arquivos_por_nome
+from scripts.monitor_biblioteca import monitorar
+from scripts.videos_existentes import construir_indice
 
 # Carrega o .env
 load_dotenv()
@@ -25,23 +35,50 @@ DEFAULT_PASTA_KARAOKE = os.path.join(BASE_DIR, pasta_env)
 DEFAULT_ARQUIVO_KARAOKE = os.path.join(BASE_DIR, arquivo_env)
 DEFAULT_PASTA_STEMS = os.path.join(BASE_DIR, pasta_stems_env)
 
-# Importação dos scripts
-try:
-    from scripts import verificar_arquivos, gerar_thumb, normalizar_nomes, gerar_nfo, renomear_arquivos
-except ImportError as e:
-    print(f"⚠️  Erro ao importar scripts: {e}")
-    # Mock dos scripts para desenvolvimento
-    class MockScript:
-        @staticmethod
-        def run(*args, **kwargs):
-            log_callback = kwargs.get('log_callback', print)
-            log_callback("⚡ Simulação: Script executado com sucesso")
-    
-    verificar_arquivos = MockScript()
-    gerar_thumb = MockScript()
-    normalizar_nomes = MockScript()
-    gerar_nfo = MockScript()
-    renomear_arquivos = MockScript()
+# Log da interface: o histórico completo vai para logs/app.log; a tela guarda só as últimas linhas
+logger = get_logger("ui")
+LOG_LINHAS_VISIVEIS = ler_inteiro_env("LOG_LINHAS_VISIVEIS", 2000)
+LOG_INTERVALO_MS = 100
+LOG_LOTE_MAX = 500
+
+# Mock dos scripts para desenvolvimento (quando a importação falha)
+class MockScript:
+    @staticmethod
+    def run(*args, **kwargs):
+        log_callback = kwargs.get('log_callback', print)
+        log_callback("⚡ Simulação: Script executado com sucesso")
+
+class ModuloPreguicoso:
+    """
+    Módulo importado só no primeiro uso: pandas, openpyxl, numpy e PIL
+    ficam fora da abertura da janela.
+    """
+
+    def __init__(self, nome, substituto=None):
+        self._nome = nome
+        self._substituto = substituto
+        self._modulo = None
+
+    def __getattr__(self, atributo):
+        if self._modulo is None:
+            try:
+                self._modulo = importlib.import_module(self._nome)
+            except ImportError as e:
+                if self._substituto is None:
+                    raise
+                print(f"⚠️  Erro ao importar scripts: {e}")
+                self._modulo = self._substituto
+        return getattr(self._modulo, atributo)
+
+# Importação dos scripts (no primeiro uso)
+verificar_arquivos = ModuloPreguicoso("scripts.verificar_arquivos", MockScript())
+gerar_thumb = ModuloPreguicoso("scripts.gerar_thumb", MockScript())
+normalizar_nomes = ModuloPreguicoso("scripts.normalizar_nomes", MockScript())
+gerar_nfo = ModuloPreguicoso("scripts.gerar_nfo", MockScript())
+renomear_arquivos = ModuloPreguicoso("scripts.renomear_arquivos", MockScript())
+catalogo_musicas = ModuloPreguicoso("scripts.catalogo")
+ultrastar = ModuloPreguicoso("scripts.ultrastar")
+renomeador = ModuloPreguicoso("scripts.renomeador")
 
 class MainApp:
     def __init__(self, root):
@@ -55,6 +92,10 @@ class MainApp:
         self.pasta_stems_var = tk.StringVar(value=DEFAULT_PASTA_STEMS)
         self.trilha_audio_var = tk.StringVar(value="instrumental")
         
+        # Mensagens de qualquer thread; só a thread do Tk mexe no widget
+        self.fila_log = queue.SimpleQueue()
+        self.linhas_log = 0
+        
         self.setup_styles()
         main_frame = tk.Frame(root, bg='#2C3E50', padx=20, pady=15)
         main_frame.pack(fill=tk.BOTH, expand=True)
@@ -78,6 +119,14 @@ class MainApp:
         right_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True)
         
         self.create_log_section(right_frame)
+        self.root.after(LOG_INTERVALO_MS, self.drenar_log)
+        
+        self.iniciar_monitor_biblioteca()
+
+    def iniciar_monitor_biblioteca(self):
+        """Mantém o inventário da pasta de karaokê atualizado em segundo plano"""
+        intervalo = ler_inteiro_env("MONITOR_BIBLIOTECA_INTERVALO", 30)
+        monitorar(self.pasta_var.get(), intervalo=intervalo, log_callback=self.log)
 
     def setup_styles(self):
         self.colors = {
@@ -321,9 +370,10 @@ class MainApp:
         tk.Button(button_frame2, text="🔍 Verificar Arquivos", command=self.verificar, **btn_style).pack(side=tk.LEFT, padx=2)
         tk.Button(button_frame2, text="✏️ Renomear Arquivos", command=self.renomear_arquivos, **btn_style).pack(side=tk.LEFT, padx=2)
 
-        # Linha 3: Excluir Thumbs, Excluir NFOs
+        # Linha 3: Excluir Thumbs, Excluir NFOs, Sincronizar NFOs
         tk.Button(button_frame3, text="🗑️ Excluir Thumbs", command=self.excluir_thumbs, **btn_style).pack(side=tk.LEFT, padx=2)
         tk.Button(button_frame3, text="🗑️ Excluir NFOs", command=self.excluir_nfos, **btn_style).pack(side=tk.LEFT, padx=2)
+        tk.Button(button_frame3, text="🔄 Sincronizar NFOs", command=self.sincronizar_nfos, **btn_style).pack(side=tk.LEFT, padx=2)
 
     def create_utilities_section(self, parent):
         utilities_frame = tk.LabelFrame(
@@ -364,6 +414,7 @@ class MainApp:
         # Linha 2: Abrir Imagens, Enviar Karaoke
         tk.Button(button_frame2, text="🖼️ Abrir Imagens", command=self.abrir_pasta_imagens, **btn_style).pack(side=tk.LEFT, padx=2)
         tk.Button(button_frame2, text="🚀 Enviar Karaoke", command=self.enviar_karaoke, **btn_style).pack(side=tk.LEFT, padx=2)
+        tk.Button(button_frame2, text="↩️ Desfazer Renomeação", command=self.desfazer_renomeacao, **btn_style).pack(side=tk.LEFT, padx=2)
 
     def create_log_section(self, parent):
         log_frame = tk.LabelFrame(
@@ -427,76 +478,18 @@ class MainApp:
 
     # ========== FUNÇÃO CORRIGIDA: VERIFICAR SE VÍDEO JÁ EXISTE ==========
 
-    def normalizar_nome_arquivo(self, nome):
-        """Normaliza o nome do arquivo para comparação robusta"""
-        if not nome:
-            return ""
-        
-        # Converter para minúsculas
-        nome = nome.lower()
-        
-        # Substituir caracteres problemáticos
-        nome = nome.replace('&', 'e')
-        nome = nome.replace('  ', ' ')
-        nome = nome.replace('_', ' ')
-        nome = nome.replace('-', ' ')
-        
-        # Remover espaços extras e caracteres especiais
-        nome = ''.join(c for c in nome if c.isalnum() or c in (' ', '-', '_'))
-        nome = ' '.join(nome.split())  # Remove espaços múltiplos
-        nome = nome.strip()
-        
-        return nome
-
-    def verificar_se_video_ja_existe(self, nome_arquivo, pasta_karaoke):
-        """Verifica se o vídeo já existe na pasta karaoke (em qualquer subpasta) OU na pasta Output"""
+    def verificar_se_video_ja_existe(self, nome_arquivo, indice):
+        """Caminho do vídeo já gerado (karaokê ou Output) para o nome, ou None.
+        Regras de correspondência em scripts/videos_existentes.py."""
         try:
-            # Normalizar o nome do arquivo
-            nome_normalizado = self.normalizar_nome_arquivo(nome_arquivo)
-            
-            # Verificar na pasta Karaoke e subpastas
-            for root_dir, _, files in os.walk(pasta_karaoke):
-                for arquivo in files:
-                    # Verificar apenas arquivos de vídeo
-                    if not arquivo.lower().endswith(('.mp4', '.avi', '.mkv', '.mov')):
-                        continue
-                    
-                    nome_sem_extensao = os.path.splitext(arquivo)[0]
-                    nome_arquivo_normalizado = self.normalizar_nome_arquivo(nome_sem_extensao)
-                    
-                    # Múltiplas estratégias de comparação
-                    if (nome_normalizado == nome_arquivo_normalizado or
-                        nome_normalizado in nome_arquivo_normalizado or
-                        nome_arquivo_normalizado in nome_normalizado):
-                        
-                        return os.path.join(root_dir, arquivo)
-            
-            # Verificar também na pasta Output
-            pasta_output = os.path.join(BASE_DIR, "Output")
-            if os.path.exists(pasta_output):
-                for arquivo in os.listdir(pasta_output):
-                    if not arquivo.lower().endswith(('.mp4', '.avi', '.mkv', '.mov')):
-                        continue
-                    
-                    nome_sem_extensao = os.path.splitext(arquivo)[0]
-                    nome_arquivo_normalizado = self.normalizar_nome_arquivo(nome_sem_extensao)
-                    
-                    # Múltiplas estratégias de comparação
-                    if (nome_normalizado == nome_arquivo_normalizado or
-                        nome_normalizado in nome_arquivo_normalizado or
-                        nome_arquivo_normalizado in nome_normalizado):
-                        
-                        return os.path.join(pasta_output, arquivo)
-            
-            return None
-            
+            return indice.buscar(nome_arquivo)
         except Exception as e:
             self.log(f"❌ Erro ao verificar vídeo: {e}")
             return None
 
     # ========== FUNÇÃO AJUSTADA: EXECUTAR GERAR VIDEO SEM JANELAS ==========
 
-    def executar_gerar_video_com_progresso(self, comando, projeto, log_filepath):
+    def executar_gerar_video_com_progresso(self, comando, projeto, log_filepath, progresso_callback=None):
         """Executa o comando e captura o progresso em tempo real"""
         try:
             env = os.environ.copy()
@@ -524,6 +517,9 @@ class MainApp:
                 startupinfo=startupinfo  # MANTIDO APENAS AQUI PARA FFMPEG
             )
             
+            # Com vários vídeos em paralelo, identifica de qual projeto é cada linha
+            prefixo = f"[{projeto['artista_titulo']}] " if progresso_callback else ""
+            
             while True:
                 linha = processo.stdout.readline()
                 if not linha and processo.poll() is not None:
@@ -532,12 +528,16 @@ class MainApp:
                 if linha:
                     linha = linha.strip()
                     if linha:
-                        if any(palavra in linha for palavra in ['Rolagem:', 'Finalizando...', '✅ Vídeo com Rolagem', '📤 Finalizando']):
-                            self.log(f"   📊 {linha}")
+                        if progresso_callback and linha.startswith('Rolagem:'):
+                            match = re.match(r'Rolagem:\s*([\d.]+)%', linha)
+                            if match:
+                                progresso_callback(float(match.group(1)))
+                        elif any(palavra in linha for palavra in ['Rolagem:', 'Finalizando...', '✅ Vídeo com Rolagem', '📤 Finalizando']):
+                            self.log(f"   📊 {prefixo}{linha}")
                         elif any(palavra in linha for palavra in ['🚀 Gerador de Karaokê', '📺 Resolução:', '🎵 Música:', '🎤 Artista:', '⏱️  Duração:']):
-                            self.log(f"   ℹ️  {linha}")
+                            self.log(f"   ℹ️  {prefixo}{linha}")
                         elif '❌' in linha or 'Erro:' in linha or 'Traceback' in linha:
-                            self.log(f"   {linha}")
+                            self.log(f"   {prefixo}{linha}")
             
             returncode = processo.wait()
             return returncode, ""
@@ -729,11 +729,13 @@ class MainApp:
                     f.write(f"📦 Processando ({i}/{len(arquivos_video)}): {arquivo}\n")
                 
                 try:
-                    # Verificar se o arquivo já existe no destino
-                    if os.path.exists(caminho_destino):
-                        self.log(f"   ⚠️  Arquivo já existe: {arquivo}")
+                    # Verificar se o arquivo já existe no destino ou em qualquer subpasta (índice da biblioteca)
+                    existentes = [caminho_destino] if os.path.exists(caminho_destino) else arquivos_por_nome(pasta_karaoke, arquivo)
+                    if existentes:
+                        local = os.path.relpath(existentes[0], pasta_karaoke)
+                        self.log(f"   ⚠️  Arquivo já existe: {local}")
                         with open(log_filepath, 'a', encoding='utf-8') as f:
-                            f.write(f"   ⚠️  Arquivo já existe: {arquivo}\n")
+                            f.write(f"   ⚠️  Arquivo já existe: {local}\n")
                         continue
                     
                     # Copiar arquivo
@@ -745,6 +747,17 @@ class MainApp:
                         self.log(f"   ✅ Enviado: {arquivo}")
                         with open(log_filepath, 'a', encoding='utf-8') as f:
                             f.write(f"   ✅ Enviado: {arquivo}\n")
+                        
+                        # Capa e NFO gerados junto com o vídeo vão para a mesma pasta
+                        base = os.path.splitext(arquivo)[0]
+                        for ext in ('.jpg', '.nfo'):
+                            origem_extra = os.path.join(pasta_output, base + ext)
+                            destino_extra = os.path.join(pasta_karaoke, base + ext)
+                            if os.path.exists(origem_extra) and not os.path.exists(destino_extra):
+                                shutil.copy2(origem_extra, destino_extra)
+                                self.log(f"   🖼️  Enviado junto: {base + ext}")
+                                with open(log_filepath, 'a', encoding='utf-8') as f:
+                                    f.write(f"   🖼️  Enviado junto: {base + ext}\n")
                     else:
                         erros += 1
                         self.log(f"   ❌ Falha ao enviar: {arquivo}")
@@ -757,6 +770,9 @@ class MainApp:
                     with open(log_filepath, 'a', encoding='utf-8') as f:
                         f.write(f"   ❌ Erro ao processar {arquivo}: {str(e)}\n")
             
+            if videos_enviados:
+                invalidar(pasta_karaoke)
+            
             # Resumo final
             self.log(f"\n📊 RESUMO DO ENVIO:")
             self.log(f"   ✅ Vídeos enviados: {len(videos_enviados)}")
@@ -789,10 +805,34 @@ class MainApp:
     # ========== FUNÇÕES EXISTENTES ==========
 
     def log(self, mensagem):
-        self.txt_log.config(state="normal")
-        self.txt_log.insert(tk.END, mensagem + "\n")
-        self.txt_log.see(tk.END)
-        self.txt_log.config(state="disabled")
+        """Pode ser chamado de qualquer thread: grava no arquivo e enfileira para a tela"""
+        logger.info(mensagem)
+        self.fila_log.put(mensagem)
+
+    def drenar_log(self):
+        """Na thread do Tk: insere as mensagens pendentes em lote e corta as linhas antigas"""
+        mensagens = []
+        try:
+            while len(mensagens) < LOG_LOTE_MAX:
+                mensagens.append(self.fila_log.get_nowait())
+        except queue.Empty:
+            pass
+
+        if mensagens:
+            texto = "\n".join(mensagens) + "\n"
+            self.linhas_log += texto.count("\n")
+            self.txt_log.config(state="normal")
+            self.txt_log.insert(tk.END, texto)
+            excesso = self.linhas_log - LOG_LINHAS_VISIVEIS
+            if excesso > 0:
+                self.txt_log.delete("1.0", f"{excesso + 1}.0")
+                self.linhas_log -= excesso
+            self.txt_log.see(tk.END)
+            self.txt_log.config(state="disabled")
+
+        # Fila ainda cheia: volta logo para não atrasar a tela
+        pendente = len(mensagens) == LOG_LOTE_MAX
+        self.root.after(1 if pendente else LOG_INTERVALO_MS, self.drenar_log)
 
     def enviar_songs_xlsx(self):
         """Permite ao usuário enviar uma nova planilha Songs.xlsx"""
@@ -807,6 +847,14 @@ class MainApp:
         songs_atual = os.path.join(BASE_DIR, "assets", "Songs.xlsx")
         songs_backup_dir = os.path.join(BASE_DIR, "assets", "backups")
         
+        # Catálogo atual, para comparar com a planilha nova
+        catalogo_antigo = None
+        if os.path.exists(songs_atual):
+            try:
+                catalogo_antigo = catalogo_musicas.carregar_catalogo(songs_atual)
+            except Exception as e:
+                self.log(f"⚠️  Planilha atual ilegível, sem comparação: {e}")
+
         try:
             if not os.path.exists(songs_backup_dir):
                 os.makedirs(songs_backup_dir)
@@ -822,18 +870,86 @@ class MainApp:
             shutil.copy2(arquivo_novo, songs_atual)
             self.log(f"✅ Nova planilha enviada: {os.path.basename(arquivo_novo)}")
             self.log(f"📊 Songs.xlsx atualizado com sucesso!")
+
+            # Catálogo compilado: os scripts não precisam reler o XLSX
+            try:
+                catalogo = catalogo_musicas.compilar_catalogo(songs_atual)
+                self.log(f"⚡ Catálogo compilado: {len(catalogo.titulos())} títulos")
+            except Exception as e:
+                catalogo = None
+                self.log(f"⚠️  Catálogo não compilado (a planilha será lida diretamente): {e}")
             
             self.arquivo_var.set(songs_atual)
             
         except Exception as e:
             self.log(f"❌ Erro ao enviar planilha: {str(e)}")
             messagebox.showerror("Erro", f"Erro ao enviar planilha: {str(e)}")
+            return
+
+        if catalogo_antigo is not None and catalogo is not None:
+            self.aplicar_diferencas_planilha(catalogo_musicas.comparar_catalogos(catalogo_antigo, catalogo))
+
+    def aplicar_diferencas_planilha(self, diferenca):
+        """Mostra o que mudou na planilha e atualiza só os arquivos afetados"""
+        linhas = diferenca.linhas()
+        self.log(f"🧾 Diferenças na planilha: {linhas[0]}")
+        for linha in linhas[1:]:
+            self.log(f"   {linha}")
+
+        renomeacoes = diferenca.renomeacoes()
+        chaves_nfo = diferenca.chaves_nfo()
+        chaves_capas = diferenca.chaves_capas()
+        if not (renomeacoes or chaves_nfo or chaves_capas):
+            return
+
+        pasta = self.pasta_var.get()
+        if not pasta or not os.path.isdir(pasta):
+            self.log("⚠️  Pasta de vídeos não selecionada: alterações não aplicadas.")
+            return
+
+        if not messagebox.askyesno(
+            "Aplicar alterações",
+            f"A planilha nova altera {len(diferenca.alteradas)} música(s) e adiciona {len(diferenca.adicionadas)}.\n\n"
+            f"Atualizar somente os arquivos afetados em {pasta}?\n"
+            f"• {len(renomeacoes)} título(s) a renomear\n"
+            f"• {len(chaves_nfo)} NFO(s) a reescrever\n"
+            f"• {len(chaves_capas)} capa(s) a refazer"
+        ):
+            return
+
+        # Diálogos na thread do Tk; o lote roda em segundo plano para a janela (e o log) seguirem respondendo
+        if renomeacoes and not self.verificar_renomeacao_interrompida():
+            renomeacoes = {}
+        thread = threading.Thread(
+            target=self.executar_diferencas_planilha_thread,
+            args=(pasta, self.arquivo_var.get(), renomeacoes, chaves_nfo, chaves_capas)
+        )
+        thread.daemon = True
+        thread.start()
+
+    def executar_diferencas_planilha_thread(self, pasta, arquivo, renomeacoes, chaves_nfo, chaves_capas):
+        """Renomeia, reescreve NFOs e refaz capas afetados pela planilha nova, em thread separada"""
+        try:
+            if renomeacoes:
+                self.log("🚀 Renomeando títulos alterados...")
+                renomear_arquivos.renomear_titulos(pasta, renomeacoes, log_callback=self.log)
+            if chaves_nfo:
+                self.log("🚀 Reescrevendo NFOs afetados...")
+                gerar_nfo.run(log_callback=self.log, pasta_videos=pasta, arquivo_xlsx=arquivo,
+                              sincronizar=True, apenas=chaves_nfo)
+            if chaves_capas:
+                self.log("🚀 Refazendo capas afetadas...")
+                gerar_thumb.run(log_callback=self.log, pasta_videos=pasta, arquivo_xlsx=arquivo, apenas=chaves_capas)
+            self.log("🎯 Alterações da planilha aplicadas")
+        except Exception as e:
+            self.log(f"❌ Erro ao aplicar alterações: {str(e)}")
 
     def selecionar_pasta(self):
         pasta = filedialog.askdirectory()
         if pasta:
             self.pasta_var.set(pasta)
             self.log(f"📁 Pasta selecionada: {pasta}")
+            self.iniciar_monitor_biblioteca()
 
     def selecionar_arquivo(self):
         arquivo = filedialog.askopenfilename(filetypes=[("Planilhas Excel", "*.xlsx")])
@@ -848,31 +964,9 @@ class MainApp:
             self.log(f"📁 Pasta Stems selecionada: {pasta}")
 
     def encontrar_imagem_artista(self, nome_artista):
-        """Encontra imagem do artista na pasta assets/__artist"""
-        pasta_artistas = os.path.join(BASE_DIR, "assets", "__artist")
-        
-        if not os.path.exists(pasta_artistas):
-            return None
-        
+        """Encontra imagem do artista na pasta assets/__artist (via índice compartilhado)"""
         artista = nome_artista.split(" - ")[0].strip()
-        
-        extensoes = ['.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp','avif']
-        
-        for ext in extensoes:
-            caminho_imagem = os.path.join(pasta_artistas, f"{artista}{ext}")
-            if os.path.exists(caminho_imagem):
-                return caminho_imagem
-        
-        try:
-            for arquivo in os.listdir(pasta_artistas):
-                if arquivo.lower().startswith(artista.lower()):
-                    caminho_imagem = os.path.join(pasta_artistas, arquivo)
-                    if any(arquivo.lower().endswith(ext) for ext in extensoes):
-                        return caminho_imagem
-        except:
-            pass
-        
-        return None
+        return encontrar_imagem_artista(artista)
 
     def encontrar_ultrastar_txt_em_stems(self, pasta_stems):
         """Encontra todos os arquivos ultrastar.txt nas subpastas 'artist - title'"""
@@ -897,13 +991,27 @@ class MainApp:
                     
                     if os.path.exists(caminho_audio):
                         imagem_artista = self.encontrar_imagem_artista(artista_titulo)
+                        duracao = obter_duracao(caminho_audio, salvar=False)
+                        if not duracao:
+                            self.log(f"   ❌ Não foi possível ler a duração de {trilha_audio} em {artista_titulo}")
+                            continue
+                        
+                        # Processa o ultrastar.txt agora; a geração reaproveita o cache
+                        try:
+                            musica = ultrastar.carregar_musica(caminho_ultrastar)
+                        except (OSError, UnicodeDecodeError, ValueError) as e:
+                            self.log(f"   ❌ Erro ao ler ultrastar.txt de {artista_titulo}: {e}")
+                            continue
+                        if not musica.get_lines():
+                            self.log(f"   ⚠️  Nenhuma frase com letra em: {artista_titulo}")
                         
                         projetos_validos.append({
                             'pasta': caminho_completo,
                             'artista_titulo': artista_titulo,
                             'ultrastar_txt': caminho_ultrastar,
                             'arquivo_audio': caminho_audio,
-                            'imagem_artista': imagem_artista
+                            'imagem_artista': imagem_artista,
+                            'duracao': duracao
                         })
                         self.log(f"   ✅ Projeto válido: {artista_titulo}")
                         if imagem_artista:
@@ -913,78 +1021,81 @@ class MainApp:
                 else:
                     self.log(f"   ❌ Ultrastar.txt não encontrado em: {artista_titulo}")
         
+        salvar_cache()
         return projetos_validos
 
     def executar_gerar_video_thread(self, projetos_para_gerar, log_filepath):
-        """Executa a geração de vídeos em thread separada"""
+        """Executa a geração de vídeos em thread separada, vários projetos em paralelo"""
         try:
             videos_gerados = []
-            sucessos = 0
-            erros = 0
+            contadores = {'sucessos': 0, 'erros': 0}
+            lock = threading.Lock()
             
             python_executable = sys.executable
             
-            for i, projeto in enumerate(projetos_para_gerar, 1):
-                self.log(f"🎬 Processando ({i}/{len(projetos_para_gerar)}): {projeto['artista_titulo']}")
-                
+            def registrar_erro(msg):
+                self.log(msg)
+                with lock:
+                    contadores['erros'] += 1
+                    with open(log_filepath, 'a', encoding='utf-8') as f:
+                        f.write(f"{msg}\n")
+            
+            def gerar_projeto(projeto, usar_gpu, progresso_callback):
                 if not os.path.exists(projeto['ultrastar_txt']):
-                    self.log(f"   ❌ Arquivo ultrastar.txt não encontrado: {projeto['ultrastar_txt']}")
-                    erros += 1
-                    continue
+                    registrar_erro(f"   ❌ Arquivo ultrastar.txt não encontrado: {projeto['ultrastar_txt']}")
+                    return
                     
                 if not os.path.exists(projeto['arquivo_audio']):
-                    self.log(f"   ❌ Arquivo de áudio não encontrado: {projeto['arquivo_audio']}")
-                    erros += 1
-                    continue
+                    registrar_erro(f"   ❌ Arquivo de áudio não encontrado: {projeto['arquivo_audio']}")
+                    return
                 
                 comando = [
                     python_executable, 
                     'scripts/gerar_video.py',
                     projeto['ultrastar_txt'],
-                    '--audio', projeto['arquivo_audio']
+                    '--audio', projeto['arquivo_audio'],
+                    '--threads', str(agendador.threads_por_render),
+                    '--thumb'
                 ]
                 
+                if not usar_gpu:
+                    comando.append('--no-gpu')
+                
                 if projeto['imagem_artista']:
                     comando.extend(['--background', projeto['imagem_artista']])
-                    self.log(f"   🖼️  Usando imagem do artista: {os.path.basename(projeto['imagem_artista'])}")
-                
-                self.log(f"   🔧 Iniciando geração de vídeo...")
+                    self.log(f"   🖼️  {projeto['artista_titulo']}: usando imagem do artista {os.path.basename(projeto['imagem_artista'])}")
                 
                 try:
-                    returncode, erro_msg = self.executar_gerar_video_com_progresso(comando, projeto, log_filepath)
+                    returncode, erro_msg = self.executar_gerar_video_com_progresso(
+                        comando, projeto, log_filepath, progresso_callback
+                    )
                     
                     if returncode == 0:
-                        sucessos += 1
                         output_file = os.path.join(BASE_DIR, "Output", f"{projeto['artista_titulo']}.mp4")
+                        with lock:
+                            contadores['sucessos'] += 1
+                            if os.path.exists(output_file):
+                                videos_gerados.append(f"{projeto['artista_titulo']}.mp4")
+                                with open(log_filepath, 'a', encoding='utf-8') as f:
+                                    f.write(f"✅ Vídeo criado: {projeto['artista_titulo']}.mp4\n")
                         if os.path.exists(output_file):
-                            videos_gerados.append(f"{projeto['artista_titulo']}.mp4")
                             self.log(f"   ✅ Vídeo criado com sucesso: {projeto['artista_titulo']}.mp4")
-                            
-                            with open(log_filepath, 'a', encoding='utf-8') as f:
-                                f.write(f"✅ Vídeo criado: {projeto['artista_titulo']}.mp4\n")
                         else:
                             self.log(f"   ⚠️  Script executou mas vídeo não foi encontrado em: Output/{projeto['artista_titulo']}.mp4")
                     else:
-                        erros += 1
-                        erro_msg = f"   ❌ Erro ao gerar {projeto['artista_titulo']} (código: {returncode})"
-                        self.log(erro_msg)
-                        
-                        with open(log_filepath, 'a', encoding='utf-8') as f:
-                            f.write(f"{erro_msg}\n")
+                        registrar_erro(f"   ❌ Erro ao gerar {projeto['artista_titulo']} (código: {returncode})")
                             
                 except subprocess.TimeoutExpired:
-                    erros += 1
-                    erro_msg = f"   ⏰ Timeout ao gerar {projeto['artista_titulo']}"
-                    self.log(erro_msg)
-                    with open(log_filepath, 'a', encoding='utf-8') as f:
-                        f.write(f"{erro_msg}\n")
+                    registrar_erro(f"   ⏰ Timeout ao gerar {projeto['artista_titulo']}")
                 
                 except Exception as e:
-                    erros += 1
-                    erro_msg = f"   ❌ Erro ao gerar {projeto['artista_titulo']}: {str(e)}"
-                    self.log(erro_msg)
-                    with open(log_filepath, 'a', encoding='utf-8') as f:
-                        f.write(f"{erro_msg}\n")
+                    registrar_erro(f"   ❌ Erro ao gerar {projeto['artista_titulo']}: {str(e)}")
+            
+            agendador = AgendadorRenderizacao(gerar_projeto, log_callback=self.log)
+            agendador.executar(projetos_para_gerar)
+            
+            sucessos = contadores['sucessos']
+            erros = contadores['erros']
             
             self.log(f"\n📊 RESUMO DA GERAÇÃO:")
             self.log(f"   ✅ Sucessos: {sucessos}")
@@ -1065,10 +1176,12 @@ class MainApp:
             f.write(f"📋 Total de projetos encontrados: {len(projetos)}\n")
         
         projetos_para_gerar = []
+        # Nomes da biblioteca e da Output normalizados uma vez para o lote inteiro
+        indice_existentes = construir_indice(pasta_karaoke, os.path.join(BASE_DIR, "Output"))
         
         for projeto in projetos:
             nome_arquivo = projeto['artista_titulo']
-            video_existente = self.verificar_se_video_ja_existe(nome_arquivo, pasta_karaoke)
+            video_existente = self.verificar_se_video_ja_existe(nome_arquivo, indice_existentes)
             
             if video_existente:
                 self.log(f"   ⏭️  Já existe: {nome_arquivo}")
@@ -1090,6 +1203,15 @@ class MainApp:
                 f.write("✅ Todos os vídeos já estão gerados!\n")
             return
         
+        duracoes = [projeto['duracao'] for projeto in projetos_para_gerar]
+        simultaneos = AgendadorRenderizacao(None).max_simultaneos
+        eta = estimar_tempo_lote(duracoes, simultaneos)
+        msg_eta = (f"⏱️  Áudio total: {sum(duracoes) / 60:.1f} min | "
+                   f"Tempo estimado ({simultaneos} em paralelo): {int(eta // 3600):02d}:{int(eta % 3600 // 60):02d}h")
+        self.log(msg_eta)
+        with open(log_filepath, 'a', encoding='utf-8') as f:
+            f.write(f"{msg_eta}\n")
+        
         thread = threading.Thread(
             target=self.executar_gerar_video_thread,
             args=(projetos_para_gerar, log_filepath)
@@ -1099,6 +1221,19 @@ class MainApp:
 
     # ========== FUNÇÕES DOS SCRIPTS ORIGINAIS ==========
 
+    def executar_em_thread(self, funcao, **kwargs):
+        """Roda um script em segundo plano (janela e log seguem respondendo); o erro volta para a thread do Tk"""
+        def executar():
+            try:
+                funcao(log_callback=self.log, **kwargs)
+            except Exception as e:
+                self.log(f"❌ Erro: {str(e)}")
+                self.root.after(0, messagebox.showerror, "Erro", str(e))
+
+        thread = threading.Thread(target=executar)
+        thread.daemon = True
+        thread.start()
+
     def verificar(self):
         pasta = self.pasta_var.get()
         arquivo = self.arquivo_var.get()
@@ -1119,11 +1254,7 @@ class MainApp:
             messagebox.showerror("Erro", "Selecione a pasta de vídeos.")
             return
         self.log("🚀 Iniciando geração de thumbnails...")
-        try: 
-            gerar_thumb.run(log_callback=self.log, pasta_videos=pasta, arquivo_xlsx=arquivo)
-        except Exception as e: 
-            self.log(f"❌ Erro: {str(e)}")
-            messagebox.showerror("Erro", str(e))
+        self.executar_em_thread(gerar_thumb.run, pasta_videos=pasta, arquivo_xlsx=arquivo)
 
     def normalizar_nomes(self):
         pasta = self.pasta_var.get()
@@ -1131,12 +1262,10 @@ class MainApp:
         if not pasta or not arquivo: 
             messagebox.showerror("Erro", "Selecione pasta e arquivo .xlsx.")
             return
+        if not self.verificar_renomeacao_interrompida():
+            return
         self.log("🚀 Iniciando normalização de nomes...")
-        try: 
-            normalizar_nomes.run(log_callback=self.log, pasta_videos=pasta, arquivo_xlsx=arquivo)
-        except Exception as e: 
-            self.log(f"❌ Erro: {str(e)}")
-            messagebox.showerror("Erro", str(e))
+        self.executar_em_thread(normalizar_nomes.run, pasta_videos=pasta, arquivo_xlsx=arquivo)
 
     def gerar_nfo(self):
         pasta = self.pasta_var.get()
@@ -1145,11 +1274,16 @@ class MainApp:
             messagebox.showerror("Erro", "Selecione pasta e arquivo .xlsx.")
             return
         self.log("🚀 Iniciando geração de NFOs...")
-        try: 
-            gerar_nfo.run(log_callback=self.log, pasta_videos=pasta, arquivo_xlsx=arquivo)
-        except Exception as e: 
-            self.log(f"❌ Erro: {str(e)}")
-            messagebox.showerror("Erro", str(e))
+        self.executar_em_thread(gerar_nfo.run, pasta_videos=pasta, arquivo_xlsx=arquivo)
+
+    def sincronizar_nfos(self):
+        pasta = self.pasta_var.get()
+        arquivo = self.arquivo_var.get()
+        if not pasta or not arquivo: 
+            messagebox.showerror("Erro", "Selecione pasta e arquivo .xlsx.")
+            return
+        self.log("🚀 Iniciando sincronização de NFOs...")
+        self.executar_em_thread(gerar_nfo.run, pasta_videos=pasta, arquivo_xlsx=arquivo, sincronizar=True)
 
     def renomear_arquivos(self):
         pasta = self.pasta_var.get()
@@ -1157,20 +1291,55 @@ class MainApp:
         if not pasta or not arquivo: 
             messagebox.showerror("Erro", "Selecione pasta e arquivo .xlsx.")
             return
+        if not self.verificar_renomeacao_interrompida():
+            return
         self.log("🚀 Iniciando renomeação de arquivos...")
-        try: 
-            renomear_arquivos.run(log_callback=self.log, pasta_videos=pasta, arquivo_xlsx=arquivo)
-        except Exception as e: 
+        self.executar_em_thread(renomear_arquivos.run, pasta_videos=pasta, arquivo_xlsx=arquivo)
+
+    def verificar_renomeacao_interrompida(self):
+        """Oferece retomar ou desfazer uma renomeação interrompida. Retorna False para cancelar."""
+        interrompidos = renomeador.diarios_interrompidos()
+        if not interrompidos:
+            return True
+        resposta = messagebox.askyesnocancel(
+            "Renomeação interrompida",
+            f"Uma renomeação anterior não terminou ({os.path.basename(interrompidos[0])}).\n\n"
+            "Sim: retomar\nNão: desfazer o que já foi feito\nCancelar: não fazer nada agora"
+        )
+        if resposta is None:
+            return False
+        try:
+            if resposta:
+                renomeador.retomar(interrompidos[0], self.log)
+            else:
+                renomeador.desfazer(interrompidos[0], self.log)
+        except OSError as e:
+            messagebox.showerror("Erro", str(e))
+            return False
+        finally:
+            invalidar()
+        return True
+
+    def desfazer_renomeacao(self):
+        """Desfaz a última renomeação em lote (normalizar, renomear ou planilha)"""
+        caminho = renomeador.ultimo_diario_reversivel()
+        if not caminho:
+            messagebox.showinfo("Info", "Nenhuma renomeação para desfazer.")
+            return
+        if not messagebox.askyesno("Confirmação", f"Desfazer a renomeação registrada em {os.path.basename(caminho)}?"):
+            return
+        self.log("↩️ Desfazendo renomeação...")
+        try:
+            renomeador.desfazer(caminho, self.log)
+        except OSError as e:
             self.log(f"❌ Erro: {str(e)}")
             messagebox.showerror("Erro", str(e))
+        finally:
+            invalidar()
 
     def excluir_thumbs(self):
         pasta = self.pasta_var.get()
-        thumbs = []
-        for root_dir, _, files in os.walk(pasta):
-            for f in files:
-                if f.lower().endswith('.jpg'):
-                    thumbs.append(os.path.join(root_dir, f))
+        thumbs = list(obter_inventario(pasta, atualizar=True).capas)
         if not thumbs:
             messagebox.showinfo("Info", "Nenhuma thumbnail .jpg encontrada.")
             return
@@ -1180,15 +1349,12 @@ class MainApp:
                     os.remove(f)
                 except Exception as e:
                     self.log(f"   ⚠️  Erro ao excluir {f}: {e}")
+            invalidar(pasta)
             self.log(f"🗑️ {len(thumbs)} thumbnails excluídas em subpastas.")
 
     def excluir_nfos(self):
         pasta = self.pasta_var.get()
-        nfos = []
-        for root_dir, _, files in os.walk(pasta):
-            for f in files:
-                if f.lower().endswith('.nfo'):
-                    nfos.append(os.path.join(root_dir, f))
+        nfos = list(obter_inventario(pasta, atualizar=True).nfos)
         if not nfos:
             messagebox.showinfo("Info", "Nenhum arquivo .nfo encontrado.")
             return
@@ -1198,6 +1364,7 @@ class MainApp:
                     os.remove(f)
                 except Exception as e:
                     self.log(f"   ⚠️  Erro ao excluir {f}: {e}")
+            invalidar(pasta)
             self.log(f"🗑️ {len(nfos)} arquivos .nfo excluídos em subpastas.")
 
 if __name__ == "__main__":
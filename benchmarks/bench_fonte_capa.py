@@ -0,0 +1,107 @@
+"""
+Benchmark do ajuste de fonte das capas (gerar_thumb.calcular_tamanho_fonte_ideal).
+
+Compara o ajuste atual (busca binária + fontes em cache + larguras por palavra)
+com o algoritmo original (descendo de 2 em 2 px com textbbox em cada passo)
+sobre os títulos reais da planilha, conferindo se as decisões de layout
+(tamanho e quebra de linhas) são idênticas.
+
+Uso: python benchmarks/bench_fonte_capa.py [assets/Songs.xlsx]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import pandas as pd
+from PIL import Image, ImageDraw, ImageFont
+from scripts import gerar_thumb
+
+
+def quebrar_original(draw_obj, texto, fonte, max_largura, max_linhas=3):
+    palavras = texto.split()
+    linhas = []
+    linha_atual = ""
+    for palavra in palavras:
+        teste_linha = linha_atual + (" " if linha_atual else "") + palavra
+        bbox_teste = draw_obj.textbbox((0, 0), teste_linha, font=fonte)
+        if bbox_teste[2] - bbox_teste[0] <= max_largura:
+            linha_atual = teste_linha
+        else:
+            if linha_atual:
+                linhas.append(linha_atual)
+            bbox_palavra = draw_obj.textbbox((0, 0), palavra, font=fonte)
+            linha_atual = palavra
+            if bbox_palavra[2] - bbox_palavra[0] > max_largura and len(linhas) < max_linhas - 1:
+                linhas.append(linha_atual)
+                linha_atual = ""
+    if linha_atual and len(linhas) < max_linhas:
+        linhas.append(linha_atual)
+    return linhas
+
+
+def ajustar_original(draw_obj, texto, fonte_base, max_largura, max_altura, tamanho_minimo, tamanho_maximo):
+    tamanho_fonte = tamanho_maximo
+    fonte = ImageFont.truetype(fonte_base, tamanho_fonte)
+    while tamanho_fonte >= tamanho_minimo:
+        linhas = quebrar_original(draw_obj, texto, fonte, max_largura)
+        altura_total = 0
+        for linha in linhas:
+            bbox = draw_obj.textbbox((0, 0), linha, font=fonte)
+            altura_total += bbox[3] - bbox[1]
+        altura_total += altura_total * 0.2 * (len(linhas) - 1) if len(linhas) > 1 else 0
+        if altura_total <= max_altura and len(linhas) <= 3:
+            break
+        tamanho_fonte -= 2
+        fonte = ImageFont.truetype(fonte_base, tamanho_fonte)
+    return max(tamanho_fonte, tamanho_minimo), linhas
+
+
+def layout_capa(ajustar, draw_obj, titulo, artista):
+    """Mesmas chamadas feitas por gerar_capa para título e artista."""
+    max_largura = 1280 - 2 * 80
+    tamanho_titulo, linhas_titulo = ajustar(
+        draw_obj, titulo, gerar_thumb.FONT_MUSICA_BOLD, max_largura, 300, 60, 160)
+    tamanho_max_artista = max(int(tamanho_titulo * 0.8), 70)
+    tamanho_artista, linhas_artista = ajustar(
+        draw_obj, artista, gerar_thumb.FONT_ARTISTA_REGULAR, max_largura, 100, 40, tamanho_max_artista)
+    return tamanho_titulo, linhas_titulo, tamanho_artista, linhas_artista
+
+
+def main():
+    arquivo_xlsx = sys.argv[1] if len(sys.argv) > 1 else os.path.join("assets", "Songs.xlsx")
+    df = pd.read_excel(arquivo_xlsx, sheet_name="Biblioteca")
+    pares = []
+    for full_title in df["full_title"].dropna().astype(str):
+        if " - " in full_title:
+            artista, titulo = full_title.split(" - ", 1)
+        else:
+            artista, titulo = "Desconhecido", full_title
+        pares.append((titulo.split(" v")[0].strip(), artista))
+
+    draw_obj = ImageDraw.Draw(Image.new("RGB", (1280, 720)))
+
+    inicio = time.perf_counter()
+    referencia = [layout_capa(ajustar_original, draw_obj, t, a) for t, a in pares]
+    tempo_original = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    atual = [layout_capa(gerar_thumb.calcular_tamanho_fonte_ideal, draw_obj, t, a) for t, a in pares]
+    tempo_atual = time.perf_counter() - inicio
+
+    divergentes = [(par, ref, novo) for par, ref, novo in zip(pares, referencia, atual) if ref != novo]
+
+    print(f"Títulos: {len(pares)}")
+    print(f"Original: {tempo_original:.2f}s ({tempo_original / len(pares) * 1000:.1f} ms/capa)")
+    print(f"Atual:    {tempo_atual:.2f}s ({tempo_atual / len(pares) * 1000:.1f} ms/capa)")
+    print(f"Aceleração: {tempo_original / tempo_atual:.1f}x")
+    print(f"Layouts divergentes: {len(divergentes)}")
+    for (titulo, artista), ref, novo in divergentes[:20]:
+        print(f"  {artista} - {titulo}: original={ref} atual={novo}")
+
+    sys.exit(1 if divergentes else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark do tempo de importação da UI (python -X importtime -c "import app.ui").
+
+Executa a importação em processos novos, fica com a melhor de N execuções e
+mostra os módulos mais caros. Falha (código 1) se algum módulo pesado
+(pandas, openpyxl, numpy, PIL) voltar a ser importado na abertura da janela
+ou se o tempo total passar do limite.
+
+Uso: python benchmarks/bench_importtime.py [--repeticoes 5] [--limite-ms 250]
+"""
+import os
+import sys
+import argparse
+import subprocess
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Módulos que só devem ser carregados quando um comando precisa deles
+MODULOS_PESADOS = ("pandas", "openpyxl", "numpy", "PIL")
+
+
+def medir_importacao(modulo):
+    """Tempos cumulativos (µs) por módulo de uma importação em processo novo."""
+    resultado = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        cwd=RAIZ, capture_output=True, text=True,
+    )
+    if resultado.returncode != 0:
+        raise RuntimeError(f"Falha ao importar {modulo}:\n{resultado.stderr}")
+
+    tempos = {}
+    for linha in resultado.stderr.splitlines():
+        # "import time: <próprio> | <cumulativo> | <módulo indentado>"
+        if not linha.startswith("import time:"):
+            continue
+        campos = linha[len("import time:"):].split("|")
+        if len(campos) != 3 or not campos[1].strip().isdigit():
+            continue  # cabeçalho
+        tempos[campos[2].strip()] = int(campos[1])
+    return tempos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tempo de importação da UI")
+    parser.add_argument("--modulo", default="app.ui")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--limite-ms", type=float, default=250.0)
+    args = parser.parse_args()
+
+    execucoes = [medir_importacao(args.modulo) for _ in range(args.repeticoes)]
+    melhor = min(execucoes, key=lambda tempos: tempos.get(args.modulo, 0))
+    total_ms = melhor.get(args.modulo, 0) / 1000
+
+    print(f"Importação de {args.modulo}: {total_ms:.1f} ms (melhor de {args.repeticoes})")
+    print("Módulos mais caros (cumulativo):")
+    for nome, micros in sorted(melhor.items(), key=lambda item: item[1], reverse=True)[1:11]:
+        print(f"  {micros / 1000:8.1f} ms  {nome}")
+
+    pesados = sorted(nome for nome in melhor if nome.split(".")[0] in MODULOS_PESADOS and "." not in nome)
+    falhou = False
+    if pesados:
+        print(f"ERRO: módulos pesados importados na abertura: {', '.join(pesados)}")
+        falhou = True
+    if total_ms > args.limite_ms:
+        print(f"ERRO: importação acima do limite de {args.limite_ms:.0f} ms")
+        falhou = True
+
+    sys.exit(1 if falhou else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Benchmark da leitura da planilha usada pelo renomear_arquivos.
+
+Compara a leitura antiga (load_workbook completo com data_only=True, todas
+as abas e todas as colunas) com a leitura atual do catálogo (somente
+leitura, streaming só das abas Biblioteca/Karaoke e do intervalo de colunas
+resolvido pelo cabeçalho) e com o catálogo compilado (SQLite). Mede tempo
+(melhor de N) e pico de memória (tracemalloc, em execução separada) e
+confere se filename/music_id por linha e o mapa music_id → full_title
+são os mesmos.
+
+Com --linhas N é gerada uma planilha sintética com N linhas por aba, mais
+colunas e uma aba extra que não é lida.
+
+Uso: python benchmarks/bench_planilha.py [assets/Songs.xlsx] [--linhas 20000] [--repeticoes 3]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+from scripts import catalogo
+
+
+def leitura_original(arquivo_xlsx):
+    """Leitura do renomear_arquivos antes do catálogo."""
+    wb = load_workbook(arquivo_xlsx, data_only=True)
+    ws = wb["Karaoke"]
+    header = [cell.value for cell in ws[1]]
+    idx_filename = header.index("filename")
+    idx_music_id = header.index("music_id")
+
+    ws_biblioteca = wb["Biblioteca"]
+    header_biblioteca = [cell.value for cell in ws_biblioteca[1]]
+    idx_bib_music_id = header_biblioteca.index("music_id")
+    idx_bib_fulltitle = header_biblioteca.index("full_title")
+
+    fulltitle_map = {}
+    for row in ws_biblioteca.iter_rows(min_row=2, values_only=True):
+        music_id, full_title = row[idx_bib_music_id], row[idx_bib_fulltitle]
+        if music_id and full_title:
+            fulltitle_map[str(music_id)] = str(full_title)
+
+    linhas = {}
+    for i, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
+        filename, music_id = row[idx_filename], row[idx_music_id]
+        if filename or music_id:
+            linhas[i] = (filename and str(filename), music_id and str(music_id))
+    return linhas, fulltitle_map
+
+
+def resumir_catalogo(abas):
+    """Mesmo resultado de leitura_original a partir das abas do catálogo."""
+    karaoke, biblioteca = abas["Karaoke"], abas["Biblioteca"]
+    fulltitle_map = {}
+    for music_id, full_title in biblioteca[["music_id", "full_title"]].dropna().itertuples(index=False):
+        if music_id and full_title:
+            fulltitle_map[music_id] = full_title
+    linhas = {}
+    for i, filename, music_id in karaoke[["filename", "music_id"]].itertuples():
+        filename = filename if pd.notna(filename) else None
+        music_id = music_id if pd.notna(music_id) else None
+        if filename or music_id:
+            linhas[i] = (filename, music_id)
+    return linhas, fulltitle_map
+
+
+def leitura_catalogo(arquivo_xlsx):
+    return resumir_catalogo(catalogo.ler_workbook(arquivo_xlsx))
+
+
+def leitura_compilado(arquivo_xlsx):
+    compilado = catalogo.ler_compilado(arquivo_xlsx, catalogo.assinatura_planilha(arquivo_xlsx))
+    return resumir_catalogo(compilado.abas)
+
+
+def gerar_planilha(caminho, linhas):
+    """Planilha sintética no formato do Songs.xlsx, com colunas e aba extras."""
+    # Workbook normal (não write_only): grava o <dimension> das abas como o Excel;
+    # sem ele o modo somente leitura varre a aba inteira só para medir o tamanho
+    wb = Workbook()
+    wb.remove(wb.active)
+    biblioteca = wb.create_sheet("Biblioteca")
+    biblioteca.append(["full_title", "music_id", "title", "artist", "genre", "world", "album"]
+                      + [f"extra_{i}" for i in range(8)])
+    karaoke = wb.create_sheet("Karaoke")
+    karaoke.append(["music_id", "full_title", "filename", "tag_1", "tag_2", "tag_3"]
+                   + [f"extra_{i}" for i in range(8)])
+    historico = wb.create_sheet("Historico")
+    historico.append([f"coluna_{i}" for i in range(20)])
+
+    for n in range(1, linhas + 1):
+        music_id = f"mzk{n:05d}"
+        artista, titulo = f"Artista {n % 700}", f"Música {n}"
+        full_title = f"{artista} - {titulo}"
+        biblioteca.append([full_title, music_id, titulo, artista, "Pop", "Nacional", "Álbum"]
+                          + [f"valor {n} {i}" for i in range(8)])
+        karaoke.append([music_id, full_title, f"{music_id}.mp4", "Festa", "Anos 80" if n % 3 else None, None]
+                       + [n * i for i in range(8)])
+        historico.append([n * i for i in range(20)])
+    wb.save(caminho)
+
+
+def medir_tempo(funcao, arquivo_xlsx, repeticoes):
+    melhor = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao(arquivo_xlsx)
+        tempo = time.perf_counter() - inicio
+        melhor = tempo if melhor is None else min(melhor, tempo)
+    return melhor, resultado
+
+
+def medir_memoria(funcao, arquivo_xlsx):
+    tracemalloc.start()
+    try:
+        funcao(arquivo_xlsx)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Leitura da planilha: original x catálogo")
+    parser.add_argument("arquivo", nargs="?", default=os.path.join("assets", "Songs.xlsx"))
+    parser.add_argument("--linhas", type=int, default=0, help="gera uma planilha sintética com N linhas")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta_temp:
+        arquivo_xlsx = args.arquivo
+        if args.linhas:
+            arquivo_xlsx = os.path.join(pasta_temp, "Songs.xlsx")
+            gerar_planilha(arquivo_xlsx, args.linhas)
+            print(f"Planilha sintética: {args.linhas} linhas por aba")
+        print(f"Planilha: {arquivo_xlsx} ({os.path.getsize(arquivo_xlsx) / 1024:.0f} KB)")
+
+        catalogo.compilar_catalogo(arquivo_xlsx)
+        leituras = [
+            ("Original (load_workbook completo)", leitura_original),
+            ("Catálogo (somente leitura, colunas)", leitura_catalogo),
+            ("Catálogo compilado (SQLite)", leitura_compilado),
+        ]
+
+        resultados = []
+        for nome, funcao in leituras:
+            tempo, resultado = medir_tempo(funcao, arquivo_xlsx, args.repeticoes)
+            pico = medir_memoria(funcao, arquivo_xlsx)
+            resultados.append(resultado)
+            print(f"{nome:38s} {tempo * 1000:9.0f} ms  pico {pico / 1024 / 1024:8.1f} MB")
+
+        if args.linhas:
+            os.remove(catalogo.caminho_compilado(arquivo_xlsx))
+
+    divergentes = [nome for (nome, _), resultado in zip(leituras[1:], resultados[1:]) if resultado != resultados[0]]
+    print(f"Linhas do Karaoke: {len(resultados[0][0])}, títulos na Biblioteca: {len(resultados[0][1])}")
+    if divergentes:
+        print(f"ERRO: resultado diferente da leitura original: {', '.join(divergentes)}")
+    sys.exit(1 if divergentes else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Benchmark e conferência do plano de renomeações (scripts.renomeador).
+
+Confere, aplicando de verdade numa pasta temporária, os casos em que o
+destino está ocupado por um arquivo que também será movido: troca A↔B e a
+cadeia v3→v2→v1 pedida nas duas ordens, além de um destino ocupado por
+arquivo parado (conflito) e de um conflito que trava a cadeia inteira.
+Confere também o desfazer retomado depois de falhar no meio, com um passo
+executado mas não registrado no diário.
+Depois mede o planejamento de um lote grande. Falha (código 1) se algum caso
+der resultado diferente do esperado ou se o plano passar do limite.
+
+Uso: python benchmarks/bench_renomeador.py [--videos 20000] [--limite-ms 2000]
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from scripts import renomeador
+from scripts.renomeador import PlanoRenomeacao, aplicar, desfazer, _registrar
+
+# (descrição, arquivos iniciais, pedidos (origem, destino), conteúdo esperado: nome → conteúdo original)
+CASOS = [
+    ("troca A↔B",
+     ["A.mp4", "A.jpg", "B.mp4", "B.nfo"],
+     [("A.mp4", "B.mp4"), ("B.mp4", "A.mp4")],
+     {"B.mp4": "A.mp4", "B.jpg": "A.jpg", "A.mp4": "B.mp4", "A.nfo": "B.nfo"}),
+    ("cadeia v2→v1, v3→v2",
+     ["X v2.mp4", "X v2.jpg", "X v3.mp4", "X v3.jpg"],
+     [("X v2.mp4", "X.mp4"), ("X v3.mp4", "X v2.mp4")],
+     {"X.mp4": "X v2.mp4", "X.jpg": "X v2.jpg", "X v2.mp4": "X v3.mp4", "X v2.jpg": "X v3.jpg"}),
+    ("cadeia v3→v2, v2→v1",
+     ["X v2.mp4", "X v2.jpg", "X v3.mp4", "X v3.jpg"],
+     [("X v3.mp4", "X v2.mp4"), ("X v2.mp4", "X.mp4")],
+     {"X.mp4": "X v2.mp4", "X.jpg": "X v2.jpg", "X v2.mp4": "X v3.mp4", "X v2.jpg": "X v3.jpg"}),
+    ("destino de arquivo parado",
+     ["A.mp4", "B.mp4"],
+     [("A.mp4", "B.mp4")],
+     {"A.mp4": "A.mp4", "B.mp4": "B.mp4"}),
+    ("cadeia travada por arquivo parado",
+     ["X.mp4", "X v2.mp4", "X v3.mp4"],
+     [("X v3.mp4", "X v2.mp4"), ("X v2.mp4", "X.mp4")],
+     {"X.mp4": "X.mp4", "X v2.mp4": "X v2.mp4", "X v3.mp4": "X v3.mp4"}),
+]
+
+
+def conferir_caso(pasta, iniciais, pedidos, esperado):
+    for nome in iniciais:
+        with open(os.path.join(pasta, nome), "w", encoding="utf-8") as f:
+            f.write(nome)
+    plano = PlanoRenomeacao([os.path.join(pasta, n) for n in iniciais])
+    for origem, destino in pedidos:
+        plano.mover(os.path.join(pasta, origem), os.path.join(pasta, destino))
+    aplicar(plano, pasta)
+
+    obtido = {}
+    for nome in os.listdir(pasta):
+        with open(os.path.join(pasta, nome), "r", encoding="utf-8") as f:
+            obtido[nome] = f.read()
+    return obtido == esperado, obtido
+
+
+def conferir_desfazer(pasta):
+    """
+    Passos 0 e 1 no diário, passo 2 feito no disco sem registro. O primeiro
+    desfazer reverte o 2 e falha no 1 (origem recriada); o segundo, depois de
+    liberar a origem, precisa reverter o 1 e o 0.
+    """
+    passos = [(os.path.join(pasta, f"{n}.mp4"), os.path.join(pasta, f"{n} novo.mp4")) for n in "ABC"]
+    for origem, destino in passos:
+        with open(destino, "w", encoding="utf-8") as f:
+            f.write(os.path.basename(origem))
+    diario = os.path.join(pasta, "diario.jsonl")
+    _registrar(diario, {"criado": "0", "raiz": pasta, "passos": passos})
+    _registrar(diario, {"feito": 0})
+    _registrar(diario, {"feito": 1})
+
+    bloqueio = passos[1][0]
+    open(bloqueio, "w").close()
+    try:
+        desfazer(diario)
+        return False, "primeiro desfazer não falhou"
+    except OSError:
+        pass
+    os.remove(bloqueio)
+    desfazer(diario)
+
+    restantes = sorted(n for n in os.listdir(pasta) if n.endswith(".mp4"))
+    return restantes == ["A.mp4", "B.mp4", "C.mp4"], restantes
+
+
+def conferir_regras():
+    falhas = 0
+    base = tempfile.mkdtemp(prefix="bench_renomeador_")
+    renomeador.DIARIOS_DIR = os.path.join(base, "diarios")
+    try:
+        for i, (descricao, iniciais, pedidos, esperado) in enumerate(CASOS):
+            pasta = os.path.join(base, str(i))
+            os.makedirs(pasta)
+            ok, obtido = conferir_caso(pasta, iniciais, pedidos, esperado)
+            falhas += not ok
+            print(f"  {'ok  ' if ok else 'ERRO'} {descricao:34s} {'' if ok else obtido}")
+        pasta = os.path.join(base, "desfazer")
+        os.makedirs(pasta)
+        ok, obtido = conferir_desfazer(pasta)
+        falhas += not ok
+        print(f"  {'ok  ' if ok else 'ERRO'} {'desfazer retomado após falha':34s} {'' if ok else obtido}")
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+    return falhas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plano de renomeações")
+    parser.add_argument("--videos", type=int, default=20000)
+    parser.add_argument("--limite-ms", type=float, default=2000.0)
+    args = parser.parse_args()
+
+    print("Trocas, cadeias e conflitos:")
+    falhas = conferir_regras()
+
+    # Lote sintético: cada título com v1..v3 (mais capa), todos descendo uma versão
+    existentes = []
+    pedidos = []
+    for i in range(args.videos // 3):
+        base = f"/k/{i % 50}/Artista {i} - Musica"
+        existentes += [f"{base} v2.mp4", f"{base} v2.jpg", f"{base} v3.mp4", f"{base} v3.jpg"]
+        pedidos += [(f"{base} v3.mp4", f"{base} v2.mp4"), (f"{base} v2.mp4", f"{base}.mp4")]
+
+    inicio = time.perf_counter()
+    plano = PlanoRenomeacao(existentes)
+    for origem, destino in pedidos:
+        plano.mover(origem, destino)
+    passos = plano.passos()
+    total_ms = (time.perf_counter() - inicio) * 1000
+
+    print(f"Lote sintético: {len(pedidos)} pedidos, {len(plano)} movimentos, {len(passos)} passos, "
+          f"{len(plano.conflitos)} conflitos")
+    print(f"Planejamento: {total_ms:.0f} ms")
+
+    if len(plano.conflitos) or len(plano) != len(existentes):
+        print("ERRO: lote sintético com conflitos inesperados")
+        falhas += 1
+    if falhas:
+        print(f"ERRO: {falhas} caso(s) com resultado inesperado")
+    if total_ms > args.limite_ms:
+        print(f"ERRO: planejamento acima do limite de {args.limite_ms:.0f} ms")
+    sys.exit(1 if falhas or total_ms > args.limite_ms else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark e conferência do índice de vídeos já gerados (scripts.videos_existentes).
+
+Confere as regras de correspondência de IndiceVideosExistentes.buscar em
+casos fixos (nome igual, sufixo vN de qualquer lado, contido com pelo menos
+3 palavras, nomes curtos que não podem casar) e mede a construção do índice
+e a verificação de um lote sobre uma biblioteca sintética. Falha (código 1)
+se algum caso der resultado diferente do esperado ou se o lote passar do
+limite.
+
+Uso: python benchmarks/bench_videos_existentes.py [--videos 20000] [--projetos 500] [--limite-ms 1000]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from scripts.videos_existentes import IndiceVideosExistentes
+
+BIBLIOTECA = [
+    "/k/Pop/Ana Carolina - Garganta.mp4",
+    "/k/Pop/Banana Split - Tempo Bom v2.mp4",
+    "/k/MPB/Zé_Ramalho & Amigos - Chão de Giz.mkv",
+    "/k/Rock/Legião Urbana - Tempo Perdido v3.mp4",
+    "/k/Rock/Titãs - Epitáfio.mp4",
+    "/out/Skank - Garota Nacional (Ao Vivo).mp4",
+    "/out/Titãs - Epitáfio.mp4",
+]
+
+# (nome do projeto, vídeo esperado ou None, regra)
+CASOS = [
+    ("Ana Carolina - Garganta", "/k/Pop/Ana Carolina - Garganta.mp4", "1: nome igual"),
+    ("ANA CAROLINA   garganta", "/k/Pop/Ana Carolina - Garganta.mp4", "1: caixa e espaços"),
+    ("Zé Ramalho e Amigos - Chão de Giz", "/k/MPB/Zé_Ramalho & Amigos - Chão de Giz.mkv", "1: & e _"),
+    ("Titãs - Epitáfio", "/k/Rock/Titãs - Epitáfio.mp4", "1: biblioteca antes da Output"),
+    ("Banana Split - Tempo Bom", "/k/Pop/Banana Split - Tempo Bom v2.mp4", "2: vN no vídeo"),
+    ("Ana Carolina - Garganta v2", "/k/Pop/Ana Carolina - Garganta.mp4", "2: vN no projeto"),
+    ("Legião Urbana - Tempo Perdido v2", "/k/Rock/Legião Urbana - Tempo Perdido v3.mp4", "2: vN dos dois lados"),
+    ("Skank - Garota Nacional", "/out/Skank - Garota Nacional (Ao Vivo).mp4", "3: projeto contido no vídeo"),
+    ("Ana Carolina - Garganta (Remix)", "/k/Pop/Ana Carolina - Garganta.mp4", "3: vídeo contido no projeto"),
+    ("Ana", None, "3: parte de palavra (Banana)"),
+    ("Tempo", None, "3: uma palavra contida"),
+    ("Tempo Bom", None, "3: duas palavras contidas"),
+    ("Split - Tempo", None, "3: duas palavras contidas"),
+    ("Nacional Garota Skank", None, "3: palavras fora de ordem"),
+    ("Carolina Garganta", None, "3: palavras não contíguas"),
+    ("", None, "nome vazio"),
+]
+
+
+def conferir_regras():
+    indice = IndiceVideosExistentes(BIBLIOTECA)
+    falhas = 0
+    for nome, esperado, regra in CASOS:
+        obtido = indice.buscar(nome)
+        ok = obtido == esperado
+        falhas += not ok
+        print(f"  {'ok  ' if ok else 'ERRO'} {regra:32s} {nome!r} -> {obtido}")
+    return falhas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Índice de vídeos já gerados")
+    parser.add_argument("--videos", type=int, default=20000)
+    parser.add_argument("--projetos", type=int, default=500)
+    parser.add_argument("--limite-ms", type=float, default=1000.0)
+    args = parser.parse_args()
+
+    print("Regras de correspondência:")
+    falhas = conferir_regras()
+
+    random.seed(1)
+    palavras = [f"palavra{i}" for i in range(3000)]
+    caminhos = [f"/k/{i % 50}/" + " ".join(random.sample(palavras, random.randint(3, 8))) + ".mp4"
+                for i in range(args.videos)]
+    projetos = [" ".join(random.sample(palavras, random.randint(2, 9))) for _ in range(args.projetos)]
+    # Parte do lote já existe na biblioteca
+    projetos += [os.path.splitext(os.path.basename(c))[0] for c in random.sample(caminhos, args.projetos // 5)]
+
+    inicio = time.perf_counter()
+    indice = IndiceVideosExistentes(caminhos)
+    construcao = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    existentes = sum(1 for nome in projetos if indice.buscar(nome))
+    verificacao = time.perf_counter() - inicio
+    total_ms = (construcao + verificacao) * 1000
+
+    print(f"Biblioteca sintética: {args.videos} vídeos, {len(projetos)} projetos ({existentes} já existentes)")
+    print(f"Construção do índice: {construcao * 1000:.0f} ms | verificação do lote: {verificacao * 1000:.0f} ms")
+
+    if falhas:
+        print(f"ERRO: {falhas} caso(s) com resultado inesperado")
+    if total_ms > args.limite_ms:
+        print(f"ERRO: pré-verificação acima do limite de {args.limite_ms:.0f} ms")
+    sys.exit(1 if falhas or total_ms > args.limite_ms else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,10 @@
 import tkinter as tk
+import multiprocessing
 from app.ui import MainApp
 
 if __name__ == "__main__":
+    # Necessário para os pools de processos no executável gerado pelo cx_Freeze
+    multiprocessing.freeze_support()
     root = tk.Tk()
     app = MainApp(root)
     root.mainloop()
@@ -0,0 +1,435 @@
+"""
+Varredura e índice da biblioteca de karaokê.
+
+As pastas são listadas com os.scandir (os dados de stat do DirEntry já vêm
+da listagem no Windows) e o resultado vira um inventário: vídeos com chave
+normalizada, versão (sufixo vN) e capa/NFO relacionados, além de todos os
+.jpg e .nfo encontrados.
+
+O índice SQLite (cache/biblioteca.sqlite) guarda a última listagem de cada
+pasta; a cada sessão só as pastas cujo mtime mudou são listadas de novo.
+O inventário fica em memória durante a sessão; scripts que alteram arquivos
+chamam `invalidar`.
+"""
+import os
+import re
+import sqlite3
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from scripts.verificar_arquivos import VIDEO_EXTENSOES, normalizar_nome
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(BASE_DIR, "..", "cache")
+INDICE_FILE = os.path.join(CACHE_DIR, "biblioteca.sqlite")
+
+EXTENSOES_RELACIONADAS = {".jpg", ".nfo"}
+RE_VERSAO = re.compile(r' v(\d+)$', re.IGNORECASE)
+
+
+def versao_do_nome(nome):
+    """Número da versão pelo sufixo vN (1 quando não há sufixo)."""
+    m = RE_VERSAO.search(nome)
+    return int(m.group(1)) if m else 1
+
+
+@dataclass
+class ArquivoMidia:
+    caminho: str
+    pasta: str
+    nome: str  # sem extensão
+    ext: str
+    tamanho: int
+    mtime_ns: int
+    chave: str  # nome normalizado (sem vN, minúsculas)
+    versao: int
+    capa: Optional[str] = None
+    nfo: Optional[str] = None
+
+    @property
+    def arquivo(self):
+        return self.nome + self.ext
+
+
+@dataclass
+class Inventario:
+    raiz: str
+    videos: List[ArquivoMidia] = field(default_factory=list)
+    capas: List[str] = field(default_factory=list)
+    nfos: List[str] = field(default_factory=list)
+    # Nome do arquivo (qualquer tipo) → caminhos, na ordem da varredura
+    por_arquivo: Dict[str, List[str]] = field(default_factory=dict)
+
+    def por_chave(self):
+        """Vídeos agrupados pela chave normalizada, ordenados pela versão."""
+        grupos = {}
+        for video in self.videos:
+            grupos.setdefault(video.chave, []).append(video)
+        for lista in grupos.values():
+            lista.sort(key=lambda v: v.versao)
+        return grupos
+
+
+def listar_pasta(pasta):
+    """
+    Lista uma pasta em ordem de nome. Retorna (arquivos, subpastas), com
+    arquivos como (nome_arquivo, tamanho, mtime_ns); tamanho e mtime só são
+    lidos para vídeos (None nos demais).
+    """
+    arquivos = []
+    subpastas = []
+    with os.scandir(pasta) as it:
+        entradas = sorted(it, key=lambda e: e.name)
+
+    for entrada in entradas:
+        try:
+            if entrada.is_dir():
+                # Como os.walk, não entra em links simbólicos de pastas
+                if not entrada.is_symlink():
+                    subpastas.append(entrada.path)
+                continue
+            if not entrada.is_file():
+                continue
+            tamanho = mtime_ns = None
+            if os.path.splitext(entrada.name)[1].lower() in VIDEO_EXTENSOES:
+                st = entrada.stat()
+                tamanho, mtime_ns = st.st_size, st.st_mtime_ns
+        except OSError:
+            continue
+        arquivos.append((entrada.name, tamanho, mtime_ns))
+    return arquivos, subpastas
+
+
+def montar_pasta(inventario, pasta, arquivos):
+    """Adiciona ao inventário os arquivos de uma pasta, ligando cada vídeo à sua capa e NFO."""
+    relacionados = {}
+    videos = []
+    for nome_arquivo, tamanho, mtime_ns in arquivos:
+        caminho = os.path.join(pasta, nome_arquivo)
+        inventario.por_arquivo.setdefault(nome_arquivo, []).append(caminho)
+        nome, ext = os.path.splitext(nome_arquivo)
+        ext_lower = ext.lower()
+        if ext_lower in VIDEO_EXTENSOES:
+            videos.append(ArquivoMidia(
+                caminho=caminho,
+                pasta=pasta,
+                nome=nome,
+                ext=ext,
+                tamanho=tamanho,
+                mtime_ns=mtime_ns,
+                chave=normalizar_nome(nome),
+                versao=versao_do_nome(nome),
+            ))
+        elif ext_lower in EXTENSOES_RELACIONADAS:
+            relacionados[(nome, ext_lower)] = caminho
+            (inventario.capas if ext_lower == ".jpg" else inventario.nfos).append(caminho)
+
+    for video in videos:
+        video.capa = relacionados.get((video.nome, ".jpg"))
+        video.nfo = relacionados.get((video.nome, ".nfo"))
+    inventario.videos.extend(videos)
+
+
+def varrer(raiz):
+    """Percorre `raiz` sem índice (arquivos de cada pasta antes das subpastas, como os.walk)."""
+    inventario = Inventario(raiz=raiz)
+    pendentes = [raiz]
+    while pendentes:
+        pasta = pendentes.pop()
+        try:
+            arquivos, subpastas = listar_pasta(pasta)
+        except OSError:
+            continue
+        montar_pasta(inventario, pasta, arquivos)
+        # Pilha: subpastas em ordem reversa para visitar na ordem da listagem
+        pendentes.extend(reversed(subpastas))
+    return inventario
+
+
+class IndiceBiblioteca:
+    """
+    Índice persistente (SQLite em cache/biblioteca.sqlite) dos arquivos da biblioteca.
+
+    Guarda, para cada pasta, o mtime e a pasta pai; para cada arquivo, tamanho,
+    mtime, chave normalizada, versão e presença de capa/NFO. `atualizar` faz um
+    stat por pasta conhecida e relista apenas as pastas cujo mtime mudou (o
+    mtime de uma pasta muda quando arquivos são criados, apagados ou
+    renomeados nela). Assim, numa pasta de rede, só as pastas alteradas são
+    listadas de novo.
+
+    Limitação: um arquivo sobrescrito no lugar (mesmo nome) não muda o mtime
+    da pasta, então `tamanho` e `mtime_ns` dele ficam com os valores da última
+    listagem até a pasta mudar. Nenhum script decide nada por esses campos;
+    quem precisar deles atualizados deve fazer o stat do próprio arquivo.
+    """
+
+    ESQUEMA = """
+        CREATE TABLE IF NOT EXISTS pastas (
+            raiz TEXT NOT NULL,
+            caminho TEXT NOT NULL,
+            pai TEXT,
+            mtime_ns INTEGER,
+            PRIMARY KEY (raiz, caminho)
+        );
+        CREATE TABLE IF NOT EXISTS arquivos (
+            raiz TEXT NOT NULL,
+            pasta TEXT NOT NULL,
+            arquivo TEXT NOT NULL,
+            ext TEXT NOT NULL,
+            tamanho INTEGER,
+            mtime_ns INTEGER,
+            chave TEXT,
+            versao INTEGER,
+            tem_capa INTEGER NOT NULL DEFAULT 0,
+            tem_nfo INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (raiz, pasta, arquivo)
+        );
+        CREATE INDEX IF NOT EXISTS arquivos_chave ON arquivos (raiz, chave);
+        CREATE INDEX IF NOT EXISTS arquivos_nome ON arquivos (raiz, arquivo);
+    """
+
+    def __init__(self, arquivo=INDICE_FILE):
+        self.arquivo = arquivo
+        self._lock_atualizacao = threading.Lock()
+        os.makedirs(os.path.dirname(arquivo), exist_ok=True)
+        with self._conectar() as conn:
+            conn.executescript(self.ESQUEMA)
+
+    def _conectar(self):
+        return sqlite3.connect(self.arquivo, timeout=30)
+
+    def atualizar(self, raiz):
+        """Sincroniza o índice de `raiz` com o disco. Retorna o número de pastas relistadas."""
+        raiz = os.path.abspath(raiz)
+        with self._lock_atualizacao, self._conectar() as conn:
+            conhecidas = {}
+            filhas = {}
+            for caminho, pai, mtime_ns in conn.execute(
+                    "SELECT caminho, pai, mtime_ns FROM pastas WHERE raiz = ?", (raiz,)):
+                conhecidas[caminho] = mtime_ns
+                filhas.setdefault(pai, []).append(caminho)
+
+            vistas = set()
+            relistadas = 0
+            pendentes = [(raiz, None)]
+            while pendentes:
+                pasta, pai = pendentes.pop()
+                try:
+                    mtime_ns = os.stat(pasta).st_mtime_ns
+                except OSError:
+                    continue  # pasta removida: sai do índice abaixo
+                vistas.add(pasta)
+
+                if conhecidas.get(pasta) == mtime_ns:
+                    subpastas = filhas.get(pasta, [])
+                else:
+                    try:
+                        arquivos, subpastas = listar_pasta(pasta)
+                    except OSError:
+                        continue
+                    self._gravar_pasta(conn, raiz, pasta, pai, mtime_ns, arquivos)
+                    relistadas += 1
+                pendentes.extend((subpasta, pasta) for subpasta in subpastas)
+
+            removidas = [(raiz, pasta) for pasta in conhecidas if pasta not in vistas]
+            conn.executemany("DELETE FROM pastas WHERE raiz = ? AND caminho = ?", removidas)
+            conn.executemany("DELETE FROM arquivos WHERE raiz = ? AND pasta = ?", removidas)
+        return relistadas
+
+    @staticmethod
+    def _gravar_pasta(conn, raiz, pasta, pai, mtime_ns, arquivos):
+        nomes = {os.path.splitext(nome_arquivo) for nome_arquivo, _, _ in arquivos}
+        linhas = []
+        for nome_arquivo, tamanho, mtime_ns_arquivo in arquivos:
+            nome, ext = os.path.splitext(nome_arquivo)
+            chave = versao = None
+            if ext.lower() in VIDEO_EXTENSOES:
+                chave, versao = normalizar_nome(nome), versao_do_nome(nome)
+            linhas.append((raiz, pasta, nome_arquivo, ext.lower(), tamanho, mtime_ns_arquivo, chave, versao,
+                           int((nome, ".jpg") in nomes), int((nome, ".nfo") in nomes)))
+
+        conn.execute("INSERT OR REPLACE INTO pastas (raiz, caminho, pai, mtime_ns) VALUES (?, ?, ?, ?)",
+                     (raiz, pasta, pai, mtime_ns))
+        conn.execute("DELETE FROM arquivos WHERE raiz = ? AND pasta = ?", (raiz, pasta))
+        conn.executemany("INSERT INTO arquivos VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", linhas)
+
+    def inventario(self, raiz):
+        """Monta o Inventario de `raiz` a partir do índice (na mesma ordem de `varrer`)."""
+        raiz_abs = os.path.abspath(raiz)
+        with self._conectar() as conn:
+            filhas = {}
+            for caminho, pai in conn.execute("SELECT caminho, pai FROM pastas WHERE raiz = ?", (raiz_abs,)):
+                filhas.setdefault(pai, []).append(caminho)
+            arquivos = {}
+            for pasta, arquivo, tamanho, mtime_ns in conn.execute(
+                    "SELECT pasta, arquivo, tamanho, mtime_ns FROM arquivos WHERE raiz = ?", (raiz_abs,)):
+                arquivos.setdefault(pasta, []).append((arquivo, tamanho, mtime_ns))
+
+        inventario = Inventario(raiz=raiz)
+        pendentes = [raiz_abs] if raiz_abs in filhas.get(None, []) else []
+        while pendentes:
+            pasta = pendentes.pop()
+            montar_pasta(inventario, pasta, sorted(arquivos.get(pasta, [])))
+            pendentes.extend(sorted(filhas.get(pasta, []), reverse=True))
+        return inventario
+
+    # ---- Consultas ----
+
+    def _consultar(self, sql, parametros):
+        with self._conectar() as conn:
+            return [os.path.join(pasta, arquivo) for pasta, arquivo in conn.execute(sql, parametros)]
+
+    def videos_por_chave(self, raiz, chave):
+        """Caminhos dos vídeos com a chave normalizada (todas as versões), pela versão."""
+        return self._consultar(
+            "SELECT pasta, arquivo FROM arquivos WHERE raiz = ? AND chave = ? ORDER BY versao, pasta, arquivo",
+            (os.path.abspath(raiz), chave))
+
+    def arquivos_por_nome(self, raiz, nome_arquivo):
+        """Caminhos de todos os arquivos com exatamente esse nome."""
+        return self._consultar(
+            "SELECT pasta, arquivo FROM arquivos WHERE raiz = ? AND arquivo = ? ORDER BY pasta",
+            (os.path.abspath(raiz), nome_arquivo))
+
+    def videos_sem_capa(self, raiz):
+        return self._consultar(
+            "SELECT pasta, arquivo FROM arquivos WHERE raiz = ? AND chave IS NOT NULL AND tem_capa = 0 "
+            "ORDER BY pasta, arquivo", (os.path.abspath(raiz),))
+
+    def videos_sem_nfo(self, raiz):
+        return self._consultar(
+            "SELECT pasta, arquivo FROM arquivos WHERE raiz = ? AND chave IS NOT NULL AND tem_nfo = 0 "
+            "ORDER BY pasta, arquivo", (os.path.abspath(raiz),))
+
+    def pastas(self, raiz):
+        """Todas as pastas indexadas de `raiz`."""
+        with self._conectar() as conn:
+            return [caminho for (caminho,) in conn.execute(
+                "SELECT caminho FROM pastas WHERE raiz = ?", (os.path.abspath(raiz),))]
+
+    def chaves(self, raiz):
+        """Conjunto das chaves normalizadas dos vídeos indexados."""
+        with self._conectar() as conn:
+            return {chave for (chave,) in conn.execute(
+                "SELECT DISTINCT chave FROM arquivos WHERE raiz = ? AND chave IS NOT NULL",
+                (os.path.abspath(raiz),))}
+
+
+_inventarios = {}
+_sincronizados = set()  # raízes com o índice sincronizado nesta sessão (desde o último invalidar)
+_indice = None
+_lock = threading.Lock()
+
+
+def obter_indice():
+    global _indice
+    with _lock:
+        if _indice is None:
+            _indice = IndiceBiblioteca()
+        return _indice
+
+
+def obter_inventario(raiz, atualizar=False):
+    """
+    Inventário da sessão para `raiz`. Na primeira chamada (ou com `atualizar`)
+    sincroniza o índice SQLite, relistando só as pastas alteradas; se o índice
+    não puder ser usado, varre a pasta inteira.
+    """
+    chave = os.path.abspath(raiz)
+    with _lock:
+        inventario = _inventarios.get(chave)
+    if inventario is None or atualizar:
+        try:
+            indice = obter_indice()
+            indice.atualizar(raiz)
+            inventario = indice.inventario(raiz)
+            with _lock:
+                _sincronizados.add(chave)
+        except sqlite3.Error:
+            inventario = varrer(raiz)
+        with _lock:
+            _inventarios[chave] = inventario
+    return inventario
+
+
+def _consultar(raiz, consulta, alternativa):
+    """
+    Consulta o índice de `raiz`, sincronizado uma vez por sessão (e de novo
+    depois de `invalidar`), sem montar o inventário. Se o índice não puder
+    ser usado, o resultado sai do inventário (`alternativa`).
+    """
+    chave = os.path.abspath(raiz)
+    try:
+        indice = obter_indice()
+        with _lock:
+            sincronizado = chave in _sincronizados
+        if not sincronizado:
+            indice.atualizar(raiz)
+            with _lock:
+                _sincronizados.add(chave)
+        return consulta(indice)
+    except sqlite3.Error:
+        return alternativa(obter_inventario(raiz))
+
+
+def videos_sem_capa(raiz):
+    """Caminhos dos vídeos sem .jpg de mesmo nome ao lado."""
+    return _consultar(raiz, lambda indice: indice.videos_sem_capa(raiz),
+                      lambda inv: sorted(v.caminho for v in inv.videos if not v.capa))
+
+
+def videos_sem_nfo(raiz):
+    """Caminhos dos vídeos sem .nfo de mesmo nome ao lado."""
+    return _consultar(raiz, lambda indice: indice.videos_sem_nfo(raiz),
+                      lambda inv: sorted(v.caminho for v in inv.videos if not v.nfo))
+
+
+def arquivos_por_nome(raiz, nome_arquivo):
+    """Caminhos, em qualquer subpasta, dos arquivos com exatamente esse nome."""
+    return _consultar(raiz, lambda indice: indice.arquivos_por_nome(raiz, nome_arquivo),
+                      lambda inv: list(inv.por_arquivo.get(nome_arquivo, [])))
+
+
+def videos_por_chave(raiz, chave):
+    """Caminhos dos vídeos com a chave normalizada (todas as versões), pela versão."""
+    return _consultar(raiz, lambda indice: indice.videos_por_chave(raiz, chave),
+                      lambda inv: [v.caminho for v in inv.por_chave().get(chave, [])])
+
+
+def chaves(raiz):
+    """Chaves normalizadas dos vídeos de `raiz`."""
+    return _consultar(raiz, lambda indice: indice.chaves(raiz),
+                      lambda inv: {v.chave for v in inv.videos})
+
+
+def sincronizar(raiz):
+    """
+    Atualiza o índice de `raiz` e, se alguma pasta mudou (ou ainda não há
+    inventário na sessão), remonta o inventário. Retorna as pastas relistadas.
+    """
+    chave = os.path.abspath(raiz)
+    indice = obter_indice()
+    relistadas = indice.atualizar(raiz)
+    with _lock:
+        em_cache = chave in _inventarios
+    if relistadas or not em_cache:
+        inventario = indice.inventario(raiz)
+        with _lock:
+            _inventarios[chave] = inventario
+    with _lock:
+        _sincronizados.add(chave)
+    return relistadas
+
+
+def invalidar(caminho=None):
+    """Descarta os inventários que contêm `caminho` ou estão dentro dele (todos se None)."""
+    with _lock:
+        if caminho is None:
+            _inventarios.clear()
+            _sincronizados.clear()
+            return
+        alvo = os.path.abspath(caminho)
+        for raiz in list(_inventarios) + list(_sincronizados):
+            if raiz == alvo or alvo.startswith(raiz + os.sep) or raiz.startswith(alvo + os.sep):
+                _inventarios.pop(raiz, None)
+                _sincronizados.discard(raiz)
@@ -0,0 +1,395 @@
+"""
+Catálogo de músicas (Songs.xlsx) carregado uma única vez por sessão.
+
+A planilha é aberta uma vez em modo somente leitura e só as colunas usadas
+pelos scripts das abas 'Biblioteca' e 'Karaoke' são lidas. Ao contrário do
+pd.read_excel, todas as colunas são texto: valores preenchidos viram str
+(um music_id numérico 123 vira '123') e células vazias viram NaN; linhas em
+que todas as colunas lidas estão vazias são descartadas. O índice dos
+DataFrames é o número da linha na planilha, então as linhas descartadas não
+deslocam as demais. O resultado fica em memória até o arquivo mudar
+(tamanho ou mtime).
+
+Catálogo compilado: ao enviar uma nova planilha (e sempre que a planilha é
+lida do XLSX), o conteúdo é gravado em um SQLite em cache/ junto com os
+títulos já normalizados e as tags já agrupadas por music_id. Nas sessões
+seguintes ele é carregado em milissegundos; se o tamanho ou o mtime da
+planilha não conferem, o XLSX é lido de novo e o compilado é refeito.
+"""
+import os
+import sqlite3
+import hashlib
+import tempfile
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Tuple
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(BASE_DIR, "..", "cache")
+
+# Incrementar quando o formato do catálogo compilado mudar
+VERSAO_COMPILADO = 1
+
+# Campos comparados entre duas versões da planilha (por music_id)
+CAMPOS_COMPARADOS = ['full_title', 'title', 'artist', 'genre', 'world', 'tags']
+# Campos que mudam o conteúdo do NFO e o texto da capa
+CAMPOS_NFO = {'title', 'artist', 'genre', 'world', 'tags'}
+CAMPOS_CAPA = {'full_title', 'title', 'artist'}
+
+# Colunas lidas de cada aba (as que começam com um prefixo terminado em '_' entram todas)
+COLUNAS = {
+    'Biblioteca': ['music_id', 'full_title', 'title', 'artist', 'genre', 'world'],
+    'Karaoke': ['music_id', 'full_title', 'filename', 'tag_'],
+}
+
+_catalogos = {}
+_lock = threading.Lock()
+
+
+def coluna_necessaria(nome, colunas):
+    if not isinstance(nome, str):
+        return False
+    return any(nome == col or (col.endswith('_') and nome.startswith(col)) for col in colunas)
+
+
+def montar_aba(nomes, numeros_linha, linhas):
+    """DataFrame de texto (None → NaN) indexado pelo número da linha na planilha."""
+    dados = {nome: [np.nan if linha[i] is None else linha[i] for linha in linhas] for i, nome in enumerate(nomes)}
+    return pd.DataFrame(dados, index=pd.Index(numeros_linha, name='linha'), columns=nomes, dtype=object)
+
+
+def ler_aba(ws, colunas):
+    """
+    Lê as colunas pedidas de uma aba em um DataFrame de texto (str/NaN)
+    indexado pela linha, sem as linhas em branco. O cabeçalho define as
+    colunas; as linhas são lidas em streaming só no intervalo entre a
+    primeira e a última coluna usada.
+    """
+    cabecalho = next(ws.iter_rows(min_row=1, max_row=1, values_only=True), None) or ()
+    indices = [(i, nome) for i, nome in enumerate(cabecalho) if coluna_necessaria(nome, colunas)]
+    if not indices:
+        return montar_aba([], [], [])
+
+    primeira = indices[0][0]
+    posicoes = [i - primeira for i, _ in indices]
+    linhas = ws.iter_rows(min_row=2, min_col=primeira + 1, max_col=indices[-1][0] + 1, values_only=True)
+
+    numeros_linha = []
+    valores_linhas = []
+    for numero, linha in enumerate(linhas, start=2):
+        valores = [linha[i] if i < len(linha) else None for i in posicoes]
+        if all(v is None for v in valores):
+            continue
+        numeros_linha.append(numero)
+        valores_linhas.append([None if v is None else str(v) for v in valores])
+
+    return montar_aba([nome for _, nome in indices], numeros_linha, valores_linhas)
+
+
+def ler_workbook(arquivo_xlsx):
+    """Abas do catálogo lidas do XLSX: nome da aba → DataFrame."""
+    abas = {}
+    wb = load_workbook(arquivo_xlsx, read_only=True, data_only=True)
+    try:
+        for aba, colunas in COLUNAS.items():
+            if aba in wb.sheetnames:
+                abas[aba] = ler_aba(wb[aba], colunas)
+    finally:
+        wb.close()
+    return abas
+
+
+def indexar_titulos(df_biblioteca):
+    """Chave normalizada (sem vN, minúsculas) → full_title da aba Biblioteca."""
+    # (importado aqui: scripts.verificar_arquivos importa este módulo)
+    from scripts.verificar_arquivos import normalizar_nome
+    if 'full_title' not in df_biblioteca.columns:
+        return {}
+    titulos = df_biblioteca['full_title'].dropna().astype(str).str.strip()
+    return {normalizar_nome(t): t for t in titulos}
+
+
+def indexar_tags(df_karaoke):
+    """
+    music_id → tags da aba Karaoke (tag_1, tag_2, ...), sem valores vazios e
+    sem duplicatas, na ordem das linhas e das colunas.
+    """
+    colunas = [col for col in df_karaoke.columns if str(col).startswith('tag_')]
+    if not colunas or 'music_id' not in df_karaoke.columns:
+        return {}
+
+    tags = (df_karaoke[['music_id'] + colunas]
+            .dropna(subset=['music_id'])
+            .melt(id_vars='music_id', value_vars=colunas, ignore_index=False)
+            .dropna(subset=['value'])
+            .sort_index(kind='stable'))
+    tags['value'] = tags['value'].astype(str).str.strip()
+    tags = tags[(tags['value'] != '') & (tags['value'] != 'nan')]
+    return tags.groupby('music_id', sort=False)['value'].agg(lambda valores: list(dict.fromkeys(valores))).to_dict()
+
+
+class Catalogo:
+    def __init__(self, arquivo, abas, titulos=None, tags=None):
+        self.arquivo = arquivo
+        self.abas = abas
+        self._titulos = titulos
+        self._tags = tags
+
+    def aba(self, nome):
+        """Cópia do DataFrame da aba (pode ser alterada pelo chamador)."""
+        if nome not in self.abas:
+            raise ValueError(f"Aba '{nome}' não encontrada na planilha")
+        return self.abas[nome].copy()
+
+    def titulos(self):
+        """Chave normalizada → full_title (aba Biblioteca). Não alterar o dicionário."""
+        if self._titulos is None:
+            self._titulos = indexar_titulos(self.aba('Biblioteca'))
+        return self._titulos
+
+    def tags(self):
+        """music_id → tags agrupadas da aba Karaoke. Não alterar o dicionário."""
+        if self._tags is None:
+            self._tags = indexar_tags(self.aba('Karaoke'))
+        return self._tags
+
+
+# --- Catálogo compilado (SQLite) ---
+
+def caminho_compilado(arquivo_xlsx):
+    """Arquivo do catálogo compilado de uma planilha (um por caminho)."""
+    chave = hashlib.sha1(os.path.abspath(arquivo_xlsx).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(CACHE_DIR, f"catalogo_{chave}.sqlite")
+
+
+def gravar_compilado(catalogo, assinatura):
+    """Grava o catálogo em SQLite (arquivo temporário + rename atômico)."""
+    destino = caminho_compilado(catalogo.arquivo)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    # Nome temporário único: outro processo pode estar compilando a mesma planilha
+    with tempfile.NamedTemporaryFile(dir=CACHE_DIR, prefix=os.path.basename(destino) + "_",
+                                     suffix=".tmp", delete=False) as f:
+        temporario = f.name
+
+    try:
+        _gravar_tabelas(temporario, catalogo, assinatura)
+        os.replace(temporario, destino)
+    except BaseException:
+        try:
+            os.remove(temporario)
+        except OSError:
+            pass
+        raise
+    return destino
+
+
+def _gravar_tabelas(temporario, catalogo, assinatura):
+    con = sqlite3.connect(temporario)
+    try:
+        con.execute("CREATE TABLE origem (chave TEXT PRIMARY KEY, valor TEXT)")
+        con.execute("CREATE TABLE abas (indice INTEGER PRIMARY KEY, nome TEXT)")
+        con.execute("CREATE TABLE colunas (aba INTEGER, posicao INTEGER, nome TEXT)")
+        con.execute("CREATE TABLE titulos (chave TEXT PRIMARY KEY, full_title TEXT)")
+        con.execute("CREATE TABLE tags (music_id TEXT, posicao INTEGER, tag TEXT)")
+
+        for indice, (nome, df) in enumerate(catalogo.abas.items()):
+            nomes = list(df.columns)
+            con.execute("INSERT INTO abas VALUES (?, ?)", (indice, nome))
+            con.executemany("INSERT INTO colunas VALUES (?, ?, ?)",
+                            [(indice, posicao, col) for posicao, col in enumerate(nomes)])
+            # Colunas posicionais (c0, c1, ...): os nomes reais ficam na tabela colunas
+            campos = ", ".join(f"c{i} TEXT" for i in range(len(nomes)))
+            con.execute(f"CREATE TABLE aba_{indice} (linha INTEGER PRIMARY KEY{', ' + campos if campos else ''})")
+            marcadores = ", ".join("?" * (len(nomes) + 1))
+            linhas = df.astype(object).where(df.notna(), None).itertuples(name=None)
+            con.executemany(f"INSERT INTO aba_{indice} VALUES ({marcadores})", linhas)
+
+        if 'Biblioteca' in catalogo.abas:
+            con.executemany("INSERT INTO titulos VALUES (?, ?)", catalogo.titulos().items())
+        if 'Karaoke' in catalogo.abas:
+            con.executemany("INSERT INTO tags VALUES (?, ?, ?)",
+                            [(music_id, posicao, tag)
+                             for music_id, tags in catalogo.tags().items()
+                             for posicao, tag in enumerate(tags)])
+
+        tamanho, mtime_ns = assinatura
+        con.executemany("INSERT INTO origem VALUES (?, ?)", [
+            ("versao", str(VERSAO_COMPILADO)),
+            ("arquivo", os.path.abspath(catalogo.arquivo)),
+            ("tamanho", str(tamanho)),
+            ("mtime_ns", str(mtime_ns)),
+        ])
+        con.commit()
+    finally:
+        con.close()
+
+
+def ler_compilado(arquivo_xlsx, assinatura):
+    """Catálogo compilado da planilha, ou None se não existe ou está desatualizado."""
+    caminho = caminho_compilado(arquivo_xlsx)
+    if not os.path.exists(caminho):
+        return None
+    try:
+        con = sqlite3.connect(f"file:{caminho}?mode=ro", uri=True)
+        try:
+            origem = dict(con.execute("SELECT chave, valor FROM origem"))
+            if (origem.get("versao") != str(VERSAO_COMPILADO)
+                    or origem.get("arquivo") != os.path.abspath(arquivo_xlsx)
+                    or (origem.get("tamanho"), origem.get("mtime_ns")) != tuple(map(str, assinatura))):
+                return None
+
+            abas = {}
+            for indice, nome in con.execute("SELECT indice, nome FROM abas ORDER BY indice").fetchall():
+                nomes = [col for (col,) in con.execute(
+                    "SELECT nome FROM colunas WHERE aba = ? ORDER BY posicao", (indice,))]
+                registros = con.execute(f"SELECT * FROM aba_{indice} ORDER BY linha").fetchall()
+                abas[nome] = montar_aba(nomes, [r[0] for r in registros], [r[1:] for r in registros])
+
+            titulos = dict(con.execute("SELECT chave, full_title FROM titulos"))
+            tags = {}
+            for music_id, tag in con.execute("SELECT music_id, tag FROM tags ORDER BY rowid"):
+                tags.setdefault(music_id, []).append(tag)
+        finally:
+            con.close()
+    except sqlite3.Error:
+        return None
+
+    return Catalogo(arquivo_xlsx, abas,
+                    titulos=titulos if 'Biblioteca' in abas else None,
+                    tags=tags if 'Karaoke' in abas else None)
+
+
+def assinatura_planilha(arquivo_xlsx):
+    st = os.stat(arquivo_xlsx)
+    return st.st_size, st.st_mtime_ns
+
+
+def _guardar(arquivo_xlsx, assinatura, catalogo):
+    with _lock:
+        _catalogos[os.path.abspath(arquivo_xlsx)] = (assinatura, catalogo)
+
+
+def compilar_catalogo(arquivo_xlsx):
+    """Lê a planilha e grava o catálogo compilado. Retorna o Catalogo."""
+    assinatura = assinatura_planilha(arquivo_xlsx)
+    catalogo = Catalogo(arquivo_xlsx, ler_workbook(arquivo_xlsx))
+    gravar_compilado(catalogo, assinatura)
+    _guardar(arquivo_xlsx, assinatura, catalogo)
+    return catalogo
+
+
+def carregar_catalogo(arquivo_xlsx):
+    """
+    Catálogo da planilha: da memória, do compilado ou (se ambos estão
+    desatualizados) do XLSX, que então é compilado de novo.
+    """
+    assinatura = assinatura_planilha(arquivo_xlsx)
+    with _lock:
+        em_cache = _catalogos.get(os.path.abspath(arquivo_xlsx))
+    if em_cache and em_cache[0] == assinatura:
+        return em_cache[1]
+
+    catalogo = ler_compilado(arquivo_xlsx, assinatura)
+    if catalogo is None:
+        catalogo = Catalogo(arquivo_xlsx, ler_workbook(arquivo_xlsx))
+        try:
+            gravar_compilado(catalogo, assinatura)
+        except (OSError, sqlite3.Error):
+            pass  # sem cache gravável: segue com o XLSX
+    _guardar(arquivo_xlsx, assinatura, catalogo)
+    return catalogo
+
+
+def ler_planilha(arquivo_xlsx, aba):
+    """Substituto de pd.read_excel(arquivo, sheet_name=aba) para as colunas do catálogo."""
+    return carregar_catalogo(arquivo_xlsx).aba(aba)
+
+
+# --- Diferenças entre duas versões da planilha ---
+
+def registros_por_musica(catalogo):
+    """music_id → campos comparáveis (primeira linha da Biblioteca + tags do Karaoke)."""
+    if catalogo is None or 'Biblioteca' not in catalogo.abas:
+        return {}
+    df = catalogo.abas['Biblioteca'].dropna(subset=['music_id']).drop_duplicates('music_id')
+    tags = catalogo.tags() if 'Karaoke' in catalogo.abas else {}
+
+    registros = {}
+    for registro in df.to_dict('records'):
+        music_id = registro['music_id']
+        campos = {campo: str(registro.get(campo) if pd.notna(registro.get(campo)) else '').strip()
+                  for campo in CAMPOS_COMPARADOS if campo != 'tags'}
+        campos['tags'] = tuple(tags.get(music_id, ()))
+        registros[music_id] = campos
+    return registros
+
+
+@dataclass
+class DiferencaCatalogo:
+    adicionadas: Dict[str, dict] = field(default_factory=dict)   # music_id → campos novos
+    removidas: Dict[str, dict] = field(default_factory=dict)     # music_id → campos antigos
+    alteradas: Dict[str, Dict[str, Tuple]] = field(default_factory=dict)  # music_id → campo → (antes, depois)
+    novos: Dict[str, dict] = field(default_factory=dict)         # music_id → campos na planilha nova
+
+    def vazia(self):
+        return not (self.adicionadas or self.removidas or self.alteradas)
+
+    def renomeacoes(self):
+        """Chave normalizada do full_title antigo → full_title novo."""
+        from scripts.verificar_arquivos import normalizar_nome
+        return {normalizar_nome(mudancas['full_title'][0]): mudancas['full_title'][1]
+                for mudancas in self.alteradas.values()
+                if 'full_title' in mudancas and mudancas['full_title'][0] and mudancas['full_title'][1]}
+
+    def _chaves(self, campos):
+        from scripts.verificar_arquivos import normalizar_nome
+        music_ids = list(self.adicionadas)
+        music_ids += [music_id for music_id, mudancas in self.alteradas.items() if campos & set(mudancas)]
+        return {normalizar_nome(self.novos[music_id]['full_title'])
+                for music_id in music_ids if self.novos[music_id]['full_title']}
+
+    def chaves_nfo(self):
+        """Chaves (full_title novo normalizado) cujos NFOs precisam ser reescritos."""
+        return self._chaves(CAMPOS_NFO)
+
+    def chaves_capas(self):
+        """Chaves (full_title novo normalizado) cujas capas precisam ser refeitas."""
+        return self._chaves(CAMPOS_CAPA)
+
+    def linhas(self, limite=20):
+        """Resumo legível das diferenças (no máximo `limite` linhas de detalhe)."""
+        linhas = [f"{len(self.adicionadas)} adicionadas, {len(self.removidas)} removidas, "
+                  f"{len(self.alteradas)} alteradas"]
+        detalhes = [f"+ {campos['full_title'] or music_id}" for music_id, campos in self.adicionadas.items()]
+        detalhes += [f"- {campos['full_title'] or music_id}" for music_id, campos in self.removidas.items()]
+        for music_id, mudancas in self.alteradas.items():
+            descricao = ", ".join(f"{campo}: {antes!r} → {depois!r}" for campo, (antes, depois) in mudancas.items())
+            detalhes.append(f"~ {self.novos[music_id]['full_title'] or music_id}: {descricao}")
+        linhas += detalhes[:limite]
+        if len(detalhes) > limite:
+            linhas.append(f"... e mais {len(detalhes) - limite}")
+        return linhas
+
+
+def comparar_catalogos(antigo, novo):
+    """Diferenças por music_id entre dois catálogos (antigo pode ser None)."""
+    registros_antigos = registros_por_musica(antigo)
+    registros_novos = registros_por_musica(novo)
+
+    diferenca = DiferencaCatalogo(novos=registros_novos)
+    for music_id, campos in registros_novos.items():
+        anteriores = registros_antigos.get(music_id)
+        if anteriores is None:
+            diferenca.adicionadas[music_id] = campos
+            continue
+        mudancas = {campo: (anteriores[campo], campos[campo])
+                    for campo in CAMPOS_COMPARADOS if anteriores[campo] != campos[campo]}
+        if mudancas:
+            diferenca.alteradas[music_id] = mudancas
+    for music_id, campos in registros_antigos.items():
+        if music_id not in registros_novos:
+            diferenca.removidas[music_id] = campos
+    return diferenca
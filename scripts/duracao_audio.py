@@ -0,0 +1,317 @@
+"""
+Serviço de duração de áudio.
+
+Lê a duração de MP3 direto dos cabeçalhos (Xing/Info + LAME, VBRI) ou
+varrendo os frames de arquivos CBR, sem abrir processos. WAV é lido pelo
+módulo `wave`. O FFprobe só é chamado quando o formato não é reconhecido.
+Os resultados ficam em cache (cache/duracoes.json) por caminho, tamanho e mtime.
+"""
+import os
+import json
+import shutil
+import struct
+import tempfile
+import threading
+import subprocess
+import wave
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(BASE_DIR, "..", "cache")
+CACHE_FILE = os.path.join(CACHE_DIR, "duracoes.json")
+
+# Tabelas do cabeçalho de frame MPEG (kbps / Hz)
+BITRATES = {
+    (1, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (1, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (1, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (2, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (2, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+# Bytes lidos após a tag ID3v2 para localizar o primeiro frame e o cabeçalho VBR
+# (a busca do frame vai até 64 KB; o restante cobre o frame e o cabeçalho)
+LEITURA_CABECALHO = 128 * 1024
+SAMPLE_RATES = {
+    1: [44100, 48000, 32000],
+    2: [22050, 24000, 16000],
+    2.5: [11025, 12000, 8000],
+}
+
+
+def ler_frame_mpeg(dados, pos):
+    """Decodifica o cabeçalho de frame em `pos`. Retorna dict ou None se inválido."""
+    if pos + 4 > len(dados):
+        return None
+    b1, b2, b3 = dados[pos + 1], dados[pos + 2], dados[pos + 3]
+    if dados[pos] != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+
+    versao = {0: 2.5, 2: 2, 3: 1}.get((b1 >> 3) & 0x03)
+    camada = {1: 3, 2: 2, 3: 1}.get((b1 >> 1) & 0x03)
+    indice_bitrate = (b2 >> 4) & 0x0F
+    indice_sr = (b2 >> 2) & 0x03
+    if versao is None or camada is None or indice_bitrate in (0, 15) or indice_sr == 3:
+        return None
+
+    bitrate = BITRATES[(1 if versao == 1 else 2, camada)][indice_bitrate] * 1000
+    sample_rate = SAMPLE_RATES[versao][indice_sr]
+    padding = (b2 >> 1) & 0x01
+    mono = ((b3 >> 6) & 0x03) == 3
+
+    if camada == 1:
+        amostras = 384
+        tamanho = (12 * bitrate // sample_rate + padding) * 4
+    else:
+        amostras = 1152 if (camada == 2 or versao == 1) else 576
+        tamanho = (amostras // 8) * bitrate // sample_rate + padding
+
+    return {
+        'versao': versao,
+        'camada': camada,
+        'sample_rate': sample_rate,
+        'amostras': amostras,
+        'tamanho': tamanho,
+        'mono': mono,
+    }
+
+
+def pular_id3v2(dados):
+    """Retorna o offset do primeiro byte após a tag ID3v2 (0 se não houver)."""
+    if len(dados) >= 10 and dados[:3] == b"ID3":
+        tamanho = 0
+        for b in dados[6:10]:
+            tamanho = (tamanho << 7) | (b & 0x7F)
+        rodape = 10 if dados[5] & 0x10 else 0
+        return 10 + tamanho + rodape
+    return 0
+
+
+def localizar_primeiro_frame(dados, inicio, limite=64 * 1024):
+    """Procura o primeiro frame válido confirmando o frame seguinte."""
+    fim = min(len(dados) - 4, inicio + limite)
+    pos = inicio
+    while pos < fim:
+        pos = dados.find(b"\xFF", pos, fim)
+        if pos < 0:
+            return None, None
+        frame = ler_frame_mpeg(dados, pos)
+        if frame and frame['tamanho'] > 0:
+            seguinte = ler_frame_mpeg(dados, pos + frame['tamanho'])
+            if seguinte or pos + frame['tamanho'] >= len(dados):
+                return pos, frame
+        pos += 1
+    return None, None
+
+
+def duracao_cabecalho_vbr(dados, pos, frame):
+    """Lê a duração dos cabeçalhos Xing/Info (com LAME) ou VBRI, se presentes."""
+    if frame['versao'] == 1:
+        lado = 17 if frame['mono'] else 32
+    else:
+        lado = 9 if frame['mono'] else 17
+
+    xing = pos + 4 + lado
+    tag = dados[xing:xing + 4]
+    if tag in (b"Xing", b"Info"):
+        flags = struct.unpack(">I", dados[xing + 4:xing + 8])[0]
+        if not flags & 0x01:
+            return None
+        frames = struct.unpack(">I", dados[xing + 8:xing + 12])[0]
+        amostras = frames * frame['amostras']
+
+        # Tag LAME: atraso do encoder e padding final em amostras
+        offset_lame = xing + 8 + (4 if flags & 0x01 else 0) + (4 if flags & 0x02 else 0) \
+            + (100 if flags & 0x04 else 0) + (4 if flags & 0x08 else 0)
+        if dados[offset_lame:offset_lame + 4] == b"LAME" and len(dados) >= offset_lame + 24:
+            b0, b1, b2 = dados[offset_lame + 21:offset_lame + 24]
+            atraso = (b0 << 4) | (b1 >> 4)
+            padding = ((b1 & 0x0F) << 8) | b2
+            if atraso + padding < amostras:
+                amostras -= atraso + padding
+        return amostras / frame['sample_rate']
+
+    vbri = pos + 4 + 32
+    if dados[vbri:vbri + 4] == b"VBRI":
+        frames = struct.unpack(">I", dados[vbri + 14:vbri + 18])[0]
+        return frames * frame['amostras'] / frame['sample_rate']
+
+    return None
+
+
+def duracao_varrendo_frames(dados, pos):
+    """Soma as amostras de todos os frames (arquivos CBR sem cabeçalho Xing)."""
+    fim_audio = len(dados)
+    if fim_audio >= 128 and dados[-128:-125] == b"TAG":
+        fim_audio -= 128
+
+    amostras = 0
+    sample_rate = None
+    inicio = pos
+    while pos + 4 <= fim_audio:
+        frame = ler_frame_mpeg(dados, pos)
+        if not frame or frame['tamanho'] <= 0:
+            break
+        sample_rate = sample_rate or frame['sample_rate']
+        amostras += frame['amostras']
+        pos += frame['tamanho']
+
+    # Perdeu a sincronia antes do fim: resultado não é confiável
+    if not sample_rate or (pos - inicio) < 0.9 * (fim_audio - inicio):
+        return None
+    return amostras / sample_rate
+
+
+def duracao_mp3(caminho):
+    """
+    Duração de um MP3 em segundos lida em Python puro, ou None.
+    Só o início do áudio (após a tag ID3v2) é lido para achar o cabeçalho
+    Xing/VBRI; o arquivo inteiro só é lido para varrer os frames de um CBR.
+    """
+    with open(caminho, "rb") as f:
+        inicio = pular_id3v2(f.read(10))
+        f.seek(inicio)
+        dados = f.read(LEITURA_CABECALHO)
+
+        pos, frame = localizar_primeiro_frame(dados, 0)
+        if pos is None:
+            return None
+        duracao = duracao_cabecalho_vbr(dados, pos, frame)
+        if duracao is None:
+            f.seek(0)
+            duracao = duracao_varrendo_frames(f.read(), inicio + pos)
+    return duracao
+
+
+def duracao_wav(caminho):
+    try:
+        with wave.open(caminho, "rb") as w:
+            return w.getnframes() / float(w.getframerate())
+    except (wave.Error, EOFError):
+        return None
+
+
+def localizar_ffprobe():
+    ffprobe = shutil.which("ffprobe")
+    if ffprobe:
+        return ffprobe
+    for pasta in (r"C:\ffmpeg\bin", r"C:\ffmpeg", r"C:\Program Files\ffmpeg\bin"):
+        candidato = os.path.join(pasta, "ffprobe.exe")
+        if os.path.exists(candidato):
+            return candidato
+    return None
+
+
+def duracao_ffprobe(caminho, ffprobe_path=None):
+    ffprobe_path = ffprobe_path or localizar_ffprobe()
+    if not ffprobe_path:
+        return None
+    try:
+        result = subprocess.run([
+            ffprobe_path, '-v', 'quiet', '-show_entries', 'format=duration',
+            '-of', 'default=noprint_wrappers=1:nokey=1', str(caminho)
+        ], capture_output=True, text=True, timeout=30)
+        if result.returncode == 0 and result.stdout.strip():
+            return float(result.stdout.strip())
+    except (OSError, ValueError, subprocess.TimeoutExpired):
+        pass
+    return None
+
+
+def medir_duracao(caminho, ffprobe_path=None):
+    """Mede a duração sem cache: leitura nativa primeiro, FFprobe como fallback."""
+    ext = os.path.splitext(caminho)[1].lower()
+    duracao = None
+    try:
+        if ext == ".mp3":
+            duracao = duracao_mp3(caminho)
+        elif ext == ".wav":
+            duracao = duracao_wav(caminho)
+    except (OSError, struct.error):
+        duracao = None
+
+    if not duracao:
+        duracao = duracao_ffprobe(caminho, ffprobe_path)
+    return duracao or None
+
+
+class CacheDuracoes:
+    """Cache persistente de durações por caminho, tamanho e mtime."""
+
+    def __init__(self, arquivo=CACHE_FILE):
+        self.arquivo = arquivo
+        self._dados = None
+        self._novos = {}  # entradas medidas por este processo, ainda não gravadas
+        self._lock = threading.Lock()
+
+    def _ler_arquivo(self):
+        try:
+            with open(self.arquivo, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _carregar(self):
+        if self._dados is None:
+            self._dados = self._ler_arquivo()
+        return self._dados
+
+    def obter(self, caminho, ffprobe_path=None, salvar=True):
+        """Duração em segundos (None se não for possível determinar)."""
+        caminho = os.path.abspath(caminho)
+        st = os.stat(caminho)
+        with self._lock:
+            entrada = self._carregar().get(caminho)
+        if entrada and entrada['tamanho'] == st.st_size and entrada['mtime_ns'] == st.st_mtime_ns:
+            return entrada['duracao']
+
+        duracao = medir_duracao(caminho, ffprobe_path)
+        if duracao:
+            with self._lock:
+                entrada = {
+                    'tamanho': st.st_size,
+                    'mtime_ns': st.st_mtime_ns,
+                    'duracao': duracao,
+                }
+                self._carregar()[caminho] = entrada
+                self._novos[caminho] = entrada
+            if salvar:
+                self.salvar()
+        return duracao
+
+    def salvar(self):
+        """Grava o cache; uma falha só é ignorada (o cache nunca derruba uma renderização)."""
+        with self._lock:
+            if not self._novos:
+                return
+            temporario = None
+            try:
+                os.makedirs(os.path.dirname(self.arquivo), exist_ok=True)
+                # Vários gerar_video em paralelo gravam o mesmo cache: parte do que já
+                # está no disco (entradas dos outros processos) e acrescenta as nossas
+                dados = self._ler_arquivo()
+                dados.update(self._novos)
+                with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=os.path.dirname(self.arquivo),
+                                                 prefix="duracoes_", suffix=".tmp", delete=False) as f:
+                    temporario = f.name
+                    json.dump(dados, f)
+                os.replace(temporario, self.arquivo)
+                self._dados = dados
+                self._novos = {}
+            except OSError:
+                if temporario and os.path.exists(temporario):
+                    try:
+                        os.remove(temporario)
+                    except OSError:
+                        pass
+
+
+_cache = CacheDuracoes()
+
+
+def obter_duracao(caminho, ffprobe_path=None, salvar=True):
+    """Duração do áudio em segundos usando o cache compartilhado (None se desconhecida)."""
+    return _cache.obter(caminho, ffprobe_path, salvar=salvar)
+
+
+def salvar_cache():
+    _cache.salvar()
@@ -1,7 +1,8 @@
 import os
-import re
-import pandas as pd
+from scripts.catalogo import carregar_catalogo
 from datetime import datetime
+from scripts.biblioteca import obter_inventario, invalidar, videos_sem_nfo
+from scripts.verificar_arquivos import normalizar_nome
 
 # --- Padrão de logs ---
 LOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "logs")
@@ -11,7 +12,82 @@ os.makedirs(LOG_DIR, exist_ok=True)
 def escape_xml(texto):
     return texto.replace("&", "&amp;")
 
-def run(log_callback=None, pasta_videos="Karaoke", arquivo_xlsx="assets/Songs.xls"):
+def indexar_biblioteca(df_biblioteca):
+    """full_title em minúsculas → registro da aba Biblioteca (primeira ocorrência)."""
+    df = df_biblioteca.assign(_chave=df_biblioteca['full_title'].str.lower())
+    df = df.drop_duplicates('_chave')
+    return dict(zip(df['_chave'], df.to_dict('records')))
+
+def montar_nfo(registro, tags_por_musica, subpasta):
+    """Conteúdo do NFO de uma música (registro da Biblioteca) na subpasta dada."""
+    artista = escape_xml(str(registro['artist']))
+    titulo = escape_xml(str(registro['title']))
+    genero = escape_xml(str(registro['genre']))
+    world = escape_xml(str(registro['world']))
+
+    tags = []
+    
+    # Adiciona world da Biblioteca como tag
+    if world and str(world) != 'nan' and str(world).strip():
+        tags.append(str(world).strip())
+    
+    # Adiciona tags da aba Karaoke (tag_1, tag_2, etc.) pelo music_id
+    tags.extend(tags_por_musica.get(registro['music_id'], []))
+    
+    # Remove duplicatas e escapa tags
+    tags_unicas = []
+    for tag in tags:
+        tag_escapada = escape_xml(tag)
+        if tag_escapada not in tags_unicas:
+            tags_unicas.append(tag_escapada)
+
+    # Define tag adicional com o nome da subpasta ou "Outro"
+    if subpasta == ".":
+        tag_adicional = "Outro"
+    else:
+        tag_adicional = escape_xml(subpasta)
+    tags_unicas.append(tag_adicional)
+
+    tags_xml = "\n  ".join([f"<tag>{tag}</tag>" for tag in tags_unicas])
+    
+    return f'''<?xml version="1.0" encoding="utf-8" standalone="yes"?>
+<musicvideo>
+  <artist>{artista}</artist>
+  <title>{titulo}</title>
+  <genre>{genero}</genre>
+  {tags_xml}
+</musicvideo>
+'''
+
+def salvar_nfo(nfo_path, conteudo):
+    """
+    Grava o NFO somente se o conteúdo mudou (arquivo temporário + rename atômico).
+    Retorna 'criado', 'atualizado' ou 'inalterado'.
+    """
+    try:
+        with open(nfo_path, "r", encoding="utf-8") as f:
+            atual = f.read()
+    except FileNotFoundError:
+        atual = None
+    except (OSError, UnicodeDecodeError):
+        atual = ""  # ilegível: reescreve
+
+    if atual == conteudo:
+        return 'inalterado'
+
+    temporario = nfo_path + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        f.write(conteudo)
+    os.replace(temporario, nfo_path)
+    return 'criado' if atual is None else 'atualizado'
+
+def run(log_callback=None, pasta_videos="Karaoke", arquivo_xlsx="assets/Songs.xls", sincronizar=False, apenas=None):
+    """
+    Gera os NFOs dos vídeos da pasta. Sem `sincronizar`, NFOs existentes são
+    mantidos; com `sincronizar`, cada NFO é montado em memória, comparado com
+    o arquivo e regravado apenas se diferente. `apenas` (conjunto de chaves
+    normalizadas) limita o processamento a esses vídeos.
+    """
     # Arquivo de log
     agora = datetime.now().strftime("%Y%m%d_%H%M%S")
     log_file = os.path.join(LOG_DIR, f"karaoke_gerar_nfo_{agora}.log")
@@ -32,8 +108,9 @@ def run(log_callback=None, pasta_videos="Karaoke", arquivo_xlsx="assets/Songs.xl
 
     # Carrega as abas necessárias da planilha
     try:
-        df_biblioteca = pd.read_excel(arquivo_xlsx, sheet_name='Biblioteca')
-        df_karaoke = pd.read_excel(arquivo_xlsx, sheet_name='Karaoke')
+        catalogo = carregar_catalogo(arquivo_xlsx)
+        df_biblioteca = catalogo.aba('Biblioteca')
+        tags_por_musica = catalogo.tags()
         log("Carregadas abas 'Biblioteca' e 'Karaoke' da planilha Songs.xls")
     except Exception as e:
         log(f"Erro ao carregar planilha: {e}")
@@ -41,78 +118,49 @@ def run(log_callback=None, pasta_videos="Karaoke", arquivo_xlsx="assets/Songs.xl
 
     # Prepara os dados
     df_biblioteca['full_title'] = df_biblioteca['full_title'].astype(str).str.strip()
-
-    # Percorre arquivos e subpastas
-    for root, dirs, files in os.walk(pasta_videos):
-        for arquivo in files:
-            nome, ext = os.path.splitext(arquivo)
-            if ext.lower() == ".jpg":
-                continue  # ignora imagens
-
-            caminho_arquivo = os.path.join(root, arquivo)
-            nfo_path = os.path.join(root, nome + ".nfo")
-            if os.path.exists(nfo_path):
-                log(f"NFO já existe, ignorando: {arquivo}")
-                continue
-
-            # Remove vN para busca
-            nome_busca = re.sub(r' v\d+$', '', nome, flags=re.IGNORECASE).strip()
-
-            # Busca correspondência na aba Biblioteca
-            linha_biblioteca = df_biblioteca[df_biblioteca['full_title'].str.lower() == nome_busca.lower()]
-            if not linha_biblioteca.empty:
-                artista = escape_xml(str(linha_biblioteca.iloc[0]['artist']))
-                titulo = escape_xml(str(linha_biblioteca.iloc[0]['title']))
-                genero = escape_xml(str(linha_biblioteca.iloc[0]['genre']))
-                world = escape_xml(str(linha_biblioteca.iloc[0]['world']))
-
-                # Busca tags na aba Karaoke usando music_id
-                music_id = linha_biblioteca.iloc[0]['music_id']
-                linha_karaoke = df_karaoke[df_karaoke['music_id'] == music_id]
-                
-                tags = []
-                
-                # Adiciona world da Biblioteca como tag
-                if world and str(world) != 'nan' and str(world).strip():
-                    tags.append(str(world).strip())
-                
-                # Adiciona tags da aba Karaoke (tag_1, tag_2, etc.)
-                if not linha_karaoke.empty:
-                    for col in linha_karaoke.columns:
-                        if col.startswith('tag_'):
-                            tag_value = str(linha_karaoke.iloc[0][col])
-                            if tag_value and tag_value != 'nan' and tag_value.strip():
-                                tags.append(tag_value.strip())
-                
-                # Remove duplicatas e escapa tags
-                tags_unicas = []
-                for tag in tags:
-                    tag_escapada = escape_xml(tag)
-                    if tag_escapada not in tags_unicas:
-                        tags_unicas.append(tag_escapada)
-
-                # Define tag adicional com o nome da subpasta ou "Outro"
-                subpasta = os.path.relpath(root, pasta_videos)
-                if subpasta == ".":
-                    tag_adicional = "Outro"
-                else:
-                    tag_adicional = escape_xml(subpasta)
-                tags_unicas.append(tag_adicional)
-
-                # Cria conteúdo NFO
-                tags_xml = "\n  ".join([f"<tag>{tag}</tag>" for tag in tags_unicas])
-                
-                nfo_content = f'''<?xml version="1.0" encoding="utf-8" standalone="yes"?>
-<musicvideo>
-  <artist>{artista}</artist>
-  <title>{titulo}</title>
-  <genre>{genero}</genre>
-  {tags_xml}
-</musicvideo>
-'''
-
-                # Salva arquivo NFO
-                with open(nfo_path, "w", encoding="utf-8") as f:
-                    f.write(nfo_content)
-
-                log(f"NFO gerado: {nfo_path}")
\ No newline at end of file
+    biblioteca = indexar_biblioteca(df_biblioteca)
+
+    contagem = {'criado': 0, 'atualizado': 0, 'inalterado': 0}
+    processados = set()
+
+    # Sincronizando, todos os vídeos do inventário (com subpastas); senão só
+    # os que não têm NFO, consultados direto no índice da biblioteca
+    if sincronizar:
+        videos = [video.caminho for video in obter_inventario(pasta_videos).videos]
+    else:
+        videos = videos_sem_nfo(pasta_videos)
+        log(f"Vídeos sem NFO: {len(videos)}")
+
+    for caminho in videos:
+        root, arquivo = os.path.split(caminho)
+        nome = os.path.splitext(arquivo)[0]
+        chave = normalizar_nome(nome)
+        if apenas is not None and chave not in apenas:
+            continue
+        nfo_path = os.path.join(root, nome + ".nfo")
+        if nfo_path in processados:
+            continue
+        processados.add(nfo_path)
+
+        # Busca correspondência na aba Biblioteca (chave sem vN, em minúsculas)
+        registro = biblioteca.get(chave)
+        if registro is None:
+            continue
+
+        conteudo = montar_nfo(registro, tags_por_musica, os.path.relpath(root, pasta_videos))
+        try:
+            resultado = salvar_nfo(nfo_path, conteudo)
+        except OSError as e:
+            log(f"Erro ao gravar NFO {nfo_path}: {e}")
+            continue
+
+        contagem[resultado] += 1
+        if resultado == 'criado':
+            log(f"NFO gerado: {nfo_path}")
+        elif resultado == 'atualizado':
+            log(f"NFO atualizado: {nfo_path}")
+
+    if contagem['criado'] or contagem['atualizado']:
+        invalidar(pasta_videos)
+    log(f"NFOs: {contagem['criado']} criados, {contagem['atualizado']} atualizados, "
+        f"{contagem['inalterado']} sem alteração.")
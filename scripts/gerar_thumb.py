@@ -1,9 +1,15 @@
 import os
+import json
 import math
-import pandas as pd
+import hashlib
 from datetime import datetime
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from PIL import Image, ImageDraw, ImageFont, ImageEnhance
-from scripts.verificar_arquivos import normalizar_nome  # reutiliza função de normalização
+from scripts.indice_artistas import PASTA_ARTISTAS, obter_indice
+from scripts.imagens import carregar_fundo
+from scripts.biblioteca import obter_inventario, invalidar
+from scripts.catalogo import carregar_catalogo
 
 # Pastas de fontes
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -16,24 +22,30 @@ FONT_KARAOKE_BOLD = os.path.join(FONTS_DIR, "OpenSans-Bold.ttf")
 LOG_DIR = os.path.join(BASE_DIR, "..", "logs")
 os.makedirs(LOG_DIR, exist_ok=True)
 
-# Tipos de extensões de imagem que serão buscadas
-IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".bmp", ".tiff", ".webp",".avif"}
+# Fontes fixas da capa, carregadas uma vez por processo
+_fontes = None
+# Fontes por (caminho, tamanho)
+_fontes_carregadas = {}
+# Larguras de palavras guardadas por (caminho da fonte, tamanho, palavra)
+MAX_LARGURAS_PALAVRAS = 16384
+# Folga (fração do tamanho da fonte) para a largura estimada pela soma das palavras
+MARGEM_ESTIMATIVA = 0.25
+
+# Dimensões e camadas fixas da capa (montadas uma vez por processo)
+LARGURA_CAPA, ALTURA_CAPA = 1280, 720
+COR_ONDAS = (50, 50, 50)
+ALFA_LEGIBILIDADE = 180
+_camadas = None
+_medidas_topo = {}
+
+# Incrementar sempre que o layout da capa mudar (força a regeneração de todas)
+VERSAO_LAYOUT = 1
+# Manifesto com a assinatura das entradas de cada capa, na raiz da pasta de vídeos
+MANIFESTO_CAPAS = ".thumbs_manifest.json"
 
 def encontrar_imagem_artista(nome_artista):
-    """Procura por uma imagem do artista na pasta 'assets/__artist'."""
-    pasta_assets_artist = os.path.join(BASE_DIR, "..", "assets", "__artist")
-    
-    if not os.path.exists(pasta_assets_artist):
-        return None
-        
-    nome_normalizado_artista = normalizar_nome(nome_artista)
-    for arquivo in os.listdir(pasta_assets_artist):
-        nome_arquivo, ext = os.path.splitext(arquivo)
-        if ext.lower() in IMAGE_EXTENSIONS:
-            # Verifica se o nome do arquivo começa com o nome do artista (normalizado)
-            if normalizar_nome(nome_arquivo).startswith(nome_normalizado_artista):
-                return os.path.join(pasta_assets_artist, arquivo)
-    return None
+    """Procura por uma imagem do artista na pasta 'assets/__artist' (via índice)."""
+    return obter_indice().buscar(nome_artista)
 
 def desenhar_ondas(draw_obj, largura, altura, cor_onda, num_ondas=5, intensidade=0.1):
     """Desenha um padrão de ondas translúcidas."""
@@ -50,34 +62,73 @@ def desenhar_ondas(draw_obj, largura, altura, cor_onda, num_ondas=5, intensidade
             pontos_preenchimento = [(0, altura)] + pontos + [(largura, altura)]
             draw_obj.polygon(pontos_preenchimento, fill=cor_onda_rgba)
 
+def carregar_fonte(caminho, tamanho):
+    """Fonte FreeType compartilhada por (caminho, tamanho), carregada uma única vez."""
+    chave = (caminho, tamanho)
+    fonte = _fontes_carregadas.get(chave)
+    if fonte is None:
+        fonte = _fontes_carregadas[chave] = ImageFont.truetype(caminho, tamanho)
+    return fonte
+
+@lru_cache(maxsize=MAX_LARGURAS_PALAVRAS)
+def _largura_palavra_fonte(caminho, tamanho, palavra):
+    return carregar_fonte(caminho, tamanho).getlength(palavra)
+
+def largura_palavra(fonte, palavra):
+    """Largura de avanço da palavra, medida uma vez por fonte/tamanho."""
+    caminho = getattr(fonte, "path", None)
+    if not isinstance(caminho, str):
+        # Fonte sem arquivo (ex.: load_default): sem cache
+        return fonte.getlength(palavra)
+    return _largura_palavra_fonte(caminho, fonte.size, palavra)
+
+def cabe_na_largura(draw_obj, texto, largura_estimada, fonte, max_largura):
+    """
+    Decide se o texto cabe na largura. A soma das larguras das palavras difere
+    do textbbox em no máximo alguns pixels; só perto do limite o textbbox é
+    medido, mantendo exatamente a mesma decisão do cálculo completo.
+    """
+    tamanho = getattr(fonte, "size", None)
+    if largura_estimada is not None and tamanho:
+        folga = tamanho * MARGEM_ESTIMATIVA
+        if largura_estimada <= max_largura - folga:
+            return True
+        if largura_estimada > max_largura + folga:
+            return False
+    bbox = draw_obj.textbbox((0, 0), texto, font=fonte)
+    return bbox[2] - bbox[0] <= max_largura
+
 def texto_quebrado_simples(draw_obj, texto, fonte, max_largura, max_linhas=3):
     """Quebra texto apenas entre palavras completas, sem quebrar palavras com hífen."""
     palavras = texto.split()
     linhas = []
     linha_atual = ""
+    largura_atual = 0
+
+    # Sem getlength (fonte bitmap padrão) cada teste usa o textbbox
+    medir = hasattr(fonte, "getlength") and getattr(fonte, "size", None)
+    espaco = largura_palavra(fonte, " ") if medir else 0
     
     for palavra in palavras:
+        largura = largura_palavra(fonte, palavra) if medir else None
         teste_linha = linha_atual + (" " if linha_atual else "") + palavra
-        bbox_teste = draw_obj.textbbox((0, 0), teste_linha, font=fonte)
-        largura_teste = bbox_teste[2] - bbox_teste[0]
+        largura_teste = (largura_atual + (espaco if linha_atual else 0) + largura) if medir else None
         
-        if largura_teste <= max_largura:
+        if cabe_na_largura(draw_obj, teste_linha, largura_teste, fonte, max_largura):
             linha_atual = teste_linha
+            largura_atual = largura_teste
         else:
             # Se a linha atual já tem conteúdo, salva e começa nova linha
             if linha_atual:
                 linhas.append(linha_atual)
-            # Verifica se a palavra sozinha cabe na linha
-            bbox_palavra = draw_obj.textbbox((0, 0), palavra, font=fonte)
-            largura_palavra = bbox_palavra[2] - bbox_palavra[0]
-            if largura_palavra <= max_largura:
-                linha_atual = palavra
-            else:
-                # Palavra muito longa - força na linha atual e diminui fonte depois
-                linha_atual = palavra
+            linha_atual = palavra
+            largura_atual = largura
+            # Palavra muito longa - força na linha atual e diminui fonte depois
+            if not cabe_na_largura(draw_obj, palavra, largura, fonte, max_largura):
                 if len(linhas) < max_linhas - 1:
                     linhas.append(linha_atual)
                     linha_atual = ""
+                    largura_atual = 0
     
     if linha_atual and len(linhas) < max_linhas:
         linhas.append(linha_atual)
@@ -85,94 +136,169 @@ def texto_quebrado_simples(draw_obj, texto, fonte, max_largura, max_linhas=3):
     return linhas
 
 def calcular_tamanho_fonte_ideal(draw_obj, texto, fonte_base, max_largura, max_altura, tamanho_minimo=60, tamanho_maximo=160):
-    """Calcula o tamanho de fonte ideal para o texto caber na área disponível."""
-    tamanho_fonte = tamanho_maximo
-    fonte = ImageFont.truetype(fonte_base, tamanho_fonte)
-    
-    while tamanho_fonte >= tamanho_minimo:
-        linhas = texto_quebrado_simples(draw_obj, texto, fonte, max_largura)
-        
-        # Calcula altura total do texto
-        altura_total = 0
-        for linha in linhas:
-            bbox = draw_obj.textbbox((0, 0), linha, font=fonte)
-            altura_linha = bbox[3] - bbox[1]
-            altura_total += altura_linha
-        
-        # Adiciona espaçamento entre linhas (20% da altura da linha)
-        espacamento = altura_total * 0.2 * (len(linhas) - 1) if len(linhas) > 1 else 0
-        altura_total += espacamento
-        
-        if altura_total <= max_altura and len(linhas) <= 3:
-            break
-        
-        tamanho_fonte -= 2  # Diminui mais devagar para ajuste mais suave
-        fonte = ImageFont.truetype(fonte_base, tamanho_fonte)
-    
-    return max(tamanho_fonte, tamanho_minimo), linhas
+    """
+    Calcula o tamanho de fonte ideal para o texto caber na área disponível.
+    Os candidatos são os mesmos do ajuste passo a passo (máximo, máximo-2, ...);
+    uma busca binária encontra o maior que cabe.
+    """
+    tamanhos = list(range(tamanho_maximo, tamanho_minimo - 1, -2)) or [tamanho_maximo]
+    avaliados = {}
 
-def gerar_capa(nome_arquivo, pasta_base, titulo=None, artista=None, log_callback=None):
+    def avaliar(indice):
+        if indice not in avaliados:
+            fonte = carregar_fonte(fonte_base, tamanhos[indice])
+            linhas = texto_quebrado_simples(draw_obj, texto, fonte, max_largura)
+            
+            # Calcula altura total do texto
+            altura_total = 0
+            for linha in linhas:
+                bbox = draw_obj.textbbox((0, 0), linha, font=fonte)
+                altura_total += bbox[3] - bbox[1]
+            
+            # Adiciona espaçamento entre linhas (20% da altura da linha)
+            espacamento = altura_total * 0.2 * (len(linhas) - 1) if len(linhas) > 1 else 0
+            altura_total += espacamento
+            
+            avaliados[indice] = (altura_total <= max_altura and len(linhas) <= 3, linhas)
+        return avaliados[indice]
+
+    # Menor índice (maior tamanho) em que o texto cabe
+    inicio, fim = 0, len(tamanhos) - 1
+    melhor = None
+    while inicio <= fim:
+        meio = (inicio + fim) // 2
+        if avaliar(meio)[0]:
+            melhor = meio
+            fim = meio - 1
+        else:
+            inicio = meio + 1
+
+    if melhor is not None:
+        return tamanhos[melhor], avaliar(melhor)[1]
+    # Nada coube: tamanho mínimo com as linhas do menor candidato
+    return tamanho_minimo, avaliar(len(tamanhos) - 1)[1]
+
+def carregar_fontes():
+    """Carrega (uma vez por processo) as fontes fixas usadas na capa."""
+    global _fontes
+    if _fontes is None:
+        _fontes = {
+            'karaoke': carregar_fonte(FONT_KARAOKE_BOLD, 60),
+            'artista': carregar_fonte(FONT_ARTISTA_REGULAR, 80),
+        }
+    return _fontes
+
+def gradiente_fundo(largura, altura):
+    """Fundo gradiente usado quando não há imagem do artista."""
+    fundo = Image.new("RGB", (largura, altura), color=(0, 0, 0))
+    draw_fundo = ImageDraw.Draw(fundo)
+    cor_topo = (20, 20, 20)
+    cor_base = (0, 0, 0)
+    for y in range(altura):
+        r = int(cor_topo[0] + (cor_base[0] - cor_topo[0]) * (y / altura))
+        g = int(cor_topo[1] + (cor_base[1] - cor_topo[1]) * (y / altura))
+        b = int(cor_topo[2] + (cor_base[2] - cor_topo[2]) * (y / altura))
+        draw_fundo.line([(0, y), (largura, y)], fill=(r, g, b))
+    return fundo
+
+def carregar_camadas():
+    """
+    Monta (uma vez por processo) as camadas fixas da capa: ondas, camada de
+    legibilidade e o fundo gradiente já com as duas aplicadas.
+
+    As ondas e a camada de legibilidade têm cor e opacidade constantes, então o
+    resultado de colá-las sobre um tom de cinza depende só do tom e de o pixel
+    estar ou não sob uma onda. Isso vira duas tabelas de 256 valores e uma
+    máscara, aplicadas com um único composite por capa.
+    """
+    global _camadas
+    if _camadas is not None:
+        return _camadas
+
+    largura, altura = LARGURA_CAPA, ALTURA_CAPA
+    ondas_layer = Image.new("RGBA", (largura, altura), (0, 0, 0, 0))
+    desenhar_ondas(ImageDraw.Draw(ondas_layer), largura, altura, cor_onda=COR_ONDAS, num_ondas=4, intensidade=0.1)
+    camada_legibilidade = Image.new("RGBA", (largura, altura), (0, 0, 0, ALFA_LEGIBILIDADE))
+
+    fundo_gradiente = gradiente_fundo(largura, altura)
+    fundo_gradiente.paste(ondas_layer, (0, 0), ondas_layer)
+    fundo_gradiente.paste(camada_legibilidade, (0, 0), camada_legibilidade)
+
+    # Tabelas obtidas colando as mesmas camadas sobre os 256 tons possíveis
+    tons = Image.new("L", (256, 1))
+    tons.putdata(range(256))
+    alfa_ondas = ondas_layer.getchannel("A").getextrema()[1]
+    tabelas = []
+    for com_onda in (False, True):
+        faixa = tons.copy()
+        if com_onda:
+            faixa.paste(COR_ONDAS[0], (0, 0, 256, 1), Image.new("L", (256, 1), alfa_ondas))
+        faixa.paste(0, (0, 0, 256, 1), Image.new("L", (256, 1), ALFA_LEGIBILIDADE))
+        tabelas.append(list(faixa.getdata()))
+
+    _camadas = {
+        'fundo_gradiente': fundo_gradiente,
+        'tabela_sem_onda': tabelas[0],
+        'tabela_com_onda': tabelas[1],
+        'mascara_ondas': ondas_layer.getchannel("A").point(lambda a: 255 if a else 0),
+    }
+    return _camadas
+
+def aplicar_sobreposicao(fundo_cinza, camadas):
+    """Aplica ondas e camada de legibilidade a um fundo em tons de cinza (modo L)."""
+    com_onda = fundo_cinza.point(camadas['tabela_com_onda'])
+    sem_onda = fundo_cinza.point(camadas['tabela_sem_onda'])
+    return Image.composite(com_onda, sem_onda, camadas['mascara_ondas']).convert("RGB")
+
+def medir_topo(draw_obj, fonte):
+    """Largura e base do texto "KARAOKÊ", medidas uma vez por fonte."""
+    if fonte not in _medidas_topo:
+        bbox = draw_obj.textbbox((0, 0), "KARAOKÊ", font=fonte)
+        _medidas_topo[fonte] = (bbox[2], bbox[3])
+    return _medidas_topo[fonte]
+
+def textos_capa(nome_arquivo, titulo=None, artista=None):
+    """Título e artista exibidos na capa (do nome do arquivo se faltar algum)."""
     base, _ = os.path.splitext(nome_arquivo)
-    
     if not titulo or not artista:
         if " - " in base:
             artista, titulo = base.split(" - ", 1)
         else:
             artista = "Desconhecido"
             titulo = base
-            if log_callback:
-                log_callback(f"Formato inválido (esperado 'Artista - Música'): {nome_arquivo}")
+    return titulo.split(" v")[0].strip(), artista
+
+def gerar_capa(nome_arquivo, pasta_base, titulo=None, artista=None, log_callback=None):
+    base, _ = os.path.splitext(nome_arquivo)
     
-    titulo = titulo.split(" v")[0].strip()
+    if (not titulo or not artista) and " - " not in base and log_callback:
+        log_callback(f"Formato inválido (esperado 'Artista - Música'): {nome_arquivo}")
     
-    largura, altura = 1280, 720
+    titulo, artista = textos_capa(nome_arquivo, titulo, artista)
     
-    fundo_base = Image.new("RGB", (largura, altura), color=(0, 0, 0))
-    draw_fundo_base = ImageDraw.Draw(fundo_base)
+    largura, altura = LARGURA_CAPA, ALTURA_CAPA
+    camadas = carregar_camadas()
 
     imagem_artista_path = encontrar_imagem_artista(artista)
-    
+    img = None
+
     if imagem_artista_path:
         try:
-            img_fundo_artista = Image.open(imagem_artista_path).convert("RGB")
-            img_fundo_artista = img_fundo_artista.resize((largura, altura), Image.LANCZOS)
-            img_fundo_artista = img_fundo_artista.convert("L").convert("RGB") 
-            fundo_base = img_fundo_artista
-            
+            img_fundo_artista = carregar_fundo(imagem_artista_path, (largura, altura), "L")
+            img = aplicar_sobreposicao(img_fundo_artista, camadas)
         except Exception as e:
             if log_callback:
                 log_callback(f"Erro ao usar imagem de fundo para {artista}: {e}. Usando fundo gradiente.")
-            cor_topo = (20, 20, 20)
-            cor_base = (0, 0, 0)
-            for y in range(altura):
-                r = int(cor_topo[0] + (cor_base[0] - cor_topo[0]) * (y / altura))
-                g = int(cor_topo[1] + (cor_base[1] - cor_topo[1]) * (y / altura))
-                b = int(cor_topo[2] + (cor_base[2] - cor_topo[2]) * (y / altura))
-                draw_fundo_base.line([(0, y), (largura, y)], fill=(r, g, b))
-    else:
-        cor_topo = (20, 20, 20)
-        cor_base = (0, 0, 0)
-        for y in range(altura):
-            r = int(cor_topo[0] + (cor_base[0] - cor_topo[0]) * (y / altura))
-            g = int(cor_topo[1] + (cor_base[1] - cor_topo[1]) * (y / altura))
-            b = int(cor_topo[2] + (cor_base[2] - cor_topo[2]) * (y / altura))
-            draw_fundo_base.line([(0, y), (largura, y)], fill=(r, g, b))
 
-    ondas_layer = Image.new("RGBA", (largura, altura), (0, 0, 0, 0))
-    draw_ondas = ImageDraw.Draw(ondas_layer)
-    desenhar_ondas(draw_ondas, largura, altura, cor_onda=(50, 50, 50), num_ondas=4, intensidade=0.1)
-
-    camada_legibilidade = Image.new("RGBA", (largura, altura), (0, 0, 0, 180))
-    
-    img = fundo_base.copy()
-    img.paste(ondas_layer, (0, 0), ondas_layer)
-    img.paste(camada_legibilidade, (0, 0), camada_legibilidade)
+    if img is None:
+        img = camadas['fundo_gradiente'].copy()
 
     draw = ImageDraw.Draw(img)
 
     try:
-        fonte_karaoke = ImageFont.truetype(FONT_KARAOKE_BOLD, 60)
-        fonte_artista = ImageFont.truetype(FONT_ARTISTA_REGULAR, 80)
+        fontes = carregar_fontes()
+        fonte_karaoke = fontes['karaoke']
+        fonte_artista = fontes['artista']
         # A fonte da música será ajustada dinamicamente
         fonte_musica_base = FONT_MUSICA_BOLD
     except IOError as e:
@@ -190,7 +316,7 @@ def gerar_capa(nome_arquivo, pasta_base, titulo=None, artista=None, log_callback
         tamanho_fonte_titulo, linhas_titulo = calcular_tamanho_fonte_ideal(
             draw, titulo, fonte_musica_base, max_largura, max_altura_disponivel - 100, 60, 160
         )
-        fonte_musica = ImageFont.truetype(fonte_musica_base, tamanho_fonte_titulo)
+        fonte_musica = carregar_fonte(fonte_musica_base, tamanho_fonte_titulo)
     else:
         # Fallback se não carregar a fonte
         fonte_musica = ImageFont.load_default()
@@ -204,12 +330,12 @@ def gerar_capa(nome_arquivo, pasta_base, titulo=None, artista=None, log_callback
         tamanho_fonte_artista, linhas_artista = calcular_tamanho_fonte_ideal(
             draw, artista, FONT_ARTISTA_REGULAR, max_largura, 100, 40, tamanho_max_artista
         )
-        fonte_artista = ImageFont.truetype(FONT_ARTISTA_REGULAR, tamanho_fonte_artista)
+        fonte_artista = carregar_fonte(FONT_ARTISTA_REGULAR, tamanho_fonte_artista)
     else:
         linhas_artista = texto_quebrado_simples(draw, artista, fonte_artista, max_largura, max_linhas=2)
 
     # Texto "KARAOKÊ" sempre no topo
-    w_topo = draw.textbbox((0, 0), "KARAOKÊ", font=fonte_karaoke)[2]
+    w_topo, base_topo = medir_topo(draw, fonte_karaoke)
     draw.text(((largura - w_topo) / 2, 40), "KARAOKÊ", font=fonte_karaoke, fill="white")
 
     # --- CALCULAR POSIÇÃO VERTICAL CENTRALIZADA ---
@@ -233,7 +359,7 @@ def gerar_capa(nome_arquivo, pasta_base, titulo=None, artista=None, log_callback
         altura_total_conteudo += altura_linha
 
     # Calcular Y inicial para centralizar verticalmente (considerando espaço do "KARAOKÊ")
-    y_karaoke = 40 + draw.textbbox((0, 0), "KARAOKÊ", font=fonte_karaoke)[3] + 40
+    y_karaoke = 40 + base_topo + 40
     espaco_disponivel = altura - y_karaoke - 40  # 40px de margem inferior
     y_inicio = y_karaoke + (espaco_disponivel - altura_total_conteudo) // 2
 
@@ -266,7 +392,65 @@ def gerar_capa(nome_arquivo, pasta_base, titulo=None, artista=None, log_callback
     if log_callback:
         log_callback(f"Capa gerada: {saida}")
 
-def run(log_callback=None, pasta_videos="Karaoke", arquivo_xlsx="assets/Songs.xls"):
+def iniciar_worker():
+    """Inicializador dos processos do pool: carrega fontes, camadas e índice de artistas uma única vez."""
+    obter_indice()
+    carregar_camadas()
+    try:
+        carregar_fontes()
+    except IOError:
+        pass  # gerar_capa registra o erro e usa a fonte padrão
+
+def gerar_capa_worker(arquivo, pasta, titulo, artista):
+    """Executa gerar_capa (no pool ou no próprio processo) e devolve (sucesso, linhas de log)."""
+    linhas = []
+    try:
+        gerar_capa(arquivo, pasta, titulo=titulo, artista=artista, log_callback=linhas.append)
+        return True, linhas
+    except Exception as e:
+        linhas.append(f"Erro ao gerar capa de {arquivo}: {e}")
+        return False, linhas
+
+def assinatura_arquivo(caminho):
+    """Caminho e mtime de um arquivo de entrada (None se não existir)."""
+    if not caminho:
+        return None
+    try:
+        return [os.path.basename(caminho), os.stat(caminho).st_mtime_ns]
+    except OSError:
+        return None
+
+def assinatura_capa(titulo, artista, imagem_artista, fontes):
+    """Hash de tudo que define a capa: texto, imagem do artista, fontes e versão do layout."""
+    dados = [VERSAO_LAYOUT, titulo, artista, assinatura_arquivo(imagem_artista), fontes]
+    return hashlib.sha1(json.dumps(dados, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def carregar_manifesto(caminho):
+    try:
+        with open(caminho, "r", encoding="utf-8") as f:
+            dados = json.load(f)
+        return dados if isinstance(dados, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+def salvar_manifesto(caminho, dados):
+    temporario = caminho + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(dados, f, ensure_ascii=False, indent=0, sort_keys=True)
+    os.replace(temporario, caminho)
+
+def run(log_callback=None, pasta_videos="Karaoke", arquivo_xlsx="assets/Songs.xls", workers=None, apenas=None):
+    """
+    Gera as capas que faltam e regenera as que tiveram alguma entrada alterada
+    (título, artista, imagem do artista, fontes ou versão do layout), conforme
+    o manifesto salvo na pasta de vídeos. `workers` define quantos processos
+    geram capas em paralelo (padrão: núcleos da CPU; 1 gera no próprio processo).
+    Capas já existentes sem registro no manifesto (anteriores a ele, feitas à
+    mão ou pelo gerar_video --thumb) são adotadas como estão, sem decodificar
+    nada. `apenas` (conjunto de chaves normalizadas) limita o processamento a
+    esses vídeos; neles, capas sem registro no manifesto são refeitas, pois a
+    planilha mudou.
+    """
     agora = datetime.now().strftime("%Y%m%d_%H%M%S")
     log_file = os.path.join(LOG_DIR, f"karaoke_gerar_thumb_{agora}.log")
 
@@ -280,8 +464,8 @@ def run(log_callback=None, pasta_videos="Karaoke", arquivo_xlsx="assets/Songs.xl
         os.makedirs(pasta_videos)
         log(f"Pasta '{pasta_videos}' criada.")
     
-    pasta_artists = os.path.join(BASE_DIR, "..", "assets", "__artist")
-    log(f"Buscando imagens de artista na pasta: {pasta_artists}")
+    indice_artistas = obter_indice()
+    log(f"Imagens de artista indexadas: {len(indice_artistas)} em {PASTA_ARTISTAS}")
 
     if not os.path.exists(arquivo_xlsx):
         log(f"Arquivo XLSX não encontrado: {arquivo_xlsx}")
@@ -289,41 +473,96 @@ def run(log_callback=None, pasta_videos="Karaoke", arquivo_xlsx="assets/Songs.xl
     
     # Carrega a aba Biblioteca da nova planilha Songs.xls
     try:
-        df_biblioteca = pd.read_excel(arquivo_xlsx, sheet_name='Biblioteca')
+        titulos_map = carregar_catalogo(arquivo_xlsx).titulos()
         log("Carregada aba 'Biblioteca' da planilha Songs.xls")
     except Exception as e:
         log(f"Erro ao carregar aba 'Biblioteca': {e}")
         return
     
-    # Prepara o mapeamento de títulos
-    df_biblioteca['full_title'] = df_biblioteca['full_title'].astype(str).str.strip()
-    titulos_map = {normalizar_nome(t): t for t in df_biblioteca['full_title'].tolist()}
-
-    video_extensoes = {".mp4", ".mkv", ".avi", ".mov", ".flv", ".wmv", ".mpeg", ".webm"}
-    for root, dirs, files in os.walk(pasta_videos):
-        for arquivo in files:
-            nome, ext = os.path.splitext(arquivo)
-            if ext.lower() in video_extensoes:
-                chave = normalizar_nome(nome)
-                titulo = artista = None
-                
-                # Busca na aba Biblioteca usando full_title
-                if chave in titulos_map:
-                    full_title = titulos_map[chave]
-                    # Tenta extrair artista e título do full_title
-                    if " - " in full_title:
-                        artista, titulo = full_title.split(" - ", 1)
-                    else:
-                        titulo = full_title
-                
-                # Fallback: se não encontrou na planilha, tenta extrair do nome do arquivo
-                if not artista and " - " in nome:
-                    artista = nome.split(" - ", 1)[0]
-                elif not artista:
-                    artista = "Desconhecido"
-
-                capa_path = os.path.join(root, nome + ".jpg")
-                if os.path.exists(capa_path):
-                    log(f"Capa já existe, ignorando: {arquivo}")
-                    continue
-                gerar_capa(arquivo, root, titulo=titulo, artista=artista, log_callback=log)
\ No newline at end of file
+    # Manifesto: assinatura das entradas de cada capa já gerada
+    caminho_manifesto = os.path.join(pasta_videos, MANIFESTO_CAPAS)
+    manifesto = carregar_manifesto(caminho_manifesto)
+    manifesto_novo = {}
+    assinatura_fontes = [assinatura_arquivo(f) for f in (FONT_MUSICA_BOLD, FONT_ARTISTA_REGULAR, FONT_KARAOKE_BOLD)]
+    inalteradas = atualizadas = 0
+
+    pendentes = []
+    for video in obter_inventario(pasta_videos).videos:
+        if apenas is not None and video.chave not in apenas:
+            # Fora da seleção: mantém o registro atual do manifesto
+            chave_manifesto = os.path.relpath(os.path.join(video.pasta, video.nome + ".jpg"), pasta_videos).replace(os.sep, "/")
+            if chave_manifesto in manifesto:
+                manifesto_novo[chave_manifesto] = manifesto[chave_manifesto]
+            continue
+        arquivo, nome, root = video.arquivo, video.nome, video.pasta
+        titulo = artista = None
+        
+        # Busca na aba Biblioteca usando full_title
+        if video.chave in titulos_map:
+            full_title = titulos_map[video.chave]
+            # Tenta extrair artista e título do full_title
+            if " - " in full_title:
+                artista, titulo = full_title.split(" - ", 1)
+            else:
+                titulo = full_title
+        
+        # Fallback: se não encontrou na planilha, tenta extrair do nome do arquivo
+        if not artista and " - " in nome:
+            artista = nome.split(" - ", 1)[0]
+        elif not artista:
+            artista = "Desconhecido"
+
+        capa_path = os.path.join(root, nome + ".jpg")
+        chave_manifesto = os.path.relpath(capa_path, pasta_videos).replace(os.sep, "/")
+        texto_titulo, texto_artista = textos_capa(arquivo, titulo, artista)
+        assinatura = assinatura_capa(texto_titulo, texto_artista,
+                                     indice_artistas.buscar(texto_artista), assinatura_fontes)
+
+        if video.capa:
+            anterior = manifesto.get(chave_manifesto)
+            if anterior == assinatura or (anterior is None and apenas is None):
+                # Capas sem registro são adotadas com a assinatura atual
+                manifesto_novo[chave_manifesto] = assinatura
+                inalteradas += 1
+                continue
+            if anterior is None:
+                log(f"Capa sem registro no manifesto, regenerando: {arquivo}")
+            else:
+                log(f"Entradas da capa mudaram, regenerando: {arquivo}")
+            atualizadas += 1
+        pendentes.append(((arquivo, root, titulo, artista), chave_manifesto, assinatura))
+
+    def registrar(resultado, chave_manifesto, assinatura):
+        sucesso, linhas = resultado
+        for linha in linhas:
+            log(linha)
+        if sucesso:
+            manifesto_novo[chave_manifesto] = assinatura
+
+    try:
+        if not pendentes:
+            log("Nenhuma capa para gerar.")
+        else:
+            workers = min(workers or os.cpu_count() or 1, len(pendentes))
+            log(f"Gerando {len(pendentes)} capas com {workers} processo(s)...")
+
+            if workers == 1:
+                for item, chave_manifesto, assinatura in pendentes:
+                    registrar(gerar_capa_worker(*item), chave_manifesto, assinatura)
+            else:
+                with ProcessPoolExecutor(max_workers=workers, initializer=iniciar_worker) as pool:
+                    futuros = {pool.submit(gerar_capa_worker, *item): (chave_manifesto, assinatura)
+                               for item, chave_manifesto, assinatura in pendentes}
+                    for futuro in as_completed(futuros):
+                        registrar(futuro.result(), *futuros[futuro])
+    finally:
+        # Capas novas: o inventário da pasta precisa ser relido
+        if pendentes:
+            invalidar(pasta_videos)
+        if manifesto_novo != manifesto:
+            try:
+                salvar_manifesto(caminho_manifesto, manifesto_novo)
+            except OSError as e:
+                log(f"Erro ao salvar manifesto de capas: {e}")
+
+    log(f"Capas: {len(pendentes) - atualizadas} novas, {atualizadas} atualizadas, {inalteradas} sem alteração.")
@@ -4,7 +4,6 @@ Gerador de Vídeo Karaokê ULTRA RÁPIDO - Com Efeito de Rolagem
 Versão com sincronização corrigida (sem atraso)
 """
 
-import re
 import os
 import sys
 import math
@@ -17,6 +16,16 @@ import subprocess
 import shutil
 import threading
 
+# Permite importar os módulos de scripts/ quando executado diretamente
+PROJECT_ROOT = str(Path(__file__).resolve().parent.parent)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from scripts.duracao_audio import obter_duracao
+from scripts.ultrastar import carregar_musica
+from scripts.indice_artistas import encontrar_imagem_artista
+from scripts.imagens import carregar_fundo
+
 # ==================== CONFIGURAÇÕES OTIMIZADAS ====================
 
 def find_ffmpeg_tools():
@@ -156,6 +165,15 @@ def detect_gpu_optimized(ffmpeg_path):
     cpu_params = ['-c:v', 'libx264', '-preset', 'ultrafast', '-crf', '28', '-threads', '0']
     return 'libx264', 'CPU', cpu_params
 
+def aplicar_limite_threads(encoder_params, threads):
+    """Limita as threads do encoder (útil quando vários vídeos são gerados em paralelo)"""
+    params = list(encoder_params)
+    if '-threads' in params:
+        params[params.index('-threads') + 1] = str(threads)
+    else:
+        params += ['-threads', str(threads)]
+    return params
+
 # ==================== EFEITOS VISUAIS OTIMIZADOS ====================
 
 def desenhar_ondas(draw_obj, largura, altura, cor_onda, num_ondas=4, intensidade=0.08):
@@ -173,69 +191,6 @@ def desenhar_ondas(draw_obj, largura, altura, cor_onda, num_ondas=4, intensidade
             pontos_preenchimento = [(0, altura)] + pontos + [(largura, altura)]
             draw_obj.polygon(pontos_preenchimento, fill=cor_onda_rgba)
 
-# ==================== PARSER ULTRASTAR ====================
-
-class UltraStarParser:
-    def __init__(self, filepath):
-        self.filepath = filepath
-        self.header = {}
-        self.notes = []
-        self.parse_file()
-    
-    def parse_file(self):
-        with open(self.filepath, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                if line.startswith('#'):
-                    self.parse_header(line)
-                elif line.startswith(':'):
-                    self.parse_note(line)
-                elif line.startswith('-'):
-                    self.notes.append({'type': 'break', 'beat': int(line.split()[1]) if len(line.split()) > 1 else 0})
-                elif line.startswith('E'):
-                    break
-    
-    def parse_header(self, line):
-        match = re.match(r'#(\w+):(.+)', line)
-        if match:
-            key, value = match.groups()
-            self.header[key] = value.strip()
-    
-    def parse_note(self, line):
-        parts = line.split()
-        if len(parts) >= 4:
-            note = {
-                'type': 'note',
-                'beat': int(parts[1]),
-                'duration': int(parts[2]),
-                'pitch': int(parts[3]),
-                'text': ' '.join(parts[4:]) if len(parts) > 4 else ''
-            }
-            self.notes.append(note)
-    
-    def beat_to_seconds(self, beat):
-        bpm = float(self.header.get('BPM', 120))
-        gap = float(self.header.get('GAP', 0)) / 1000
-        seconds = (beat * 60) / (bpm * 4) + gap
-        return seconds
-    
-    def get_lines(self):
-        lines = []
-        current_line = []
-        
-        for note in self.notes:
-            if note['type'] == 'break':
-                if current_line:
-                    lines.append(current_line)
-                    current_line = []
-            elif note['type'] == 'note' and note['text']:
-                current_line.append(note)
-        
-        if current_line:
-            lines.append(current_line)
-        
-        return lines
-
 # ==================== RENDERIZADOR COM ROLAGEM ====================
 
 class ScrollingTextRenderer:
@@ -430,7 +385,6 @@ class ScrollingTextRenderer:
                 possible_paths = [
                     project_root / background_path,
                     project_root / "assets" / "background" / background_path,
-                    project_root / "assets" / "background" / "__artist" / background_path
                 ]
                 for path in possible_paths:
                     if path.exists():
@@ -438,6 +392,12 @@ class ScrollingTextRenderer:
                         print(f"   🔍 Background encontrado em: {path}")
                         break
                 
+                if not final_background_path:
+                    # Nome do artista: busca no índice de assets/__artist
+                    final_background_path = encontrar_imagem_artista(background_path.stem)
+                    if final_background_path:
+                        print(f"   🔍 Background encontrado em: {final_background_path}")
+                
                 if not final_background_path:
                     print(f"   ❌ Background não encontrado: {background_path}")
             else:
@@ -458,8 +418,7 @@ class ScrollingTextRenderer:
 
         if final_background_path and os.path.exists(final_background_path):
             try:
-                img_fundo_artista = Image.open(final_background_path).convert("RGB")
-                img_fundo_artista = img_fundo_artista.resize((self.width, self.height), Image.Resampling.LANCZOS)
+                img_fundo_artista = carregar_fundo(final_background_path, (self.width, self.height))
                 fundo_base = img_fundo_artista
                 print(f"   ✅ Imagem de fundo carregada: {os.path.basename(final_background_path)}")
             except Exception as e:
@@ -498,11 +457,11 @@ class ScrollingTextRenderer:
 # ==================== GERADOR COM ROLAGEM ====================
 
 class ScrollingKaraokeGenerator:
-    def __init__(self, ultrastar_file, background_image=None, audio_file=None, use_gpu=True):
+    def __init__(self, ultrastar_file, background_image=None, audio_file=None, use_gpu=True, threads=None, thumb=False):
         script_dir = Path(__file__).parent
         project_root = script_dir.parent
         
-        self.parser = UltraStarParser(ultrastar_file)
+        self.parser = carregar_musica(ultrastar_file)
         self.background_image = background_image
         
         artist = self.parser.header.get('ARTIST', 'Artista_Desconhecido')
@@ -522,6 +481,8 @@ class ScrollingKaraokeGenerator:
         output_dir.mkdir(exist_ok=True)
         
         self.output_file = str(output_dir / f"{artist_clean} - {title_clean}.mp4")
+        # Capa para o Emby (<nome>.jpg ao lado do vídeo), no mesmo layout do gerar_thumb
+        self.thumb_file = str(output_dir / f"{artist_clean} - {title_clean}.jpg") if thumb else None
         self.project_root = str(project_root)
         
         print(f"📁 Diretório do projeto: {self.project_root}")
@@ -546,6 +507,10 @@ class ScrollingKaraokeGenerator:
             self.encoder, self.gpu_name = 'libx264', 'CPU'
             self.encoder_params = ['-c:v', 'libx264', '-preset', 'ultrafast', '-crf', '28']
         
+        if threads:
+            self.encoder_params = aplicar_limite_threads(self.encoder_params, threads)
+            print(f"🧵 Threads do encoder: {threads}")
+        
         self.text_renderer = ScrollingTextRenderer(self.width, self.height, self.project_root)
         
         if audio_file:
@@ -578,93 +543,19 @@ class ScrollingKaraokeGenerator:
         self.encoding_finished = False
     
     def get_audio_duration(self):
-        """Duração do áudio"""
-        if not self.ffprobe_path:
-            print("   ⚠️  FFprobe não disponível - usando duração padrão")
-            return 180.0
-        
-        try:
-            print("🎵 Analisando áudio...")
-            result = subprocess.run([
-                self.ffprobe_path, '-v', 'quiet', '-show_entries', 'format=duration',
-                '-of', 'default=noprint_wrappers=1:nokey=1', str(self.audio_path)
-            ], capture_output=True, text=True, timeout=10)
-            
-            if result.returncode == 0 and result.stdout.strip():
-                duration = float(result.stdout.strip())
-                print(f"   ✅ Duração detectada: {duration:.1f}s")
-                return duration
-            else:
-                print("   ⚠️  Usando duração padrão")
-                return 180.0
-                
-        except Exception as e:
-            print(f"   ⚠️  Erro: {str(e)[:30]}... Usando duração padrão")
-            return 180.0
-    
-    def calculate_scroll_moments(self, lines):
+        """Duração do áudio (cabeçalhos do MP3, FFprobe como fallback, com cache)"""
+        print("🎵 Analisando áudio...")
+        duration = obter_duracao(str(self.audio_path), self.ffprobe_path)
+        if not duration:
+            # Sem duração confiável o vídeo sairia cortado ou com sobra
+            raise RuntimeError(f"Não foi possível determinar a duração do áudio: {self.audio_path}")
+        print(f"   ✅ Duração detectada: {duration:.1f}s")
+        return duration
+    
+    def calculate_scroll_moments(self):
         """Calcula momentos com suporte para 3 linhas (anterior, atual, próxima)"""
-        scroll_moments = []
-        
-        # Frame inicial (título + artista)
-        scroll_moments.append({
-            'start_time': 0,
-            'end_time': 4,
-            'type': 'title',
-            'title': self.parser.header.get('TITLE', 'Música'),
-            'artist': self.parser.header.get('ARTIST', 'Artista'),
-            'transition_progress': 1.0
-        })
-        
-        # Processar cada linha com contexto (anterior, atual, próxima)
-        for i, line_notes in enumerate(lines):
-            if not line_notes:
-                continue
-            
-            line_start = self.parser.beat_to_seconds(line_notes[0]['beat'])
-            line_end = self.parser.beat_to_seconds(line_notes[-1]['beat'] + line_notes[-1]['duration'])
-            
-            # Linha anterior
-            previous_line = None
-            if i > 0:
-                prev_notes = lines[i - 1]
-                if prev_notes:
-                    previous_line = ' '.join([note['text'] for note in prev_notes]).strip()
-            
-            # Linha atual
-            current_line = ' '.join([note['text'] for note in line_notes]).strip()
-            
-            # Próxima linha
-            next_line = None
-            next_line_start = None
-            if i + 1 < len(lines):
-                next_notes = lines[i + 1]
-                if next_notes:
-                    next_line = ' '.join([note['text'] for note in next_notes]).strip()
-                    next_line_start = self.parser.beat_to_seconds(next_notes[0]['beat'])
-            
-            # Calcular fim do momento
-            if next_line_start is not None:
-                moment_end = next_line_start
-            else:
-                moment_end = line_end + 0.5
-            
-            # CORREÇÃO: Iniciar transição ANTES para terminar no tempo certo
-            # A transição de rolagem precisa terminar LEVEMENTE antes do áudio começar
-            transition_duration = 0.7  # 700ms para rolagem bem visível e suave
-            anticipation = 0.25  # 250ms de antecipação extra (a linha fica pronta antes)
-            transition_start = max(4, line_start - transition_duration - anticipation)
-            
-            scroll_moments.append({
-                'start_time': transition_start,
-                'end_time': moment_end,
-                'type': 'lyrics',
-                'previous_line': previous_line,
-                'current_line': current_line,
-                'next_line': next_line,
-                'transition_duration': transition_duration,
-                'line_actual_start': line_start  # Momento real da linha
-            })
+        # Título e frases vêm compilados (e em cache) do parser
+        scroll_moments = list(self.parser.get_moments())
         
         # Frame final (sem texto)
         if scroll_moments:
@@ -803,6 +694,18 @@ class ScrollingKaraokeGenerator:
         
         return frame
     
+    def save_thumbnail(self):
+        """
+        Salva a capa com o layout do gerar_thumb. O gerar_thumb adota capas
+        sem registro no manifesto, então ela não é refeita na próxima passada.
+        """
+        # (importado aqui: só é necessário com --thumb)
+        from scripts.gerar_thumb import gerar_capa
+        pasta, nome_arquivo = os.path.split(self.output_file)
+        artista, titulo = os.path.splitext(nome_arquivo)[0].split(" - ", 1)
+        gerar_capa(nome_arquivo, pasta, titulo=titulo, artista=artista)
+        print(f"   🖼️  Capa: {self.thumb_file}")
+    
     def monitor_ffmpeg_optimized(self, process):
         """Monitor otimizado"""
         def monitor():
@@ -838,7 +741,7 @@ class ScrollingKaraokeGenerator:
         print(f"   📝 Linhas: {len(lines)}")
         
         # Calcular momentos com rolagem
-        scroll_moments = self.calculate_scroll_moments(lines)
+        scroll_moments = self.calculate_scroll_moments()
         print(f"   🎯 Momentos de rolagem: {len(scroll_moments)}")
         print(f"   ⚡ Sincronização: Transição inicia 950ms ANTES (700ms rolagem + 250ms antecipação)")
         print(f"   📈 Movimento: 250px de rolagem VISÍVEL em cada frase")
@@ -941,6 +844,11 @@ class ScrollingKaraokeGenerator:
                 print(f"   📏 Tamanho: {file_size:.1f} MB")
                 print(f"   ⏱️  Tempo total: {elapsed:.1f}s")
                 print(f"   🚀 Velocidade média: {total_frames/elapsed:.1f} fps")
+                if self.thumb_file:
+                    try:
+                        self.save_thumbnail()
+                    except Exception as e:
+                        print(f"   ⚠️  Erro ao salvar capa: {e}")
                 print(f"   🎨 Efeitos aplicados:")
                 print(f"      - Rolagem CONTÍNUA com cubic ease-out")
                 print(f"      - Transição antecipada (950ms ANTES)")
@@ -971,6 +879,8 @@ def main():
     parser.add_argument('--background', '-bg', help='Imagem de fundo')
     parser.add_argument('--audio', '-a', help='Arquivo de áudio')
     parser.add_argument('--no-gpu', action='store_true', help='Usar CPU')
+    parser.add_argument('--threads', type=int, help='Limite de threads do encoder (padrão: automático)')
+    parser.add_argument('--thumb', action='store_true', help='Salvar também a capa (<nome>.jpg) a partir do frame de título')
     
     args = parser.parse_args()
     
@@ -1001,7 +911,9 @@ def main():
             str(input_path),
             background_image=args.background,
             audio_file=args.audio,
-            use_gpu=not args.no_gpu
+            use_gpu=not args.no_gpu,
+            threads=args.threads,
+            thumb=args.thumb
         )
         generator.generate_video_with_scroll()
         
@@ -0,0 +1,81 @@
+"""
+Carregamento de imagens de fundo (fotos de artistas) já no tamanho final.
+
+Fotos JPEG grandes são decodificadas direto em escala reduzida (Image.draft,
+1/2, 1/4 ou 1/8 do tamanho) no menor tamanho que ainda cobre o destino; os
+demais formatos são reduzidos com Image.reduce antes do redimensionamento
+final. As versões colorida e em tons de cinza ficam em cache por caminho,
+mtime e tamanho de destino, até MAX_CACHE_BYTES por processo.
+"""
+import os
+import threading
+from collections import OrderedDict
+from PIL import Image
+
+# Memória máxima das imagens em cache, por processo (cada worker do pool de
+# capas tem o seu): ~8 fundos 1280x720 com as versões RGB e L
+MAX_CACHE_BYTES = 32 * 1024 * 1024
+
+_cache = OrderedDict()
+_bytes_cache = 0
+_lock = threading.Lock()
+
+
+def bytes_imagem(img):
+    return img.width * img.height * len(img.getbands())
+
+
+def _liberar_espaco():
+    """Descarta as imagens usadas há mais tempo até caber no limite (chamar com _lock)."""
+    global _bytes_cache
+    while _bytes_cache > MAX_CACHE_BYTES and len(_cache) > 1:
+        _, versoes = _cache.popitem(last=False)
+        _bytes_cache -= sum(bytes_imagem(img) for img in versoes.values())
+
+
+def decodificar_reduzida(caminho, tamanho):
+    """Abre a imagem em RGB com o menor custo de decodificação que ainda cobre `tamanho`."""
+    largura, altura = tamanho
+    with Image.open(caminho) as img:
+        if img.format == "JPEG":
+            # Decodifica em escala reduzida, sem ficar menor que o destino
+            img.draft("RGB", (largura, altura))
+        img = img.convert("RGB")
+
+    # Formatos sem draft: reduz por média de blocos até perto do destino
+    fator = min(img.width // largura, img.height // altura)
+    if fator >= 2:
+        img = img.reduce(fator)
+    return img.resize((largura, altura), Image.LANCZOS)
+
+
+def carregar_fundo(caminho, tamanho, modo="RGB"):
+    """
+    Imagem em `caminho` redimensionada para `tamanho`, em "RGB" ou em tons de
+    cinza ("L", derivada da versão colorida). A imagem devolvida é uma cópia
+    e pode ser alterada livremente.
+    """
+    st = os.stat(caminho)
+    chave = (os.path.abspath(caminho), st.st_mtime_ns, tuple(tamanho))
+
+    with _lock:
+        versoes = _cache.get(chave)
+        if versoes is not None:
+            _cache.move_to_end(chave)
+
+    global _bytes_cache
+    if versoes is None:
+        versoes = {"RGB": decodificar_reduzida(caminho, tamanho)}
+        with _lock:
+            if chave not in _cache:
+                _cache[chave] = versoes
+                _bytes_cache += bytes_imagem(versoes["RGB"])
+                _liberar_espaco()
+
+    with _lock:
+        if modo not in versoes:
+            versoes[modo] = versoes["RGB"].convert(modo)
+            if _cache.get(chave) is versoes:
+                _bytes_cache += bytes_imagem(versoes[modo])
+                _liberar_espaco()
+        return versoes[modo].copy()
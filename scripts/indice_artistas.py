@@ -0,0 +1,86 @@
+"""
+Índice das imagens de artistas (assets/__artist).
+
+A pasta é listada uma única vez e os nomes normalizados ficam em uma lista
+ordenada; a busca por artista é uma busca binária pelo prefixo. O índice é
+reconstruído automaticamente quando o mtime da pasta muda.
+
+Regras de busca (determinísticas):
+1. Imagem cujo nome normalizado é igual ao do artista.
+2. Senão, o menor nome (ordem alfabética) que começa com o nome do artista.
+3. Para nomes iguais, vale a ordem de EXTENSOES_PRIORIDADE e depois o nome do arquivo.
+"""
+import os
+import threading
+from bisect import bisect_left
+from scripts.verificar_arquivos import normalizar_nome
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PASTA_ARTISTAS = os.path.normpath(os.path.join(BASE_DIR, "..", "assets", "__artist"))
+
+# Extensões aceitas, em ordem de preferência para nomes iguais
+EXTENSOES_PRIORIDADE = [".jpg", ".jpeg", ".png", ".webp", ".avif", ".bmp", ".gif", ".tiff"]
+IMAGE_EXTENSIONS = set(EXTENSOES_PRIORIDADE)
+
+
+class IndiceImagensArtistas:
+    def __init__(self, pasta=PASTA_ARTISTAS):
+        self.pasta = pasta
+        self.mtime = None
+        self.nomes = []
+        self.arquivos = []
+        self.construir()
+
+    def construir(self):
+        entradas = []
+        try:
+            self.mtime = os.stat(self.pasta).st_mtime_ns
+            with os.scandir(self.pasta) as it:
+                for entrada in it:
+                    nome, ext = os.path.splitext(entrada.name)
+                    ext = ext.lower()
+                    if ext in IMAGE_EXTENSIONS and entrada.is_file():
+                        entradas.append((normalizar_nome(nome), EXTENSOES_PRIORIDADE.index(ext), entrada.name))
+        except OSError:
+            self.mtime = None
+
+        entradas.sort()
+        self.nomes = [nome for nome, _, _ in entradas]
+        self.arquivos = [os.path.join(self.pasta, arquivo) for _, _, arquivo in entradas]
+
+    def desatualizado(self):
+        try:
+            return os.stat(self.pasta).st_mtime_ns != self.mtime
+        except OSError:
+            return self.mtime is not None
+
+    def buscar(self, nome_artista):
+        """Caminho da imagem do artista ou None."""
+        chave = normalizar_nome(nome_artista or "")
+        if not chave:
+            return None
+        # Na lista ordenada, o nome exato (se existir) vem antes dos que só começam com ele
+        i = bisect_left(self.nomes, chave)
+        if i < len(self.nomes) and self.nomes[i].startswith(chave):
+            return self.arquivos[i]
+        return None
+
+    def __len__(self):
+        return len(self.nomes)
+
+
+_indices = {}
+_lock = threading.Lock()
+
+
+def obter_indice(pasta=PASTA_ARTISTAS):
+    """Índice compartilhado da pasta, reconstruído se o mtime da pasta mudou."""
+    with _lock:
+        indice = _indices.get(pasta)
+        if indice is None or indice.desatualizado():
+            indice = _indices[pasta] = IndiceImagensArtistas(pasta)
+        return indice
+
+
+def encontrar_imagem_artista(nome_artista, pasta=PASTA_ARTISTAS):
+    return obter_indice(pasta).buscar(nome_artista)
@@ -0,0 +1,277 @@
+"""
+Monitor da biblioteca: mantém o inventário da sessão atualizado em segundo plano.
+
+A cada `intervalo` segundos o índice (scripts.biblioteca) é sincronizado,
+o que custa um stat por pasta e relista apenas as pastas alteradas; isso
+funciona também em pastas de rede mapeadas. Mudanças também são avisadas na
+hora, via ctypes: no Linux pelo inotify (só pastas locais) e no Windows pelo
+ReadDirectoryChangesW na pasta raiz, com subpastas (inclusive em unidades de
+rede). Se o aviso não estiver disponível, fica só a verificação periódica.
+Os eventos são agrupados: a sincronização
+só acontece depois de `espera` segundos sem novos eventos, então uma cópia
+em massa (ex.: enviar_karaoke) gera uma única atualização no final.
+"""
+import os
+import time
+import ctypes
+import ctypes.util
+import select
+import threading
+from scripts import biblioteca
+
+INTERVALO_PADRAO = 30.0
+ESPERA_PADRAO = 2.0
+
+# Eventos do inotify que alteram a listagem de uma pasta
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_ONLYDIR = 0x01000000
+MASCARA_INOTIFY = (IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+                   | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+
+
+class Inotify:
+    """Acesso mínimo ao inotify: só interessa saber que algo mudou."""
+
+    def __init__(self):
+        nome_libc = ctypes.util.find_library("c")
+        if not hasattr(os, "O_NONBLOCK") or not nome_libc:
+            raise OSError("inotify indisponível")
+        self.libc = ctypes.CDLL(nome_libc, use_errno=True)
+        if not hasattr(self.libc, "inotify_init1"):
+            raise OSError("inotify indisponível")
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 falhou")
+        self.observadas = set()
+
+    def observar(self, pasta):
+        """Adiciona uma pasta (retorna False se o limite de watches foi atingido)."""
+        if pasta in self.observadas:
+            return True
+        if self.libc.inotify_add_watch(self.fd, os.fsencode(pasta), MASCARA_INOTIFY) < 0:
+            return False
+        self.observadas.add(pasta)
+        return True
+
+    def esperar(self, timeout):
+        """Espera eventos por até `timeout` segundos; True se houve algum."""
+        prontos, _, _ = select.select([self.fd], [], [], timeout)
+        if not prontos:
+            return False
+        try:
+            while os.read(self.fd, 64 * 1024):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def fechar(self):
+        os.close(self.fd)
+
+
+# ReadDirectoryChangesW (Windows)
+FILE_LIST_DIRECTORY = 0x0001
+FILE_SHARE_TODOS = 0x00000001 | 0x00000002 | 0x00000004  # leitura, escrita e exclusão
+OPEN_EXISTING = 3
+FILE_FLAG_BACKUP_SEMANTICS = 0x02000000
+FILE_FLAG_OVERLAPPED = 0x40000000
+FILE_NOTIFY_MUDANCAS = 0x01 | 0x02 | 0x04 | 0x08 | 0x10  # nomes de arquivo/pasta, atributos, tamanho, escrita
+WAIT_OBJECT_0 = 0
+TAMANHO_BUFFER_WINDOWS = 64 * 1024  # máximo aceito em pastas de rede
+
+
+class ObservadorWindows:
+    """
+    ReadDirectoryChangesW assíncrono na raiz (subpastas incluídas), com a
+    mesma interface do Inotify. O conteúdo das notificações não é lido.
+    """
+
+    def __init__(self, raiz):
+        from ctypes import wintypes
+
+        class OVERLAPPED(ctypes.Structure):
+            _fields_ = [("Internal", ctypes.c_size_t), ("InternalHigh", ctypes.c_size_t),
+                        ("Offset", wintypes.DWORD), ("OffsetHigh", wintypes.DWORD),
+                        ("hEvent", wintypes.HANDLE)]
+
+        k32 = self.kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        k32.CreateFileW.restype = wintypes.HANDLE
+        k32.CreateFileW.argtypes = [wintypes.LPCWSTR, wintypes.DWORD, wintypes.DWORD, ctypes.c_void_p,
+                                    wintypes.DWORD, wintypes.DWORD, wintypes.HANDLE]
+        k32.CreateEventW.restype = wintypes.HANDLE
+        k32.CreateEventW.argtypes = [ctypes.c_void_p, wintypes.BOOL, wintypes.BOOL, wintypes.LPCWSTR]
+        k32.ReadDirectoryChangesW.restype = wintypes.BOOL
+        k32.ReadDirectoryChangesW.argtypes = [wintypes.HANDLE, ctypes.c_void_p, wintypes.DWORD, wintypes.BOOL,
+                                              wintypes.DWORD, ctypes.POINTER(wintypes.DWORD),
+                                              ctypes.POINTER(OVERLAPPED), ctypes.c_void_p]
+        k32.GetOverlappedResult.restype = wintypes.BOOL
+        k32.GetOverlappedResult.argtypes = [wintypes.HANDLE, ctypes.POINTER(OVERLAPPED),
+                                            ctypes.POINTER(wintypes.DWORD), wintypes.BOOL]
+        k32.WaitForSingleObject.restype = wintypes.DWORD
+        k32.WaitForSingleObject.argtypes = [wintypes.HANDLE, wintypes.DWORD]
+        k32.ResetEvent.argtypes = [wintypes.HANDLE]
+        k32.CancelIoEx.argtypes = [wintypes.HANDLE, ctypes.c_void_p]
+        k32.CloseHandle.argtypes = [wintypes.HANDLE]
+
+        self._bytes = wintypes.DWORD()
+        self._buffer = ctypes.create_string_buffer(TAMANHO_BUFFER_WINDOWS)
+        self._overlapped = OVERLAPPED()
+        self.evento = self.handle = None
+        self._pendente = False
+
+        self.handle = k32.CreateFileW(raiz, FILE_LIST_DIRECTORY, FILE_SHARE_TODOS, None, OPEN_EXISTING,
+                                      FILE_FLAG_BACKUP_SEMANTICS | FILE_FLAG_OVERLAPPED, None)
+        if not self.handle or self.handle == wintypes.HANDLE(-1).value:
+            self.handle = None
+            raise ctypes.WinError(ctypes.get_last_error())
+        self.evento = k32.CreateEventW(None, True, False, None)
+        if not self.evento:
+            erro = ctypes.get_last_error()
+            self.fechar()
+            raise ctypes.WinError(erro)
+        self._overlapped.hEvent = self.evento
+        try:
+            self._ler()
+        except OSError:
+            self.fechar()
+            raise
+
+    def _ler(self):
+        """Pede a próxima notificação (retorna na hora; o evento sinaliza a chegada)."""
+        self.kernel32.ResetEvent(self.evento)
+        if not self.kernel32.ReadDirectoryChangesW(self.handle, self._buffer, TAMANHO_BUFFER_WINDOWS, True,
+                                                   FILE_NOTIFY_MUDANCAS, None, ctypes.byref(self._overlapped), None):
+            raise ctypes.WinError(ctypes.get_last_error())
+        self._pendente = True
+
+    def observar(self, pasta):
+        return True  # a raiz já é observada com todas as subpastas
+
+    def esperar(self, timeout):
+        """Espera mudanças por até `timeout` segundos; True se houve alguma."""
+        if self.kernel32.WaitForSingleObject(self.evento, int(timeout * 1000)) != WAIT_OBJECT_0:
+            return False
+        # Buffer estourado (0 bytes) também conta: a sincronização relista o que mudou
+        self.kernel32.GetOverlappedResult(self.handle, ctypes.byref(self._overlapped), ctypes.byref(self._bytes), False)
+        self._pendente = False
+        self._ler()
+        return True
+
+    def fechar(self):
+        if self.handle:
+            if self._pendente:
+                # Cancela a leitura pendente e espera o cancelamento antes de liberar o buffer
+                self.kernel32.CancelIoEx(self.handle, None)
+                self.kernel32.GetOverlappedResult(self.handle, ctypes.byref(self._overlapped),
+                                                  ctypes.byref(self._bytes), True)
+                self._pendente = False
+            self.kernel32.CloseHandle(self.handle)
+            self.handle = None
+        if self.evento:
+            self.kernel32.CloseHandle(self.evento)
+            self.evento = None
+
+
+def criar_observador(raiz):
+    """Aviso de mudanças da plataforma (OSError se indisponível)."""
+    if os.name == "nt":
+        return ObservadorWindows(raiz)
+    return Inotify()
+
+
+class MonitorBiblioteca:
+    def __init__(self, raiz, intervalo=INTERVALO_PADRAO, espera=ESPERA_PADRAO, log_callback=None):
+        self.raiz = raiz
+        self.intervalo = intervalo
+        self.espera = espera
+        self.log_callback = log_callback
+        self._parar = threading.Event()
+        self._thread = None
+        self._observador = None
+
+    def log(self, msg):
+        if self.log_callback:
+            self.log_callback(msg)
+
+    def iniciar(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._executar, daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+
+    def _sincronizar(self):
+        try:
+            relistadas = biblioteca.sincronizar(self.raiz)
+        except Exception as e:
+            self.log(f"⚠️  Monitor da biblioteca: erro ao atualizar o índice: {e}")
+            return
+        if relistadas:
+            self.log(f"🔄 Biblioteca atualizada: {relistadas} pasta(s) alterada(s)")
+        if self._observador:
+            for pasta in biblioteca.obter_indice().pastas(self.raiz):
+                if not self._observador.observar(pasta):
+                    break  # limite do sistema: o restante fica por conta da verificação periódica
+
+    def _executar(self):
+        try:
+            self._observador = criar_observador(self.raiz)
+        except (OSError, AttributeError) as e:
+            self.log(f"⚠️  Monitor da biblioteca: sem avisos de mudança, só verificação periódica: {e}")
+            self._observador = None
+
+        try:
+            self._sincronizar()
+            ultimo_evento = None
+            proxima_verificacao = time.monotonic() + self.intervalo
+            while not self._parar.is_set():
+                if self._observador:
+                    try:
+                        if self._observador.esperar(0.5):
+                            ultimo_evento = time.monotonic()
+                    except OSError as e:
+                        # Ex.: pasta de rede desconectada; segue só com a verificação periódica
+                        self.log(f"⚠️  Monitor da biblioteca: avisos de mudança desativados: {e}")
+                        self._observador.fechar()
+                        self._observador = None
+                else:
+                    self._parar.wait(0.5)
+
+                agora = time.monotonic()
+                silencio = ultimo_evento is not None and agora - ultimo_evento >= self.espera
+                if silencio or agora >= proxima_verificacao:
+                    ultimo_evento = None
+                    self._sincronizar()
+                    proxima_verificacao = time.monotonic() + self.intervalo
+        finally:
+            if self._observador:
+                self._observador.fechar()
+                self._observador = None
+
+
+_monitor = None
+
+
+def monitorar(raiz, intervalo=INTERVALO_PADRAO, espera=ESPERA_PADRAO, log_callback=None):
+    """Inicia (ou troca de pasta) o monitor único da sessão. intervalo <= 0 desliga."""
+    global _monitor
+    if _monitor is not None:
+        if _monitor.raiz == raiz and _monitor.intervalo == intervalo:
+            return _monitor
+        _monitor.parar()
+        _monitor = None
+    if intervalo <= 0 or not os.path.isdir(raiz):
+        return None
+    _monitor = MonitorBiblioteca(raiz, intervalo, espera, log_callback)
+    _monitor.iniciar()
+    return _monitor
@@ -1,35 +1,19 @@
 import os
 import re
-import pandas as pd
 from datetime import datetime
-from scripts.verificar_arquivos import normalizar_nome
+from scripts.biblioteca import obter_inventario, invalidar
+from scripts.renomeador import PlanoRenomeacao, arquivos_do_inventario, aplicar
 
 # Base e logs
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 LOG_DIR = os.path.join(BASE_DIR, "..", "logs")
 os.makedirs(LOG_DIR, exist_ok=True)
 
-# Extensões suportadas
-VIDEO_EXTS = {".mp4", ".mkv", ".avi", ".mov", ".flv", ".wmv", ".mpeg", ".webm"}
-RELATED_EXTS = {".jpg", ".nfo"}
-
-def renomear_arquivo_antigo(orig_path, novo_path, log_callback=None):
-    """Renomeia arquivo e arquivos relacionados (.jpg, .nfo)"""
-    os.rename(orig_path, novo_path)
-    if log_callback:
-        log_callback(f"Renomeado: {orig_path} -> {novo_path}")
-
-    base_orig, _ = os.path.splitext(orig_path)
-    base_novo, _ = os.path.splitext(novo_path)
-    for ext in RELATED_EXTS:
-        rel_orig = base_orig + ext
-        rel_novo = base_novo + ext
-        if os.path.exists(rel_orig):
-            os.rename(rel_orig, rel_novo)
-            if log_callback:
-                log_callback(f"Renomeado relacionado: {rel_orig} -> {rel_novo}")
-
-def run(log_callback=None, pasta_videos="Karaoke", arquivo_xlsx="assets/Songs.xls"):
+def run(log_callback=None, pasta_videos="Karaoke", arquivo_xlsx="assets/Songs.xls", simular=False):
+    """
+    Renumera as versões de cada música: a primeira fica sem sufixo e as
+    demais viram v2, v3... (com .jpg/.nfo). Com `simular`, só mostra o plano.
+    """
     agora = datetime.now().strftime("%Y%m%d_%H%M%S")
     log_file = os.path.join(LOG_DIR, f"karaoke_normalizar_nomes_{agora}.log")
 
@@ -47,50 +31,28 @@ def run(log_callback=None, pasta_videos="Karaoke", arquivo_xlsx="assets/Songs.xl
         log(f"Arquivo XLSX não encontrado: {arquivo_xlsx}")
         return
 
-    # Mapear todos os arquivos de todas as subpastas
-    arquivos_dict = {}
-    for root, dirs, files in os.walk(pasta_videos):
-        for arquivo in files:
-            nome, ext = os.path.splitext(arquivo)
-            if ext.lower() not in VIDEO_EXTS:
-                continue
-            chave = normalizar_nome(nome)
-            m = re.search(r' v(\d+)$', nome, re.IGNORECASE)
-            versao = int(m.group(1)) if m else 1
-            if chave not in arquivos_dict:
-                arquivos_dict[chave] = []
-            arquivos_dict[chave].append({
-                "caminho": os.path.join(root, arquivo),
-                "nome": nome,
-                "ext": ext,
-                "versao": versao
-            })
-
-    # Processar normalização global por nome base
-    for chave, lista in arquivos_dict.items():
-        # Ordena pela versão existente
-        lista.sort(key=lambda x: x['versao'])
-
-        # Se não existe versão 1, renomeia o primeiro arquivo para versão 1 (sem vN)
-        if lista[0]['versao'] != 1:
-            orig = lista[0]
-            novo_nome = re.sub(r' v\d+$', '', orig['nome'], flags=re.IGNORECASE)
-            novo_path = os.path.join(os.path.dirname(orig['caminho']), novo_nome + orig['ext'])
-            renomear_arquivo_antigo(orig['caminho'], novo_path, log_callback)
-            lista[0]['caminho'] = novo_path
-            lista[0]['nome'] = novo_nome
-            lista[0]['versao'] = 1
-
-        # Renomeia demais arquivos mantendo sequência correta (v2, v3, ...)
-        for i, item in enumerate(lista[1:], start=2):
-            orig = item
-            nome_base = re.sub(r' v\d+$', '', orig['nome'], flags=re.IGNORECASE)
-            novo_nome = f"{nome_base} v{i}{orig['ext']}"
-            novo_path = os.path.join(os.path.dirname(orig['caminho']), novo_nome)
-            if os.path.exists(orig['caminho']):
-                renomear_arquivo_antigo(orig['caminho'], novo_path, log_callback)
-                item['caminho'] = novo_path
-                item['nome'] = f"{nome_base} v{i}"
-                item['versao'] = i
+    # Planeja todas as renomeações em memória a partir do inventário da sessão
+    inventario = obter_inventario(pasta_videos)
+    plano = PlanoRenomeacao(arquivos_do_inventario(inventario))
+    for chave, lista in inventario.por_chave().items():
+        # Já ordenada pela versão existente: a primeira fica sem vN, as demais v2, v3, ...
+        for i, video in enumerate(lista, start=1):
+            nome_base = re.sub(r' v\d+$', '', video.nome, flags=re.IGNORECASE)
+            novo_nome = nome_base if i == 1 else f"{nome_base} v{i}"
+            if novo_nome != video.nome:
+                plano.mover(video.caminho, os.path.join(video.pasta, novo_nome + video.ext))
+
+    for origem, destino, motivo in plano.conflitos:
+        log(f"Conflito, mantido: {origem} -> {os.path.basename(destino)} ({motivo})")
+    if not simular:
+        for origem, destino in plano.movimentos:
+            log(f"Renomear: {origem} -> {destino}")
+    try:
+        feitos = aplicar(plano, pasta_videos, log, simular=simular)
+    except OSError:
+        invalidar(pasta_videos)
+        return
 
-    log("Normalização de nomes concluída com sucesso!")
\ No newline at end of file
+    if feitos and not simular:
+        invalidar(pasta_videos)
+    log("Normalização de nomes concluída com sucesso!")
@@ -0,0 +1,331 @@
+"""
+Renomeações em lote planejadas em memória e aplicadas com diário.
+
+O plano parte da lista de arquivos do inventário (nenhum os.path.exists por
+tentativa de nome): cada vídeo leva junto seus .jpg/.nfo. Todos os
+movimentos são pedidos antes de qualquer decisão; só então destinos ocupados
+por arquivos que não se movem viram conflito, e a ordem dos passos libera
+cada destino antes de usá-lo. Ciclos (A→B e B→A) passam por um nome
+temporário.
+
+Antes de aplicar, os passos são gravados em um diário (cache/renomeacoes,
+uma linha JSON por passo concluído). Uma execução interrompida pode ser
+retomada ou desfeita a partir dele.
+"""
+import os
+import json
+import uuid
+from datetime import datetime
+from scripts.biblioteca import EXTENSOES_RELACIONADAS
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DIARIOS_DIR = os.path.join(BASE_DIR, "..", "cache", "renomeacoes")
+
+
+def _chave(caminho):
+    return os.path.normcase(os.path.abspath(caminho))
+
+
+def arquivos_do_inventario(inventario):
+    """Todos os vídeos, capas e NFOs do inventário (estado inicial do plano)."""
+    return [video.caminho for video in inventario.videos] + inventario.capas + inventario.nfos
+
+
+class PlanoRenomeacao:
+    def __init__(self, existentes):
+        # Arquivos na pasta antes do plano: chave normalizada → caminho
+        self.iniciais = {_chave(c): c for c in existentes}
+        self._grupos = []      # um por vídeo: {"origem", "destino", "pares": [[de, para], ...]}
+        self._movendo = set()  # chaves dos arquivos iniciais com movimento pedido
+        self._destinos = {}    # chave do destino → (grupo, índice do par)
+        self._recusados = []   # conflitos já na hora do pedido
+        self._resolvido = None
+
+    def __len__(self):
+        return len(self.movimentos)
+
+    def livre(self, caminho):
+        """Livre no estado planejado: nenhum arquivo parado nem destino pedido nesse nome."""
+        chave = _chave(caminho)
+        return (chave not in self.iniciais or chave in self._movendo) and chave not in self._destinos
+
+    def destino_livre(self, pasta, base, ext):
+        """Primeiro nome livre entre base, base v2, base v3... (vídeo, .jpg e .nfo)."""
+        contador = 1
+        while True:
+            nome = base if contador == 1 else f"{base} v{contador}"
+            candidatos = [os.path.join(pasta, nome + e) for e in (ext, *sorted(EXTENSOES_RELACIONADAS))]
+            if all(self.livre(c) for c in candidatos):
+                return candidatos[0]
+            contador += 1
+
+    def _localizar(self, caminho):
+        """
+        ("inicial", chave) se for um arquivo da pasta ainda sem movimento pedido,
+        ("destino", (grupo, par)) se for destino de um movimento já pedido, ou None.
+        """
+        chave = _chave(caminho)
+        if chave in self.iniciais and chave not in self._movendo:
+            return "inicial", chave
+        if chave in self._destinos:
+            return "destino", self._destinos[chave]
+        return None
+
+    def mover(self, origem, destino):
+        """
+        Pede para renomear o vídeo `origem` para `destino`, com seus .jpg/.nfo.
+        Destinos ocupados por arquivos que também serão movidos são aceitos
+        (trocas e cadeias v3→v2→v1, em qualquer ordem); o conflito com
+        arquivos que ficam parados só é decidido em `movimentos`/`conflitos`.
+        Retorna False (e registra o conflito) se a origem não existir ou o
+        destino já tiver sido pedido por outro movimento.
+        """
+        local = self._localizar(origem)
+        if local is None:
+            self._recusados.append((origem, destino, "origem não encontrada"))
+            return False
+
+        base_origem = os.path.splitext(origem)[0]
+        base_destino = os.path.splitext(destino)[0]
+        pares = [(origem, destino, local)]
+        for ext in sorted(EXTENSOES_RELACIONADAS):
+            relacionado = self._localizar(base_origem + ext)
+            # Só acompanha o vídeo o que estiver no mesmo estado (parado, ou no mesmo movimento)
+            if relacionado is not None and relacionado[0] == local[0] and (
+                    local[0] == "inicial" or relacionado[1][0] is local[1][0]):
+                pares.append((base_origem + ext, base_destino + ext, relacionado))
+
+        for de, para, _ in pares:
+            chave_para = _chave(para)
+            if chave_para != _chave(de) and chave_para in self._destinos:
+                self._recusados.append((origem, destino, f"destino ocupado: {para}"))
+                return False
+
+        self._resolvido = None
+        grupo = None
+        for de, para, (tipo, ref) in pares:
+            if tipo == "inicial":
+                # Arquivo parado: o movimento é do vídeo pedido agora
+                if grupo is None:
+                    grupo = {"origem": origem, "destino": destino, "pares": []}
+                    self._grupos.append(grupo)
+                self._movendo.add(ref)
+                par = [self.iniciais[ref], para]
+                grupo["pares"].append(par)
+                self._destinos[_chave(para)] = (grupo, len(grupo["pares"]) - 1)
+            else:
+                # Arquivo que já é destino de um movimento pedido: o movimento é estendido
+                anterior, indice = ref
+                del self._destinos[_chave(de)]
+                anterior["pares"][indice][1] = para
+                if indice == 0:
+                    anterior["destino"] = para
+                self._destinos[_chave(para)] = ref
+        return True
+
+    def _resolver(self):
+        """
+        Descarta os vídeos cujo destino está ocupado por um arquivo que fica
+        parado. Cada descarte para mais arquivos, então repete até estabilizar.
+        """
+        if self._resolvido is not None:
+            return self._resolvido
+        ativos = list(self._grupos)
+        conflitos = list(self._recusados)
+        while True:
+            movendo = {_chave(de) for grupo in ativos for de, _ in grupo["pares"]}
+            bloqueados = []
+            for grupo in ativos:
+                for de, para in grupo["pares"]:
+                    chave_para = _chave(para)
+                    # Mesmo arquivo com outra caixa (Windows) não conta como ocupado
+                    if chave_para != _chave(de) and chave_para in self.iniciais and chave_para not in movendo:
+                        bloqueados.append((grupo, para))
+                        break
+            if not bloqueados:
+                break
+            for grupo, para in bloqueados:
+                conflitos.append((grupo["origem"], grupo["destino"], f"destino ocupado: {para}"))
+                ativos.remove(grupo)
+
+        movimentos = [(de, para) for grupo in ativos for de, para in grupo["pares"] if de != para]
+        self._resolvido = (movimentos, conflitos)
+        return self._resolvido
+
+    @property
+    def movimentos(self):
+        """(origem, destino) de todos os arquivos que serão movidos, vídeos e relacionados."""
+        return self._resolver()[0]
+
+    @property
+    def conflitos(self):
+        """(origem, destino, motivo) dos vídeos que ficam onde estão."""
+        return self._resolver()[1]
+
+    def passos(self):
+        """
+        Ordem de execução: cada passo só roda quando seu destino já foi
+        liberado. Ciclos são quebrados movendo uma origem para um nome temporário.
+        """
+        pendentes = {_chave(origem): (origem, destino) for origem, destino in self.movimentos}
+        passos = []
+        while pendentes:
+            progresso = False
+            for chave, (origem, destino) in list(pendentes.items()):
+                chave_destino = _chave(destino)
+                if chave_destino == chave or chave_destino not in pendentes:
+                    passos.append((origem, destino))
+                    del pendentes[chave]
+                    progresso = True
+            if not progresso:
+                chave, (origem, destino) = next(iter(pendentes.items()))
+                pasta, nome = os.path.split(origem)
+                temporario = os.path.join(pasta, f".renomeando_{uuid.uuid4().hex[:8]}_{nome}")
+                passos.append((origem, temporario))
+                del pendentes[chave]
+                pendentes[_chave(temporario)] = (temporario, destino)
+        return passos
+
+
+# --- Diário ---
+
+def _ler_diario(caminho):
+    with open(caminho, "r", encoding="utf-8") as f:
+        linhas = [json.loads(linha) for linha in f if linha.strip()]
+    cabecalho, eventos = linhas[0], linhas[1:]
+    return {
+        "raiz": cabecalho["raiz"],
+        "passos": [tuple(p) for p in cabecalho["passos"]],
+        "feitos": sum(1 for e in eventos if "feito" in e),
+        "desfeitos": {e["desfeito"] for e in eventos if "desfeito" in e},
+        "concluido": any(e.get("concluido") for e in eventos),
+        "revertido": any(e.get("revertido") for e in eventos),
+    }
+
+
+def _registrar(caminho, evento):
+    with open(caminho, "a", encoding="utf-8") as f:
+        f.write(json.dumps(evento) + "\n")
+        f.flush()
+
+
+def _executado(origem, destino):
+    """Passo já feito no disco (ex.: interrompido antes de ir para o diário)."""
+    return os.path.exists(destino) and not os.path.exists(origem)
+
+
+def _renomear(origem, destino):
+    # Em POSIX os.rename sobrescreveria o destino em silêncio
+    if os.path.exists(destino) and not os.path.samefile(origem, destino):
+        raise FileExistsError(f"Destino já existe: {destino}")
+    os.rename(origem, destino)
+
+
+def listar_diarios():
+    """Diários existentes, do mais recente para o mais antigo."""
+    if not os.path.isdir(DIARIOS_DIR):
+        return []
+    nomes = sorted((n for n in os.listdir(DIARIOS_DIR) if n.endswith(".jsonl")), reverse=True)
+    return [os.path.join(DIARIOS_DIR, n) for n in nomes]
+
+
+def diarios_interrompidos():
+    """Diários com passos pendentes (nem concluídos nem desfeitos)."""
+    interrompidos = []
+    for caminho in listar_diarios():
+        try:
+            diario = _ler_diario(caminho)
+        except (OSError, ValueError, KeyError, IndexError):
+            continue
+        if not diario["concluido"] and not diario["revertido"]:
+            interrompidos.append(caminho)
+    return interrompidos
+
+
+def ultimo_diario_reversivel():
+    """Diário mais recente que ainda pode ser desfeito, ou None."""
+    for caminho in listar_diarios():
+        try:
+            diario = _ler_diario(caminho)
+        except (OSError, ValueError, KeyError, IndexError):
+            continue
+        if not diario["revertido"] and diario["feitos"]:
+            return caminho
+    return None
+
+
+def aplicar(plano, raiz, log_callback=None, simular=False):
+    """
+    Aplica o plano (ou só o descreve, com `simular`). Grava o diário antes do
+    primeiro rename. Retorna os movimentos planejados (vídeos e relacionados).
+    Em caso de erro a execução para; o diário permite retomar ou desfazer.
+    """
+    def log(msg):
+        if log_callback:
+            log_callback(msg)
+
+    passos = plano.passos()
+    if simular:
+        for origem, destino in passos:
+            log(f"Simulação: {origem} -> {destino}")
+        log(f"Simulação: {len(plano)} renomeações planejadas, nada foi alterado.")
+        return list(plano.movimentos)
+    if not passos:
+        return []
+
+    os.makedirs(DIARIOS_DIR, exist_ok=True)
+    agora = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    caminho = os.path.join(DIARIOS_DIR, f"renomear_{agora}.jsonl")
+    with open(caminho, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"criado": agora, "raiz": os.path.abspath(raiz), "passos": passos}) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+    retomar(caminho, log_callback)
+    return list(plano.movimentos)
+
+
+def retomar(caminho, log_callback=None):
+    """Executa os passos pendentes de um diário."""
+    diario = _ler_diario(caminho)
+    passos = diario["passos"]
+    for i in range(diario["feitos"], len(passos)):
+        origem, destino = passos[i]
+        if not _executado(origem, destino):
+            try:
+                _renomear(origem, destino)
+            except OSError as e:
+                if log_callback:
+                    log_callback(f"❌ Renomeação interrompida em {origem}: {e}")
+                    log_callback(f"   Diário: {caminho} (retome ou desfaça após corrigir)")
+                raise
+        _registrar(caminho, {"feito": i})
+    _registrar(caminho, {"concluido": True})
+    if log_callback:
+        log_callback(f"{len(passos)} renomeações aplicadas. Diário: {caminho}")
+
+
+def desfazer(caminho, log_callback=None):
+    """Desfaz, em ordem inversa, os passos já executados de um diário."""
+    diario = _ler_diario(caminho)
+    passos = diario["passos"]
+    feitos = diario["feitos"]
+    if feitos < len(passos) and _executado(*passos[feitos]):
+        feitos += 1  # interrompido entre o rename e o registro
+
+    for i in range(feitos - 1, -1, -1):
+        # Passos já desfeitos numa tentativa anterior ficam de fora
+        if i in diario["desfeitos"]:
+            continue
+        origem, destino = passos[i]
+        if not _executado(destino, origem):
+            try:
+                _renomear(destino, origem)
+            except OSError as e:
+                if log_callback:
+                    log_callback(f"❌ Não foi possível desfazer {destino}: {e}")
+                raise
+        _registrar(caminho, {"desfeito": i})
+    _registrar(caminho, {"revertido": True})
+    if log_callback:
+        log_callback(f"{feitos} renomeações desfeitas. Diário: {caminho}")
@@ -1,13 +1,78 @@
 import os
-from openpyxl import load_workbook
+import pandas as pd
 import re
 from datetime import datetime
+from scripts.biblioteca import obter_inventario, invalidar
+from scripts.catalogo import ler_planilha
+from scripts.renomeador import PlanoRenomeacao, arquivos_do_inventario, aplicar
 
 def limpar_nome(nome):
     """Remove caracteres inválidos do Windows."""
     return re.sub(r'[<>:"/\\|?*]', '', nome)
 
-def run(log_callback=None, pasta_videos="Karaoke", arquivo_xlsx="Songs.xls"):
+def gravar_log_renomeacoes(renomeacoes, log_callback=None, duplicados=None):
+    agora = datetime.now().strftime("%Y%m%d_%H%M%S")
+    log_dir = os.path.join(os.path.dirname(__file__), "..", "logs")
+    os.makedirs(log_dir, exist_ok=True)
+    log_filename = os.path.join(log_dir, f"karaoke_renomear_{agora}.log")
+    with open(log_filename, "w", encoding="utf-8") as log_file:
+        log_file.write("\n".join(renomeacoes))
+        if duplicados:
+            log_file.write("\n\nArquivos com o mesmo nome em mais de uma pasta:\n")
+            log_file.write("\n".join(duplicados))
+    if log_callback:
+        log_callback(f"\nLog gerado: {log_filename}")
+
+def aplicar_plano(plano, pasta_videos, log_callback=None, simular=False, duplicados=None):
+    """Aplica o plano e grava o log de renomeações. Retorna os movimentos feitos."""
+    try:
+        movimentos = aplicar(plano, pasta_videos, log_callback, simular=simular)
+    except OSError:
+        invalidar(pasta_videos)
+        return []
+    if simular:
+        return movimentos
+
+    renomeacoes = [f"{origem} => {destino}" for origem, destino in movimentos]
+    if renomeacoes:
+        invalidar(pasta_videos)
+    if renomeacoes or duplicados:
+        gravar_log_renomeacoes(renomeacoes, log_callback, duplicados)
+    return movimentos
+
+def renomear_titulos(pasta_videos, titulos, log_callback=None, simular=False):
+    """
+    Renomeia os vídeos cujo full_title mudou na planilha, junto com .jpg/.nfo,
+    mantendo a pasta e o sufixo vN. `titulos`: chave normalizada do título
+    antigo → full_title novo. Retorna as renomeações feitas.
+    """
+    inventario = obter_inventario(pasta_videos)
+    plano = PlanoRenomeacao(arquivos_do_inventario(inventario))
+    pedidos = []
+    for video in inventario.videos:
+        novo_titulo = titulos.get(video.chave)
+        if not novo_titulo:
+            continue
+        sufixo = f" v{video.versao}" if video.versao > 1 else ""
+        novo_nome = limpar_nome(novo_titulo) + sufixo
+        if novo_nome == video.nome:
+            continue
+        plano.mover(video.caminho, os.path.join(video.pasta, novo_nome + video.ext))
+        pedidos.append((video, novo_nome))
+
+    # Conflitos só são conhecidos depois de todos os pedidos (trocas e cadeias de nomes)
+    conflitos = {origem: motivo for origem, _, motivo in plano.conflitos}
+    for video, novo_nome in pedidos:
+        if video.caminho in conflitos:
+            mensagem = f"Conflito, mantido: {video.caminho} ({conflitos[video.caminho]})"
+        else:
+            mensagem = f"Renomear: {video.arquivo} -> {novo_nome + video.ext}"
+        if log_callback:
+            log_callback(mensagem)
+
+    return aplicar_plano(plano, pasta_videos, log_callback, simular=simular)
+
+def run(log_callback=None, pasta_videos="Karaoke", arquivo_xlsx="Songs.xls", simular=False):
     if not os.path.exists(pasta_videos):
         if log_callback:
             log_callback(f"Pasta não encontrada, criando: {pasta_videos}")
@@ -18,63 +83,53 @@ def run(log_callback=None, pasta_videos="Karaoke", arquivo_xlsx="Songs.xls"):
             log_callback(f"Arquivo XLSX não encontrado: {arquivo_xlsx}")
         return
 
+    # Abas do catálogo (valores calculados das fórmulas, índice = linha da planilha)
     try:
-        # Usar data_only=True para obter valores calculados das fórmulas
-        wb = load_workbook(arquivo_xlsx, data_only=True)
-    except Exception as e:
-        if log_callback:
-            log_callback(f"Erro ao abrir o arquivo XLSX: {e}")
-        return
-
-    # Verifica se a aba 'Karaoke' existe
-    if "Karaoke" not in wb.sheetnames:
+        df_karaoke = ler_planilha(arquivo_xlsx, "Karaoke")
+        df_biblioteca = ler_planilha(arquivo_xlsx, "Biblioteca")
+    except ValueError as e:
         if log_callback:
-            log_callback("Erro: A aba 'Karaoke' não foi encontrada no arquivo Excel.")
+            log_callback(f"Erro: {e}")
         return
-
-    ws = wb["Karaoke"]
-    header = [cell.value for cell in ws[1]]
-
-    try:
-        idx_filename = header.index("filename") + 1
-        # Busca full_title na aba Biblioteca usando music_id
-        idx_music_id = header.index("music_id") + 1
-    except ValueError as e:
+    except Exception as e:
         if log_callback:
-            log_callback(f"Erro: Colunas 'filename' ou 'music_id' não encontradas. {e}")
+            log_callback(f"Erro ao abrir o arquivo XLSX: {e}")
         return
 
-    # Carrega a aba Biblioteca para buscar full_title
-    if "Biblioteca" not in wb.sheetnames:
+    if "filename" not in df_karaoke.columns or "music_id" not in df_karaoke.columns:
         if log_callback:
-            log_callback("Erro: A aba 'Biblioteca' não foi encontrada no arquivo Excel.")
+            log_callback("Erro: Colunas 'filename' ou 'music_id' não encontradas.")
         return
-
-    ws_biblioteca = wb["Biblioteca"]
-    header_biblioteca = [cell.value for cell in ws_biblioteca[1]]
-    
-    try:
-        idx_bib_music_id = header_biblioteca.index("music_id") + 1
-        idx_bib_fulltitle = header_biblioteca.index("full_title") + 1
-    except ValueError as e:
+    if "music_id" not in df_biblioteca.columns or "full_title" not in df_biblioteca.columns:
         if log_callback:
-            log_callback(f"Erro: Colunas 'music_id' ou 'full_title' não encontradas na aba Biblioteca. {e}")
+            log_callback("Erro: Colunas 'music_id' ou 'full_title' não encontradas na aba Biblioteca.")
         return
 
     # Cria mapeamento music_id -> full_title
     fulltitle_map = {}
-    for row in ws_biblioteca.iter_rows(min_row=2, values_only=True):
-        music_id = row[idx_bib_music_id - 1]
-        full_title = row[idx_bib_fulltitle - 1]
+    for music_id, full_title in df_biblioteca[["music_id", "full_title"]].dropna().itertuples(index=False):
         if music_id and full_title:
             fulltitle_map[music_id] = full_title
 
-    renomeacoes = []
-
-    for i, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
-        filename = row[idx_filename - 1]
-        music_id = row[idx_music_id - 1]
-
+    duplicados = []
+
+    # filename → caminhos, montado uma vez a partir do inventário. Com o mesmo
+    # nome em várias subpastas, a ordem é a do caminho relativo (sem caixa),
+    # então a escolha não depende da ordem da listagem do disco.
+    inventario = obter_inventario(pasta_videos)
+    caminhos_por_arquivo = {
+        nome: sorted(caminhos, key=lambda c: os.path.relpath(c, pasta_videos).casefold())
+        for nome, caminhos in inventario.por_arquivo.items()
+    }
+    # Todas as renomeações são planejadas em memória e aplicadas no final
+    plano = PlanoRenomeacao(arquivos_do_inventario(inventario))
+    pedidos = []        # (linha, filename, origem, destino)
+    origem_inicial = {}  # destino pedido → arquivo original (a mesma linha pode renomear de novo)
+
+    for i, filename, music_id in df_karaoke[["filename", "music_id"]].itertuples():
+        # Células vazias chegam como NaN
+        filename = filename if pd.notna(filename) else None
+        music_id = music_id if pd.notna(music_id) else None
         if not filename:
             if log_callback:
                 log_callback(f"Linha {i}: Sem filename, ignorando...")
@@ -100,47 +155,50 @@ def run(log_callback=None, pasta_videos="Karaoke", arquivo_xlsx="Songs.xls"):
                 log_callback(f"Linha {i}: Full_title é uma fórmula não calculada: {fulltitle}")
             continue
 
-        # Percorre todas as subpastas
+        # Localiza o arquivo pelo nome (primeiro caminho relativo em ordem alfabética)
         encontrado = False
-        for root, dirs, files in os.walk(pasta_videos):
-            if filename in files:
-                caminho_atual = os.path.join(root, filename)
-                ext = os.path.splitext(filename)[1]
-                novo_nome = limpar_nome(fulltitle) + ext
-                caminho_novo = os.path.join(root, novo_nome)
-
-                contador = 2
-                while os.path.exists(caminho_novo):
-                    novo_nome = limpar_nome(fulltitle) + f" v{contador}" + ext
-                    caminho_novo = os.path.join(root, novo_nome)
-                    contador += 1
-
-                try:
-                    os.rename(caminho_atual, caminho_novo)
-                    if log_callback:
-                        log_callback(f"Linha {i}: {filename} -> {novo_nome}")
-                    renomeacoes.append(f"{caminho_atual} => {caminho_novo}")
-                    encontrado = True
-                except Exception as e:
-                    if log_callback:
-                        log_callback(f"Erro na linha {i}: {e}")
-                break
+        caminhos = caminhos_por_arquivo.get(filename, [])
+        if len(caminhos) > 1:
+            relativos = [os.path.relpath(c, pasta_videos) for c in caminhos]
+            aviso = f"Linha {i}: {filename} existe em {len(caminhos)} pastas; usando {relativos[0]} (demais: {', '.join(relativos[1:])})"
+            duplicados.append(aviso)
+            if log_callback:
+                log_callback(aviso)
+        if caminhos:
+            caminho_atual = caminhos[0]
+            root = os.path.dirname(caminho_atual)
+            ext = os.path.splitext(filename)[1]
+            caminho_novo = plano.destino_livre(root, limpar_nome(fulltitle), ext)
+            novo_nome = os.path.basename(caminho_novo)
+
+            encontrado = True
+            pedidos.append((i, filename, caminho_atual, caminho_novo))
+            if plano.mover(caminho_atual, caminho_novo):
+                origem_inicial[caminho_novo] = origem_inicial.get(caminho_atual, caminho_atual)
+                # Mantém o mapa de nomes coerente para as próximas linhas
+                caminhos.remove(caminho_atual)
+                caminhos_por_arquivo.setdefault(novo_nome, []).append(caminho_novo)
 
         if not encontrado and log_callback:
             log_callback(f"Linha {i}: Arquivo não encontrado: {filename}")
 
-    # Gera log final
-    if renomeacoes:
-        agora = datetime.now().strftime("%Y%m%d_%H%M%S")
-        log_dir = os.path.join(os.path.dirname(__file__), "..", "logs")
-        os.makedirs(log_dir, exist_ok=True)
-        log_filename = os.path.join(log_dir, f"karaoke_renomear_{agora}.log")
-        with open(log_filename, "w", encoding="utf-8") as log_file:
-            log_file.write("\n".join(renomeacoes))
-        if log_callback:
-            log_callback(f"\nLog gerado: {log_filename}")
-    else:
-        if log_callback:
+    # Conflitos só são conhecidos depois de todos os pedidos (trocas e cadeias de nomes)
+    por_origem = {origem: motivo for origem, _, motivo in plano.conflitos}
+    for i, filename, origem, destino in pedidos:
+        motivo = por_origem.get(origem) or por_origem.get(origem_inicial.get(origem))
+        if not log_callback:
+            continue
+        if motivo:
+            log_callback(f"Erro na linha {i}: {motivo}")
+        else:
+            log_callback(f"Linha {i}: {filename} -> {os.path.basename(destino)}")
+
+    if duplicados and log_callback:
+        log_callback(f"\n⚠️  {len(duplicados)} arquivo(s) com o mesmo nome em mais de uma pasta (detalhes no log).")
+
+    # Aplica o plano e gera o log final
+    if not aplicar_plano(plano, pasta_videos, log_callback, simular=simular, duplicados=duplicados):
+        if log_callback and not duplicados:
             log_callback("\nNenhum arquivo renomeado. Log não gerado.")
 
 # Permite execução standalone
@@ -0,0 +1,241 @@
+"""
+Parser de arquivos UltraStar (.txt).
+
+As notas são guardadas em colunas (arrays numpy) em vez de um dict por nota,
+e todos os tempos são convertidos de beats para segundos de uma só vez.
+Suporta notas normais (':'), douradas ('*'), livres ('F'), rap ('R'),
+rap dourado ('G'), quebras de linha ('-') e o modo #RELATIVE.
+
+`carregar_musica` guarda a música já processada (colunas, frases e momentos
+de rolagem) em um arquivo binário em cache/ultrastar, invalidado por
+caminho, tamanho, mtime e versão do parser.
+"""
+import os
+import re
+import pickle
+import hashlib
+import numpy as np
+
+# Incrementar sempre que a saída do parser (ou dos momentos) mudar
+VERSAO_PARSER = 1
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(BASE_DIR, "..", "cache", "ultrastar")
+
+# Tempos da rolagem: a transição termina levemente antes do áudio da frase
+TRANSITION_DURATION = 0.7  # 700ms para rolagem bem visível e suave
+ANTICIPATION = 0.25  # 250ms de antecipação extra (a linha fica pronta antes)
+TITLE_DURATION = 4  # Segundos do frame inicial com título e artista
+
+# Tipos de nota (coluna `types`)
+NOTA_NORMAL = 0
+NOTA_DOURADA = 1
+NOTA_LIVRE = 2
+NOTA_RAP = 3
+NOTA_RAP_DOURADA = 4
+
+TIPOS_NOTA = {':': NOTA_NORMAL, '*': NOTA_DOURADA, 'F': NOTA_LIVRE, 'R': NOTA_RAP, 'G': NOTA_RAP_DOURADA}
+
+# Tipo, beat, duração, pitch e sílaba (a sílaba preserva os espaços que separam palavras)
+RE_NOTA = re.compile(r'^([:*FRG])\s*(-?\d+)\s+(-?\d+)\s+(-?\d+)(?:\s(.*))?$')
+RE_HEADER = re.compile(r'#([^:]+):(.*)')
+
+
+def ler_numero(valor, padrao):
+    """Converte valores de header como '300,5' ou '1200' para float."""
+    try:
+        return float(str(valor).strip().replace(',', '.'))
+    except (TypeError, ValueError):
+        return padrao
+
+
+class UltraStarParser:
+    # Atributos gravados no cache
+    CAMPOS_CACHE = ('header', 'relative', 'beats', 'durations', 'pitches', 'types', 'syllables',
+                    'breaks', 'bpm', 'gap', 'seconds_per_beat', 'starts', 'ends', '_lines', '_moments')
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.header = {}
+        self._lines = None
+        self._moments = None
+        self.parse_file()
+
+    @classmethod
+    def from_cache(cls, filepath, dados):
+        """Reconstrói o parser a partir dos dados do cache, sem reler o texto."""
+        parser = cls.__new__(cls)
+        parser.filepath = filepath
+        for campo in cls.CAMPOS_CACHE:
+            setattr(parser, campo, dados[campo])
+        return parser
+
+    def to_cache(self):
+        self.get_moments()  # garante frases e momentos compilados
+        return {campo: getattr(self, campo) for campo in self.CAMPOS_CACHE}
+
+    def parse_file(self):
+        """Lê o arquivo em uma única passada, acumulando as notas em colunas."""
+        beats, durations, pitches, types = [], [], [], []
+        self.syllables = []
+        breaks = []
+        offset = 0
+        relative = False
+
+        with open(self.filepath, 'r', encoding='utf-8-sig') as f:
+            for line in f:
+                line = line.rstrip('\r\n')
+                if not line.strip():
+                    continue
+                prefix = line[0]
+
+                if prefix in TIPOS_NOTA:
+                    match = RE_NOTA.match(line)
+                    if match:
+                        tipo, beat, duration, pitch, syllable = match.groups()
+                        beats.append(int(beat) + offset)
+                        durations.append(int(duration))
+                        pitches.append(int(pitch))
+                        types.append(TIPOS_NOTA[tipo])
+                        self.syllables.append(syllable or '')
+                elif prefix == '-':
+                    breaks.append(len(beats))
+                    if relative:
+                        # "- fim início": no modo relativo o início da próxima linha desloca as notas
+                        numeros = line[1:].split()
+                        if numeros:
+                            offset += int(numeros[1] if len(numeros) > 1 else numeros[0])
+                elif prefix == '#':
+                    match = RE_HEADER.match(line.strip())
+                    if match:
+                        key, value = match.groups()
+                        self.header[key.strip().upper()] = value.strip()
+                        if key.strip().upper() == 'RELATIVE':
+                            relative = value.strip().lower() in ('yes', 'true', '1')
+                elif prefix == 'E':
+                    break
+
+        self.relative = relative
+        self.beats = np.array(beats, dtype=np.int32)
+        self.durations = np.array(durations, dtype=np.int32)
+        self.pitches = np.array(pitches, dtype=np.int16)
+        self.types = np.array(types, dtype=np.uint8)
+        self.breaks = np.array(breaks, dtype=np.int32)
+
+        # BPM e GAP lidos uma única vez
+        self.bpm = ler_numero(self.header.get('BPM'), 120.0) or 120.0
+        self.gap = ler_numero(self.header.get('GAP'), 0.0) / 1000
+        self.seconds_per_beat = 60.0 / (self.bpm * 4)
+
+        # Conversão vetorizada de todas as notas
+        self.starts = self.beats * self.seconds_per_beat + self.gap
+        self.ends = (self.beats + self.durations) * self.seconds_per_beat + self.gap
+
+    def beat_to_seconds(self, beat):
+        return beat * self.seconds_per_beat + self.gap
+
+    def get_lines(self):
+        """
+        Agrupa as notas em frases separadas pelas quebras ('-').
+        Retorna uma lista de dicts com 'start', 'end' (segundos) e 'text'.
+        """
+        if self._lines is not None:
+            return self._lines
+
+        lines = []
+        limites = [0] + [int(b) for b in self.breaks] + [len(self.beats)]
+
+        for inicio, fim in zip(limites, limites[1:]):
+            # Considera apenas notas com texto (ignora sílabas vazias)
+            indices = [i for i in range(inicio, fim) if self.syllables[i].strip()]
+            if not indices:
+                continue
+            text = ' '.join(''.join(self.syllables[i] for i in indices).split())
+            lines.append({
+                'start': float(self.starts[indices[0]]),
+                'end': float(self.ends[indices[-1]]),
+                'text': text,
+            })
+
+        self._lines = lines
+        return lines
+
+    def get_moments(self):
+        """
+        Momentos de rolagem: frame de título seguido de um momento por frase,
+        com a frase anterior, a atual e a próxima.
+        """
+        if self._moments is not None:
+            return self._moments
+
+        lines = self.get_lines()
+        moments = [{
+            'start_time': 0,
+            'end_time': TITLE_DURATION,
+            'type': 'title',
+            'title': self.header.get('TITLE', 'Música'),
+            'artist': self.header.get('ARTIST', 'Artista'),
+            'transition_progress': 1.0
+        }]
+
+        for i, line in enumerate(lines):
+            previous_line = lines[i - 1]['text'] if i > 0 else None
+
+            next_line = None
+            if i + 1 < len(lines):
+                next_line = lines[i + 1]['text']
+                moment_end = lines[i + 1]['start']
+            else:
+                moment_end = line['end'] + 0.5
+
+            # Iniciar transição ANTES para terminar no tempo certo
+            transition_start = max(TITLE_DURATION, line['start'] - TRANSITION_DURATION - ANTICIPATION)
+
+            moments.append({
+                'start_time': transition_start,
+                'end_time': moment_end,
+                'type': 'lyrics',
+                'previous_line': previous_line,
+                'current_line': line['text'],
+                'next_line': next_line,
+                'transition_duration': TRANSITION_DURATION,
+                'line_actual_start': line['start']  # Momento real da linha
+            })
+
+        self._moments = moments
+        return moments
+
+
+def caminho_cache(filepath):
+    chave = hashlib.sha1(os.path.abspath(filepath).encode('utf-8')).hexdigest()
+    return os.path.join(CACHE_DIR, chave + ".pkl")
+
+
+def carregar_musica(filepath):
+    """
+    Retorna o UltraStarParser da música, lendo do cache quando caminho,
+    tamanho, mtime e versão do parser coincidem; caso contrário processa o
+    texto e atualiza o cache.
+    """
+    st = os.stat(filepath)
+    chave = (os.path.abspath(filepath), st.st_size, st.st_mtime_ns, VERSAO_PARSER)
+    arquivo_cache = caminho_cache(filepath)
+
+    try:
+        with open(arquivo_cache, 'rb') as f:
+            dados = pickle.load(f)
+        if dados.get('chave') == chave:
+            return UltraStarParser.from_cache(filepath, dados['parser'])
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, KeyError, TypeError, ValueError):
+        pass
+
+    parser = UltraStarParser(filepath)
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        temporario = arquivo_cache + ".tmp"
+        with open(temporario, 'wb') as f:
+            pickle.dump({'chave': chave, 'parser': parser.to_cache()}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporario, arquivo_cache)
+    except OSError:
+        pass  # cache é apenas otimização
+    return parser
@@ -1,6 +1,5 @@
 import os
 import re
-import pandas as pd
 from datetime import datetime
 from app.utils import get_logger
 
@@ -30,8 +29,10 @@ def run(log_callback, pasta_videos: str, caminho_planilha: str):
             raise FileNotFoundError(f"Planilha não encontrada: {caminho_planilha}")
         
         # Carrega as abas Karaoke e Biblioteca
-        df_karaoke = pd.read_excel(caminho_planilha, sheet_name='Karaoke', engine="openpyxl")
-        df_biblioteca = pd.read_excel(caminho_planilha, sheet_name='Biblioteca', engine="openpyxl")
+        # (importado aqui: pandas/openpyxl só quando a verificação roda)
+        from scripts.catalogo import ler_planilha
+        df_karaoke = ler_planilha(caminho_planilha, 'Karaoke')
+        df_biblioteca = ler_planilha(caminho_planilha, 'Biblioteca')
         
         # Verifica se as colunas necessárias existem
         if 'music_id' not in df_karaoke.columns:
@@ -46,13 +47,14 @@ def run(log_callback, pasta_videos: str, caminho_planilha: str):
         df_biblioteca_filtrado = df_biblioteca[df_biblioteca['music_id'].isin(music_ids_karaoke)]
         df_biblioteca_filtrado['full_title'] = df_biblioteca_filtrado['full_title'].astype(str).str.strip()
 
-        # Pega arquivos da pasta (com subpastas)
-        arquivos_pasta = {}
-        for root, _, files in os.walk(pasta_videos):
-            for arquivo in files:
-                nome, ext = os.path.splitext(arquivo)
-                if ext.lower() in VIDEO_EXTENSOES:
-                    arquivos_pasta[normalizar_nome(nome)] = arquivo
+        # Pega arquivos da pasta (com subpastas) do inventário da sessão
+        # (importado aqui: scripts.biblioteca usa normalizar_nome deste módulo)
+        from scripts.biblioteca import obter_inventario, videos_sem_capa, videos_sem_nfo
+        arquivos_pasta = {video.chave: video.arquivo for video in obter_inventario(pasta_videos).videos}
+
+        # Vídeos sem capa/NFO ao lado, consultados no índice da biblioteca
+        sem_capa = [os.path.relpath(c, pasta_videos) for c in videos_sem_capa(pasta_videos)]
+        sem_nfo = [os.path.relpath(c, pasta_videos) for c in videos_sem_nfo(pasta_videos)]
 
         # Pega títulos da planilha (apenas os que estão no Karaoke)
         titulos_planilha = {}
@@ -94,8 +96,14 @@ def run(log_callback, pasta_videos: str, caminho_planilha: str):
             else:
                 log.write("  Nenhum\n")
 
+            for titulo, lista in (("Vídeos sem capa (.jpg)", sem_capa), ("Vídeos sem NFO", sem_nfo)):
+                log.write(f"\n{titulo}:\n")
+                for a in lista or ["Nenhum"]:
+                    log.write(f"  {a}\n")
+
         log_callback(f"✅ Verificação concluída! Log salvo em {log_file}")
         log_callback(f"📊 Estatísticas: {len(music_ids_karaoke)} músicas no Karaoke, {len(titulos_planilha)} com dados na Biblioteca")
+        log_callback(f"🖼️  Vídeos sem capa: {len(sem_capa)} | 📝 Vídeos sem NFO: {len(sem_nfo)}")
         logger.info(f"Verificação concluída! Log salvo em {log_file}")
 
     except Exception as e:
@@ -0,0 +1,125 @@
+"""
+Índice dos vídeos já gerados (biblioteca de karaokê + pasta Output).
+
+Os nomes são normalizados uma única vez, na construção: a verificação de
+cada projeto do lote é só consulta a dicionários e ao índice de palavras.
+
+Regras de correspondência (na ordem, a primeira que encontrar vale):
+1. Nome normalizado igual.
+2. Igual depois de remover o sufixo vN (de qualquer um dos lados).
+3. Um nome contido no outro como sequência contígua de palavras inteiras,
+   desde que a parte contida tenha pelo menos MIN_PALAVRAS_CONTIDO palavras
+   ("Ana" não casa com "Banana", "Pais - Tempo" não casa com "Tempo").
+Com mais de um vídeo na mesma regra, vale o primeiro: biblioteca (ordem do
+inventário) antes da pasta Output (ordem alfabética).
+"""
+import os
+import re
+from scripts.biblioteca import obter_inventario
+
+EXTENSOES_OUTPUT = ('.mp4', '.avi', '.mkv', '.mov')
+MIN_PALAVRAS_CONTIDO = 3
+RE_VERSAO = re.compile(r'^v\d+$')
+
+
+def normalizar_nome_arquivo(nome):
+    """Normaliza o nome do arquivo para comparação robusta"""
+    if not nome:
+        return ""
+    nome = nome.lower()
+    nome = nome.replace('&', 'e')
+    nome = nome.replace('_', ' ')
+    nome = nome.replace('-', ' ')
+    nome = ''.join(c for c in nome if c.isalnum() or c == ' ')
+    return ' '.join(nome.split())
+
+
+def palavras_sem_versao(nome_normalizado):
+    """Palavras do nome normalizado, sem o sufixo vN final."""
+    palavras = tuple(nome_normalizado.split())
+    if len(palavras) > 1 and RE_VERSAO.match(palavras[-1]):
+        palavras = palavras[:-1]
+    return palavras
+
+
+def contem_sequencia(palavras, trecho):
+    """True se `trecho` aparece em `palavras` como sequência contígua."""
+    n = len(trecho)
+    return any(palavras[i:i + n] == trecho for i in range(len(palavras) - n + 1))
+
+
+class IndiceVideosExistentes:
+    def __init__(self, caminhos):
+        self.caminhos = list(caminhos)
+        self.exatos = {}        # nome normalizado → índice do primeiro vídeo
+        self.sem_versao = {}    # palavras sem vN → índice do primeiro vídeo
+        self.palavras = []      # palavras sem vN de cada vídeo
+        self.por_palavra = {}   # palavra → índices dos vídeos que a contêm
+
+        for i, caminho in enumerate(self.caminhos):
+            nome = normalizar_nome_arquivo(os.path.splitext(os.path.basename(caminho))[0])
+            palavras = palavras_sem_versao(nome)
+            self.exatos.setdefault(nome, i)
+            self.sem_versao.setdefault(palavras, i)
+            self.palavras.append(palavras)
+            for palavra in set(palavras):
+                self.por_palavra.setdefault(palavra, []).append(i)
+
+    def __len__(self):
+        return len(self.caminhos)
+
+    def _contido_em_video(self, palavras):
+        """Menor índice de vídeo cujo nome contém `palavras` em sequência."""
+        listas = [self.por_palavra.get(p) for p in set(palavras)]
+        if not all(listas):
+            return None
+        listas.sort(key=len)
+        candidatos = set(listas[0]).intersection(*listas[1:])
+        for i in sorted(candidatos):
+            if contem_sequencia(self.palavras[i], palavras):
+                return i
+        return None
+
+    def _video_contido(self, palavras):
+        """Menor índice de vídeo cujo nome inteiro aparece em sequência em `palavras`."""
+        encontrados = [
+            self.sem_versao[palavras[inicio:fim]]
+            for inicio in range(len(palavras))
+            for fim in range(inicio + MIN_PALAVRAS_CONTIDO, len(palavras) + 1)
+            if palavras[inicio:fim] in self.sem_versao
+        ]
+        return min(encontrados, default=None)
+
+    def buscar(self, nome_arquivo):
+        """Caminho do vídeo já existente para o nome, ou None."""
+        nome = normalizar_nome_arquivo(nome_arquivo)
+        if not nome:
+            return None
+        if nome in self.exatos:
+            return self.caminhos[self.exatos[nome]]
+
+        palavras = palavras_sem_versao(nome)
+        if palavras in self.sem_versao:
+            return self.caminhos[self.sem_versao[palavras]]
+
+        candidatos = []
+        if len(palavras) >= MIN_PALAVRAS_CONTIDO:
+            candidatos.append(self._contido_em_video(palavras))
+        candidatos.append(self._video_contido(palavras))
+        indice = min((i for i in candidatos if i is not None), default=None)
+        return self.caminhos[indice] if indice is not None else None
+
+
+def listar_output(pasta_output):
+    """Vídeos da pasta Output (sem subpastas), em ordem alfabética."""
+    try:
+        nomes = sorted(os.listdir(pasta_output))
+    except OSError:
+        return []
+    return [os.path.join(pasta_output, n) for n in nomes if n.lower().endswith(EXTENSOES_OUTPUT)]
+
+
+def construir_indice(pasta_karaoke, pasta_output):
+    """Índice da biblioteca (inventário da sessão) mais a pasta Output."""
+    caminhos = [video.caminho for video in obter_inventario(pasta_karaoke).videos]
+    return IndiceVideosExistentes(caminhos + listar_output(pasta_output))
@@ -10,7 +10,8 @@ assets_dir = os.path.join(base_dir, "assets")
 env_file = os.path.join(base_dir, ".env")
 
 build_exe_options = {
-    "packages": ["os", "tkinter", "dotenv"],
+    # "scripts" é importado sob demanda pela UI (importlib): precisa ser incluído explicitamente
+    "packages": ["os", "tkinter", "dotenv", "scripts"],
     "include_files": [
         (assets_dir, "assets"),  # copia toda a pasta assets para o build
         (env_file, ".env"),       # copia o arquivo .env